@@ -3,19 +3,53 @@ Smart Code Review Assistant - FastAPI Backend
 Analyzes Python code using ML models and provides quality metrics
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Iterator, List, Tuple, Optional
+from starlette.routing import Match
+import asyncio
+import hmac
+import itertools
+import json
 import os
+import random
+import tempfile
+import time
 
-from src.code_analyzer import CodeAnalyzer
-from src.ml_models import CodeQualityPredictor
+from src.archive import iter_python_files, UnsupportedArchive
+from src.cache import ResultCache
+from src.guard import BudgetExceeded, check_source_size
+from src.http_cache import CachedFile, ConditionalStaticFiles, JSONCompressionMiddleware, etag_matches, make_etag
+from src.jobs import Job, JobQueue, QueueFull
+from src.live import EditError, LiveDocument
+from src.pipeline import AnalysisPool
+from src.profiling import ProfileStore
+from src.retraining import LABELS, FeedbackStore, Retrainer
+from src.scanner import ScanSummary
+from src.streaming import Source, SourceFile, source_size, spool
+from src.telemetry import MetricsRegistry
+from src.warmup import WarmUp, NotReady
 
-app = FastAPI(title="Smart Code Review Assistant", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the analysis worker processes, load the models and schedule retraining in the background"""
+    analysis_pool.start()
+    warmup.start()
+    job_queue.start()
+    retraining = asyncio.create_task(retrainer.run(lambda: warmup.predictor))
+    yield
+    retraining.cancel()
+    await job_queue.stop()
+    analysis_pool.shutdown()
+
+
+app = FastAPI(title="Smart Code Review Assistant", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -24,101 +58,903 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# JSON responses of at least this many bytes are gzipped (0 disables)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+app.add_middleware(JSONCompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+
 # Mount static files
 static_path = Path(__file__).parent / "static"
 static_path.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+app.mount("/static", ConditionalStaticFiles(directory=str(static_path)), name="static")
+
+# The index page is kept in memory and read again only when it changes
+index_page = CachedFile(static_path / "index.html")
+
+# Labeled sources posted to /api/feedback are kept in FEEDBACK_PATH; a new
+# model is trained in the background once RETRAIN_MIN_FEEDBACK samples
+# arrived (or every RETRAIN_INTERVAL seconds while there are new ones),
+# validated and swapped in. Accepted models are kept in RETRAIN_DIR.
+feedback_store = FeedbackStore(os.getenv("FEEDBACK_PATH", "feedback/feedback.jsonl"),
+                               int(os.getenv("FEEDBACK_MAX_SAMPLES", 10000)))
+retrainer = Retrainer(
+    feedback_store,
+    os.getenv("RETRAIN_DIR", "models/retrained"),
+    install=lambda predictor: install_model(predictor),
+    min_feedback=int(os.getenv("RETRAIN_MIN_FEEDBACK", 50)),
+    interval=float(os.getenv("RETRAIN_INTERVAL", 3600)),
+    min_accuracy=float(os.getenv("RETRAIN_MIN_ACCURACY", 0.8)),
+    keep=int(os.getenv("RETRAIN_KEEP", 3)),
+)
+
+# Analyzer and model load in the background, starting from the newest
+# retrained model if there is one; see /api/ready
+warmup = WarmUp(model_path=retrainer.latest)
+
+# Seconds a request waits for a warm-up in progress before answering 503
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 30))
+
+# CPU-bound analysis runs in worker processes (see ANALYSIS_* variables)
+analysis_pool = AnalysisPool()
+
+# Largest source accepted for analysis (0 disables the limit)
+MAX_SOURCE_BYTES = int(os.getenv("MAX_SOURCE_BYTES", 1024 * 1024))
 
-# Initialize analyzers
-code_analyzer = CodeAnalyzer()
-ml_predictor = CodeQualityPredictor()
+# Maximum number of files accepted by /api/analyze-batch
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 200))
+
+# Limits of /api/analyze-archive: upload size and number of Python files
+ARCHIVE_MAX_BYTES = int(os.getenv("ARCHIVE_MAX_BYTES", 100 * 1024 * 1024))
+ARCHIVE_MAX_FILES = int(os.getenv("ARCHIVE_MAX_FILES", 10000))
+
+# Uploads larger than this are spooled to disk instead of memory
+ARCHIVE_SPOOL_BYTES = 1024 * 1024
+
+# Seconds a live session waits for further edits before analyzing
+LIVE_DEBOUNCE = float(os.getenv("LIVE_DEBOUNCE", 0.3))
+
+# Cache results by source hash; CACHE_DIR enables the on-disk tier
+result_cache = ResultCache(
+    max_entries=int(os.getenv("CACHE_SIZE", 1024)),
+    cache_dir=os.getenv("CACHE_DIR") or None,
+)
+
+# Profiling: clients holding PROFILE_TOKEN get a profile of their request
+# (X-Profile header or ?profile=); PROFILE_SAMPLE_RATE profiles that
+# fraction of analyses into rotating files in PROFILE_DIR
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+profile_store = ProfileStore(os.getenv("PROFILE_DIR", "profiles"), int(os.getenv("PROFILE_MAX_FILES", 100)))
+
+# Request and per-stage metrics served on /metrics; METRICS_ENABLED=0 skips
+# recording (stage timings are then only measured when a request asks)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "path"))
+REQUESTS = metrics.counter("http_requests_total", "HTTP requests by response status", ("method", "path", "status"))
+STAGE_LATENCY = metrics.histogram("analysis_stage_seconds", "Time spent in each analysis stage", ("stage",))
+SOURCE_BYTES = metrics.counter("analysis_source_bytes_total", "Bytes of source code submitted for analysis")
+ANALYSES = metrics.counter("analysis_results_total", "Analyzed sources by outcome", ("outcome",))
+CACHE_EVENTS = metrics.counter("result_cache_events_total", "Result cache hits, misses and evictions", ("event",))
+CACHE_ENTRIES = metrics.gauge("result_cache_entries", "Results held in the memory cache")
+JOBS = metrics.counter("analysis_jobs_total", "Background jobs by event", ("event",))
+JOB_QUEUE_DEPTH = metrics.gauge("analysis_job_queue_depth", "Jobs waiting for a job worker")
+LIVE_SESSIONS = metrics.gauge("live_sessions", "Open live analysis WebSocket sessions")
+LIVE_ANALYSES = metrics.counter("live_analyses_total", "Live analyses by outcome", ("outcome",))
+PROFILES = metrics.counter("analysis_profiles_total", "Profiled analyses by trigger", ("trigger",))
+MODEL_SWAPS = metrics.counter("model_swaps_total", "Retrained models swapped in")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and record their latency per route"""
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        path = _route_path(request)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, method=request.method, path=path)
+        REQUESTS.inc(method=request.method, path=path, status=str(status))
+
+
+def _route_path(request: Request) -> str:
+    """Route template of a request, keeping metric labels bounded"""
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+def record_outcome(code: Source, result: Any, timings: Optional[Dict[str, float]] = None):
+    """Update the analysis counters and stage histograms for one source"""
+    if not METRICS_ENABLED:
+        return
+    SOURCE_BYTES.inc(source_size(code))
+    if isinstance(result, BudgetExceeded):
+        outcome = f"budget_{result.budget}"
+    elif isinstance(result, BaseException):
+        outcome = "failed"
+    elif result["metrics"].get("error") == "Syntax error in code":
+        outcome = "syntax_error"
+    elif "error" in result["metrics"]:
+        outcome = "analysis_error"
+    else:
+        outcome = "ok"
+    ANALYSES.inc(outcome=outcome)
+    for stage, seconds in (timings or {}).items():
+        STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+@app.exception_handler(BudgetExceeded)
+async def budget_exceeded_handler(request: Request, exc: BudgetExceeded):
+    """Structured response for sources over the size, time or memory budget"""
+    status_code = 413 if exc.budget == "source_size" else 422
+    return JSONResponse(exc.to_dict(), status_code=status_code)
+
+
+async def load_models() -> Tuple[Any, Any]:
+    """Analyzer and predictor, waiting for the warm-up if necessary"""
+    try:
+        return await warmup.models(timeout=WARMUP_TIMEOUT)
+    except NotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+def analysis_version(analyzer: Any, predictor: Any) -> str:
+    """Version of the analyzer and model that produced a result"""
+    return f"{analyzer.version}:{predictor.version}"
+
+
+def install_model(predictor: Any):
+    """Serve a retrained model from now on, dropping the results cached for the old one"""
+    warmup.replace_predictor(predictor)
+    result_cache.set_version(analysis_version(warmup.analyzer, predictor))
+    MODEL_SWAPS.inc()
+
+
+async def source_key(code: Source) -> str:
+    """Cache key of a source; files are hashed in blocks off the event loop"""
+    if isinstance(code, SourceFile):
+        return await run_in_threadpool(result_cache.file_key, code.path)
+    return result_cache.key(code)
+
+
+async def analysis_etag(code: Source, *parts: str) -> str:
+    """Entity tag of the analysis of code by the current analyzer and model"""
+    code_analyzer, ml_predictor = await load_models()
+    result_cache.set_version(analysis_version(code_analyzer, ml_predictor))
+    return make_etag(await source_key(code), *parts)
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already holds the representation with this tag"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def profile_requested(request: Request) -> bool:
+    """
+    Whether the request asks to be profiled
+    
+    Raises:
+        HTTPException: 403 if profiling is disabled or the token is wrong
+    """
+    token = request.headers.get("x-profile") or request.query_params.get("profile")
+    if token is None:
+        return False
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling is disabled")
+    if not hmac.compare_digest(token.encode('utf-8'), PROFILE_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+    return True
+
+
+async def run_analysis(code: Source, timings: Optional[Dict[str, Any]] = None,
+                       profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run the full analysis pipeline, reusing cached results for known sources
+    
+    Args:
+        code: Python source code as string, or a file holding it
+        timings: If given, filled with the per-stage timings of this request
+        profile: If given, the source is analyzed again under the profiler
+            and this is filled with the report
+        
+    Returns:
+        Metrics, ML prediction, suggestions and overall score
+        
+    Raises:
+        BudgetExceeded: If the source is too large or its analysis ran out
+            of time or memory
+    """
+    start = time.perf_counter()
+    try:
+        check_source_size(code, MAX_SOURCE_BYTES)
+    except BudgetExceeded as e:
+        record_outcome(code, e)
+        raise
+    code_analyzer, ml_predictor = await load_models()
+    
+    # Results computed by an older analyzer or model are dropped
+    version = analysis_version(code_analyzer, ml_predictor)
+    result_cache.set_version(version)
+    key = await source_key(code)
+    result = None if profile is not None else result_cache.get(key)
+    stages = None
+    if result is None:
+        sampled = profile is None and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        try:
+            result = await analysis_pool.run(code, code_analyzer, ml_predictor,
+                                             timed=METRICS_ENABLED or timings is not None,
+                                             profiled=sampled or profile is not None)
+        except Exception as e:
+            record_outcome(code, e)
+            raise
+        stages = result.pop("timings", None)
+        report = result.pop("profile", None)
+        # Unless a retrained model was swapped in meanwhile
+        if result_cache.version == version:
+            result_cache.put(key, result)
+        record_outcome(code, result, stages)
+        if profile is not None:
+            profile.update(report)
+            PROFILES.inc(trigger="request")
+        elif sampled:
+            try:
+                await run_in_threadpool(profile_store.write, report, key[:16])
+                PROFILES.inc(trigger="sample")
+            except OSError:
+                pass
+    
+    if timings is not None:
+        timings.update({
+            "cached": stages is None,
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in (stages or {}).items()},
+            "total_ms": round((time.perf_counter() - start) * 1000, 3)
+        })
+    return result
+
+
+async def run_batch_analysis(codes: List[str]) -> List[Any]:
+    """
+    Run the pipeline for many sources, scoring all cache misses in one model call
+    
+    Args:
+        codes: Python source codes
+        
+    Returns:
+        One entry per source, either the analysis result or the exception
+        raised while analyzing it
+    """
+    code_analyzer, ml_predictor = await load_models()
+    version = analysis_version(code_analyzer, ml_predictor)
+    result_cache.set_version(version)
+    keys = [result_cache.key(code) for code in codes]
+    results: List[Any] = [result_cache.get(key) for key in keys]
+    for i, code in enumerate(codes):
+        try:
+            check_source_size(code, MAX_SOURCE_BYTES)
+        except BudgetExceeded as e:
+            results[i] = e
+            record_outcome(code, e)
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        computed = await analysis_pool.run_batch([codes[i] for i in missing], code_analyzer, ml_predictor)
+        for i, result in zip(missing, computed):
+            results[i] = result
+            record_outcome(codes[i], result)
+            if not isinstance(result, BaseException) and result_cache.version == version:
+                result_cache.put(keys[i], result)
+    return results
 
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """Serve the main HTML page"""
-    html_file = Path(__file__).parent / "static" / "index.html"
-    if html_file.exists():
-        return html_file.read_text(encoding='utf-8')
-    return "<h1>Smart Code Review Assistant</h1><p>Upload code to analyze!</p>"
+    page = index_page.get()
+    if page is None:
+        return "<h1>Smart Code Review Assistant</h1><p>Upload code to analyze!</p>"
+    content, etag = page
+    return not_modified(request, etag) or HTMLResponse(content, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 
 @app.post("/api/analyze")
-async def analyze_code(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def analyze_code(request: Request, response: Response, file: UploadFile = File(...),
+                       timings: bool = False) -> Dict[str, Any]:
     """
     Analyze uploaded Python code file
     
+    Requests with an ``X-Profile`` header (or ``profile`` query parameter)
+    holding PROFILE_TOKEN get a ``profile`` block with the collapsed stacks
+    and call tree of the analysis. Files over the streaming threshold are
+    never read into memory whole: they are copied to disk and analyzed
+    from there in streaming mode.
+    
     Args:
         file: Uploaded Python file
+        timings: Add a ``timings`` block with per-stage durations
         
     Returns:
-        Analysis results including metrics, suggestions, and ML predictions
+        Analysis results including metrics, suggestions, and ML predictions,
+        or 304 if If-None-Match holds the ETag of this result
     """
     if not file.filename.endswith('.py'):
         raise HTTPException(status_code=400, detail="Only Python files (.py) are supported")
     
+    code: Source = ""
     try:
-        # Read file content
-        content = await file.read()
-        code = content.decode('utf-8')
+        threshold = analysis_pool.streaming_threshold
+        if threshold and file.size is not None and file.size >= threshold:
+            await file.seek(0)
+            code = await run_in_threadpool(spool, file.file)
+        else:
+            # Read file content
+            content = await file.read()
+            code = content.decode('utf-8')
         
-        # Perform analysis
-        static_analysis = code_analyzer.analyze(code)
-        ml_prediction = ml_predictor.predict_quality(code, static_analysis)
-        suggestions = code_analyzer.get_suggestions(static_analysis)
+        # Timed and profiled responses differ on every request, so they carry no ETag
+        profile = {} if profile_requested(request) else None
+        if not timings and profile is None:
+            etag = await analysis_etag(code, file.filename)
+            cached = not_modified(request, etag)
+            if cached:
+                return cached
+            response.headers["ETag"] = etag
         
-        return {
-            "filename": file.filename,
-            "metrics": static_analysis,
-            "ml_prediction": ml_prediction,
-            "suggestions": suggestions,
-            "overall_score": ml_prediction.get("quality_score", 0)
-        }
+        # Perform analysis
+        stage_timings = {} if timings else None
+        result = {"filename": file.filename, **await run_analysis(code, stage_timings, profile)}
+        if timings:
+            result["timings"] = stage_timings
+        if profile is not None:
+            result["profile"] = profile
+        return result
     
+    except (HTTPException, BudgetExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing code: {str(e)}")
+    finally:
+        if isinstance(code, SourceFile):
+            os.unlink(code.path)
 
 
 @app.post("/api/analyze-text")
-async def analyze_code_text(code: dict) -> Dict[str, Any]:
+async def analyze_code_text(code: dict, request: Request, response: Response,
+                            timings: bool = False) -> Dict[str, Any]:
     """
     Analyze Python code from text input
     
+    Requests with an ``X-Profile`` header (or ``profile`` query parameter)
+    holding PROFILE_TOKEN get a ``profile`` block with the collapsed stacks
+    and call tree of the analysis.
+    
     Args:
         code: Dictionary with 'code' key containing Python code string
+        timings: Add a ``timings`` block with per-stage durations
         
     Returns:
-        Analysis results
+        Analysis results, or 304 if If-None-Match holds the ETag of this result
     """
     try:
         code_text = code.get("code", "")
         if not code_text:
             raise HTTPException(status_code=400, detail="No code provided")
         
-        # Perform analysis
-        static_analysis = code_analyzer.analyze(code_text)
-        ml_prediction = ml_predictor.predict_quality(code_text, static_analysis)
-        suggestions = code_analyzer.get_suggestions(static_analysis)
+        profile = {} if profile_requested(request) else None
+        if not timings and profile is None:
+            etag = await analysis_etag(code_text)
+            cached = not_modified(request, etag)
+            if cached:
+                return cached
+            response.headers["ETag"] = etag
         
-        return {
-            "metrics": static_analysis,
-            "ml_prediction": ml_prediction,
-            "suggestions": suggestions,
-            "overall_score": ml_prediction.get("quality_score", 0)
-        }
+        # Perform analysis
+        stage_timings = {} if timings else None
+        result = dict(await run_analysis(code_text, stage_timings, profile))
+        if timings:
+            result["timings"] = stage_timings
+        if profile is not None:
+            result["profile"] = profile
+        return result
     
+    except (HTTPException, BudgetExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing code: {str(e)}")
 
 
+async def _read_batch(request: Request) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Read (filename, code, error) entries from a multipart or JSON batch request"""
+    entries = []
+    content_type = request.headers.get("content-type", "")
+    
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        for upload in form.getlist("files"):
+            filename = getattr(upload, "filename", None) or ""
+            if not filename.endswith('.py'):
+                entries.append((filename, None, "Only Python files (.py) are supported"))
+                continue
+            try:
+                entries.append((filename, (await upload.read()).decode('utf-8'), None))
+            except UnicodeDecodeError:
+                entries.append((filename, None, "File is not valid UTF-8"))
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Expected multipart files or a JSON list")
+        items = payload.get("files") if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a list of {filename, code} objects")
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            filename = str(item.get("filename") or f"file_{index}.py")
+            code = item.get("code")
+            if not isinstance(code, str) or not code:
+                entries.append((filename, None, "No code provided"))
+            else:
+                entries.append((filename, code, None))
+    
+    if not entries:
+        raise HTTPException(status_code=400, detail="No files provided")
+    if len(entries) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_FILES} files per batch")
+    return entries
+
+
+@app.post("/api/analyze-batch")
+async def analyze_code_batch(request: Request) -> Dict[str, Any]:
+    """
+    Analyze many Python files in one request
+    
+    Accepts multipart form data with repeated ``files`` fields, or a JSON
+    list of ``{"filename": ..., "code": ...}`` objects (optionally wrapped
+    in ``{"files": [...]}``). A failing file is reported in its own entry
+    without affecting the rest of the batch.
+    
+    Returns:
+        Per-file results in request order plus error count
+    """
+    entries = await _read_batch(request)
+    valid = [i for i, (_, code, error) in enumerate(entries) if error is None]
+    
+    computed = await run_batch_analysis([entries[i][1] for i in valid])
+    outcomes: Dict[int, Any] = dict(zip(valid, computed))
+    
+    files = []
+    for i, (filename, _, error) in enumerate(entries):
+        result = outcomes.get(i)
+        if error is None and isinstance(result, BudgetExceeded):
+            files.append({"filename": filename, **result.to_dict()})
+            continue
+        if error is None and isinstance(result, BaseException):
+            error = f"Error analyzing code: {str(result) or type(result).__name__}"
+        if error is not None:
+            files.append({"filename": filename, "error": error})
+        else:
+            files.append({"filename": filename, **result})
+    
+    return {
+        "files": files,
+        "count": len(files),
+        "errors": sum("error" in entry for entry in files)
+    }
+
+
+async def _spool_archive(request: Request) -> tempfile.SpooledTemporaryFile:
+    """Copy an uploaded archive into a temporary file that spills to disk"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES)
+    size = 0
+    
+    def write(chunk: bytes):
+        nonlocal size
+        size += len(chunk)
+        if ARCHIVE_MAX_BYTES and size > ARCHIVE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Archives are limited to {ARCHIVE_MAX_BYTES} bytes")
+        spooled.write(chunk)
+    
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if not hasattr(upload, "read"):
+                raise HTTPException(status_code=400, detail="Expected an archive in the 'file' field")
+            while chunk := await upload.read(ARCHIVE_SPOOL_BYTES):
+                write(chunk)
+            await form.close()
+        else:
+            # Raw request body, e.g. curl --data-binary @project.tar.gz
+            async for chunk in request.stream():
+                write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    
+    if size == 0:
+        spooled.close()
+        raise HTTPException(status_code=400, detail="No archive provided")
+    return spooled
+
+
+def _file_entry(filename: str, task: "asyncio.Future") -> Dict[str, Any]:
+    """Result entry for one analyzed archive member or job file"""
+    try:
+        return {"filename": filename, **task.result()}
+    except BudgetExceeded as e:
+        return {"filename": filename, **e.to_dict()}
+    except HTTPException as e:
+        return {"filename": filename, "error": str(e.detail)}
+    except Exception as e:
+        return {"filename": filename, "error": f"Error analyzing code: {str(e) or type(e).__name__}"}
+
+
+async def _stream_archive(spooled: tempfile.SpooledTemporaryFile,
+                          members: Iterator[Tuple[str, Optional[str], Optional[str]]]) -> AsyncIterator[str]:
+    """Analyze archive members concurrently, yielding NDJSON lines as they finish"""
+    summary = ScanSummary()
+    max_in_flight = max(1, analysis_pool.workers) * 2
+    pending: Dict[asyncio.Future, str] = {}
+    
+    def emit(entry: Dict[str, Any]) -> str:
+        summary.add(entry)
+        return json.dumps(entry) + "\n"
+    
+    try:
+        count = 0
+        while True:
+            try:
+                # Decompressing a member is blocking I/O; keep it off the event loop
+                entry = await run_in_threadpool(next, members, None)
+            except Exception as e:
+                yield json.dumps({"error": f"Could not read archive: {e}"}) + "\n"
+                break
+            if entry is None:
+                break
+            
+            count += 1
+            if count > ARCHIVE_MAX_FILES:
+                yield json.dumps({"error": f"At most {ARCHIVE_MAX_FILES} files per archive"}) + "\n"
+                break
+            
+            filename, code, error = entry
+            if error is not None:
+                yield emit({"filename": filename, "error": error})
+                continue
+            pending[asyncio.ensure_future(run_analysis(code))] = filename
+            
+            if len(pending) >= max_in_flight:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield emit(_file_entry(pending.pop(task), task))
+        
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield emit(_file_entry(pending.pop(task), task))
+        
+        yield json.dumps({"summary": summary.to_dict()}) + "\n"
+    finally:
+        # Client disconnected or the stream failed: stop outstanding analyses
+        for task in pending:
+            task.cancel()
+        spooled.close()
+
+
+@app.post("/api/analyze-archive")
+async def analyze_archive(request: Request) -> StreamingResponse:
+    """
+    Analyze every Python file in a zip or tar archive
+    
+    Accepts the archive as multipart form data (``file`` field) or as the
+    raw request body. The upload is spooled to a temporary file, members are
+    read one at a time and analyzed concurrently, and results are streamed
+    back as NDJSON, one line per file as soon as it finishes, followed by a
+    ``{"summary": ...}`` line.
+    """
+    spooled = await _spool_archive(request)
+    members = iter_python_files(spooled, MAX_SOURCE_BYTES)
+    try:
+        # Read the first member now so an invalid archive is still a 400
+        first = await run_in_threadpool(next, members, None)
+    except UnsupportedArchive as e:
+        spooled.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    if first is not None:
+        members = itertools.chain([first], members)
+    
+    return StreamingResponse(_stream_archive(spooled, members), media_type="application/x-ndjson")
+
+
+async def run_job(job: Job):
+    """Analyze the files of a background job, recording each as it finishes"""
+    max_in_flight = max(1, analysis_pool.workers) * 2
+    pending: Dict[asyncio.Future, int] = {}
+    
+    try:
+        for index, (filename, code, error) in enumerate(job.items):
+            if error is not None:
+                job.record(index, {"filename": filename, "error": error})
+                continue
+            pending[asyncio.ensure_future(run_analysis(code))] = index
+            
+            if len(pending) >= max_in_flight:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = pending.pop(task)
+                    job.record(index, _file_entry(job.items[index][0], task))
+        
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                job.record(index, _file_entry(job.items[index][0], task))
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# Background jobs (see JOB_* variables); results are kept in memory
+job_queue = JobQueue(run_job)
+
+# Seconds between keep-alive comments on an idle job event stream
+JOB_EVENTS_KEEPALIVE = 15
+
+
+def _job_or_404(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: Request) -> JSONResponse:
+    """
+    Queue Python files for analysis in the background
+    
+    Accepts the same input as /api/analyze-batch and returns at once with
+    the job id. Progress and results are available from
+    ``/api/jobs/{id}`` (polling) or ``/api/jobs/{id}/events`` (SSE) until
+    JOB_RESULT_TTL seconds after the job finished. Answers 429 with a
+    Retry-After header when the queue is full, in jobs or in bytes of
+    source.
+    """
+    entries = await _read_batch(request)
+    try:
+        job = job_queue.submit(entries, size=sum(len(code) for _, code, _ in entries if code))
+    except QueueFull as e:
+        JOBS.inc(event="rejected")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    JOBS.inc(event="submitted")
+    
+    body = {
+        **job.to_dict(results=False),
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }
+    return JSONResponse(body, status_code=202, headers={"Location": body["status_url"]})
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str) -> Dict[str, Any]:
+    """Progress of a job, with the results of the files finished so far"""
+    return _job_or_404(job_id).to_dict()
+
+
+async def _job_events(job: Job, after: int) -> AsyncIterator[str]:
+    """Server-Sent Events for a job, starting after the given event index"""
+    position = after
+    while True:
+        # Also ends a stream resumed past the last event of a finished job
+        if job.finished and position >= len(job.events):
+            return
+        if not await job.wait(position, JOB_EVENTS_KEEPALIVE):
+            yield ": keepalive\n\n"
+            continue
+        for name, data in job.events[position:]:
+            position += 1
+            yield f"id: {position}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+            if name == "done":
+                return
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request) -> Response:
+    """
+    Stream job progress as Server-Sent Events
+    
+    Events: ``state`` when the job starts, ``file`` with the result of each
+    finished file and the progress so far, and a final ``done`` with the
+    job status. Reconnecting clients resume after their Last-Event-ID; one
+    that already received the ``done`` event gets 204, which stops
+    EventSource from reconnecting.
+    """
+    job = _job_or_404(job_id)
+    try:
+        after = max(0, int(request.headers.get("last-event-id", 0)))
+    except ValueError:
+        after = 0
+    if job.finished and after >= len(job.events):
+        return Response(status_code=204)
+    return StreamingResponse(_job_events(job, after), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def _live_analyze(websocket: WebSocket, document: LiveDocument, version: int):
+    """Analyze a live document once edits settle and push what changed"""
+    await asyncio.sleep(LIVE_DEBOUNCE)
+    code = document.text
+    if not code.strip():
+        return
+    try:
+        result = await run_analysis(code)
+    except asyncio.CancelledError:
+        LIVE_ANALYSES.inc(outcome="superseded")
+        raise
+    except BudgetExceeded as e:
+        error = e.to_dict()
+    except HTTPException as e:
+        error = {"error": str(e.detail)}
+    except Exception as e:
+        error = {"error": f"Error analyzing code: {str(e) or type(e).__name__}"}
+    else:
+        error = None
+    
+    if version != document.version:
+        return
+    if error is not None:
+        LIVE_ANALYSES.inc(outcome="error")
+        # The client shows the error; send the next result in full
+        document.reset()
+        await websocket.send_json({"type": "error", "version": version, **error})
+        return
+    
+    changes = document.update(result)
+    LIVE_ANALYSES.inc(outcome="changed" if changes else "unchanged")
+    if changes:
+        await websocket.send_json({"type": "analysis", "version": version, "changes": changes})
+    else:
+        # Acknowledges the edit without results, see live_analysis
+        await websocket.send_json({"type": "unchanged", "version": version})
+
+
+@app.websocket("/api/live")
+async def live_analysis(websocket: WebSocket):
+    """
+    As-you-type analysis for the web editor
+    
+    The client sends debounced edits as JSON, either the whole text
+    (``{"version": 1, "code": "..."}``) or code point range replacements
+    (``{"version": 2, "changes": [{"start": 0, "end": 0, "text": "..."}]}``).
+    Edits arriving while an analysis runs cancel it. After each analysis
+    the server sends ``{"type": "analysis", "version", "changes"}`` with
+    only the sections and metrics that changed. An analysis that changed
+    nothing is acknowledged with just ``{"type": "unchanged", "version"}``,
+    without results: the client needs it to tell "nothing changed" from
+    "still analyzing", and it is sent at most once per debounced edit.
+    Changes are relative to the previous analysis message, which may be
+    for an older version than the client's, so clients merge every one.
+    Edits that do not apply are answered with ``{"type": "resync"}``, after
+    which the client sends the whole text.
+    """
+    await websocket.accept()
+    document = LiveDocument()
+    task: Optional[asyncio.Task] = None
+    LIVE_SESSIONS.inc()
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                document.apply(message)
+            except (ValueError, EditError) as e:
+                await websocket.send_json({"type": "resync", "version": document.version, "detail": str(e)})
+                continue
+            
+            # A newer document supersedes the analysis in flight
+            if task is not None:
+                task.cancel()
+            task = asyncio.ensure_future(_live_analyze(websocket, document, document.version))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if task is not None:
+            task.cancel()
+        LIVE_SESSIONS.inc(-1)
+
+
+@app.post("/api/feedback", status_code=202)
+async def submit_feedback(feedback: dict) -> Dict[str, Any]:
+    """
+    Record whether a source is good or bad code, for retraining the model
+    
+    Enough new feedback starts a retraining in the background; the new
+    model serves requests once it passed validation (see /api/model).
+    
+    Args:
+        feedback: Dictionary with 'code' and 'label' ("good" or "bad")
+        
+    Returns:
+        Stored and not yet trained-on samples, and whether a retraining runs
+    """
+    code = feedback.get("code")
+    if not isinstance(code, str) or not code:
+        raise HTTPException(status_code=400, detail="No code provided")
+    if feedback.get("label") not in LABELS:
+        raise HTTPException(status_code=400, detail=f"Label must be one of {', '.join(LABELS)}")
+    check_source_size(code, MAX_SOURCE_BYTES)
+    
+    count = await run_in_threadpool(feedback_store.add, code, feedback["label"])
+    if warmup.ready:
+        retrainer.trigger(warmup.predictor)
+    return {"feedback": count, "pending": retrainer.pending, "retraining": retrainer.running}
+
+
+@app.get("/api/model")
+async def model_info() -> Dict[str, Any]:
+    """Version of the model in service and the state of retraining"""
+    code_analyzer, ml_predictor = await load_models()
+    return {
+        "model_version": ml_predictor.version,
+        "analysis_version": analysis_version(code_analyzer, ml_predictor),
+        "source": ml_predictor.source,
+        "retraining": retrainer.status()
+    }
+
+
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: answers as soon as the server is up"""
     return {"status": "healthy", "version": "1.0.0"}
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness check: 503 until the models and analysis workers are loaded"""
+    ready = warmup.ready and analysis_pool.warm
+    body = {
+        "status": "ready" if ready else ("failed" if warmup.state == "failed" else "starting"),
+        "warmup": warmup.status(),
+        "workers": analysis_pool.stats()
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Counters and latency histograms in the Prometheus text format"""
+    stats = result_cache.stats()
+    for event in ("hits", "disk_hits", "misses", "evictions"):
+        CACHE_EVENTS.set(stats[event], event=event)
+    CACHE_ENTRIES.set(stats["entries"])
+    JOB_QUEUE_DEPTH.set(job_queue.queued)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/jobs")
+async def job_queue_stats():
+    """Job queue configuration and occupancy"""
+    return job_queue.stats()
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Result cache hit/miss counters"""
+    return result_cache.stats()
+
+
 if __name__ == "__main__":
     import os
     port = int(os.getenv("PORT", 8000))
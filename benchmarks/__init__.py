@@ -0,0 +1 @@
+"""Benchmark suite for the analyzer, model and API"""
@@ -0,0 +1,119 @@
+"""
+Synthetic Benchmark Corpus
+Generates deterministic Python sources of different shapes and sizes
+"""
+
+import random
+from typing import Dict, List
+
+
+def _expression(rng: random.Random, names: List[str]) -> str:
+    """A small arithmetic or boolean expression"""
+    left, right = rng.choice(names), rng.choice(names)
+    op = rng.choice(["+", "-", "*", "//", "%"])
+    if rng.random() < 0.3:
+        return f"{left} {op} {rng.randint(2, 999)}"
+    return f"{left} {op} {right}"
+
+
+def _condition(rng: random.Random, names: List[str]) -> str:
+    left, right = rng.choice(names), rng.choice(names)
+    if rng.random() < 0.3:
+        return f"{left} > {right} and not {right}"
+    return f"{left} {rng.choice(['<', '>', '==', '!='])} {right}"
+
+
+def _body(rng: random.Random, names: List[str], indent: int, statements: int, depth: int) -> List[str]:
+    """Lines of a block with assignments, branches and loops up to depth"""
+    pad = "    " * indent
+    lines = []
+    for _ in range(statements):
+        roll = rng.random()
+        if depth > 0 and roll < 0.2:
+            lines.append(f"{pad}if {_condition(rng, names)}:")
+            lines.extend(_body(rng, names, indent + 1, max(1, statements // 2), depth - 1))
+            if rng.random() < 0.4:
+                lines.append(f"{pad}else:")
+                lines.extend(_body(rng, names, indent + 1, 1, depth - 1))
+        elif depth > 0 and roll < 0.3:
+            lines.append(f"{pad}for item in range({rng.choice(names)}):")
+            lines.extend(_body(rng, names + ["item"], indent + 1, max(1, statements // 2), depth - 1))
+        elif roll < 0.4:
+            lines.append(f"{pad}# {rng.choice(['update', 'adjust', 'check', 'combine'])} the running values")
+            lines.append(f"{pad}{rng.choice(names)} = {_expression(rng, names)}")
+        elif roll < 0.5:
+            lines.append(f"{pad}values = [{rng.choice(names)} for {rng.choice(names)} in range(10) if {_condition(rng, names)}]")
+        else:
+            lines.append(f"{pad}{rng.choice(names)} = {_expression(rng, names)}")
+    return lines
+
+
+def _function(rng: random.Random, name: str, indent: int, statements: int, depth: int,
+              method: bool = False) -> List[str]:
+    pad = "    " * indent
+    params = [f"arg{i}" for i in range(rng.randint(1, 7))]
+    signature = ", ".join((["self"] if method else []) + params)
+    lines = [f"{pad}def {name}({signature}):"]
+    if rng.random() < 0.6:
+        lines.append(f'{pad}    """Compute {name.replace("_", " ")}"""')
+    lines.append(f"{pad}    total = 0")
+    lines.extend(_body(rng, params + ["total"], indent + 1, statements, depth))
+    lines.append(f"{pad}    return total")
+    return lines
+
+
+def generate_module(seed: int, functions: int, classes: int = 0, statements: int = 6,
+                    depth: int = 3) -> str:
+    """
+    Generate a module of top-level functions and classes
+
+    Args:
+        seed: Random seed; the same arguments always produce the same source
+        functions: Number of top-level functions
+        classes: Number of classes, each with a few methods
+        statements: Statements per function body
+        depth: Maximum nesting of branches and loops
+
+    Returns:
+        Python source code
+    """
+    rng = random.Random(seed)
+    lines = ['"""Generated benchmark module"""', "", "import os", "from typing import List", ""]
+    for index in range(classes):
+        lines.append(f"class Component{index}:")
+        lines.append(f'    """Generated component {index}"""')
+        lines.append("")
+        for method in range(rng.randint(2, 5)):
+            lines.extend(_function(rng, f"method_{method}", 1, statements, depth, method=True))
+            lines.append("")
+        lines.append("")
+    for index in range(functions):
+        lines.extend(_function(rng, f"function_{index}", 0, statements, depth))
+        lines.append("")
+        lines.append("")
+    lines.extend(['if __name__ == "__main__":', "    function_0(1)" if functions else "    pass", ""])
+    return "\n".join(lines)
+
+
+def generate_deep_nesting(depth: int) -> str:
+    """A single function with branches and loops nested depth levels deep"""
+    headers = ["if value > {level}:", "for item in range(value):", "while value < {level}:"]
+    lines = ["def nested(value):"]
+    for level in range(depth):
+        pad = "    " * (level + 1)
+        lines.append(pad + headers[level % len(headers)].format(level=level * 10))
+        lines.append(f"{pad}    value = value + {level}")
+    lines.append("    " * (depth + 1) + "return value")
+    lines.append("    return 0")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus() -> Dict[str, str]:
+    """The named benchmark cases, identical on every run"""
+    return {
+        "small": generate_module(seed=1, functions=3, classes=1),
+        "medium": generate_module(seed=2, functions=60, classes=8),
+        "huge": generate_module(seed=3, functions=250, classes=30, statements=8),
+        "deep_nesting": generate_deep_nesting(60),
+        "many_functions": generate_module(seed=4, functions=3000, statements=1, depth=0),
+    }
@@ -0,0 +1,222 @@
+"""
+Benchmark Runner
+Measures time and peak memory of each analysis stage on the synthetic corpus
+
+Usage:
+    python -m benchmarks.run [--repeat N] [--cases small,huge] [--output results.json]
+    python -m benchmarks.run --baseline benchmarks/baseline.json [--threshold 0.25]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.corpus import generate_corpus
+from src import __version__
+
+STAGES = ("analyze", "analyze_cached", "predict_quality", "get_suggestions",
+          "api_analyze_text", "api_analyze")
+
+# Differences below these floors are treated as noise when comparing
+MIN_TIME_MS = 1.0
+MIN_MEMORY_KIB = 64
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    Time fn over repeat runs and record its peak traced memory in one extra run
+
+    Args:
+        fn: Stage to measure
+        repeat: Number of timed runs
+        setup: Called (untimed) before every run, e.g. to clear caches
+
+    Returns:
+        Median and minimum wall time in milliseconds and peak memory in KiB
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Memory is traced separately because tracing slows the stage down
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+
+def _api_client():
+    """In-process client for the app with inline analysis and no result cache"""
+    from fastapi.testclient import TestClient
+    import app as app_module
+    from src.cache import ResultCache
+    from src.pipeline import AnalysisPool
+
+    app_module.analysis_pool = AnalysisPool(workers=0)
+    app_module.result_cache = ResultCache(max_entries=0)
+    client = TestClient(app_module.app)
+    client.__enter__()
+
+    deadline = time.monotonic() + 120
+    while client.get("/api/ready").status_code != 200:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Application did not become ready")
+        time.sleep(0.05)
+    return client, app_module.warmup
+
+
+def run_benchmarks(cases: Optional[List[str]] = None, stages: Optional[List[str]] = None,
+                   repeat: int = 5) -> Dict[str, Any]:
+    """
+    Measure every stage on every corpus case
+
+    Returns:
+        Machine-readable results: run metadata plus per-case, per-stage
+        measurements
+    """
+    from src.code_analyzer import CodeAnalyzer
+    from src.ml_models import CodeQualityPredictor
+
+    corpus = generate_corpus()
+    cases = cases or list(corpus)
+    stages = stages or list(STAGES)
+
+    predictor = CodeQualityPredictor()
+    client = warmup = None
+    if any(stage.startswith("api_") for stage in stages):
+        client, warmup = _api_client()
+
+    def clear_api_caches():
+        warmup.analyzer.unit_cache.invalidate()
+
+    results: Dict[str, Any] = {}
+    try:
+        for case in cases:
+            code = corpus[case]
+            analyzer = CodeAnalyzer()
+            # The pipeline hands the analysis' token counts to the predictor
+            metrics, tokens = analyzer.analyze_with_tokens(code)
+            # Every memoized unit is a hit when the same source is analyzed again
+            cached_analyzer = CodeAnalyzer()
+            cached_analyzer.analyze(code)
+
+            runs = {
+                "analyze": (lambda: CodeAnalyzer().analyze(code), None),
+                "analyze_cached": (lambda: cached_analyzer.analyze(code), None),
+                "predict_quality": (lambda: predictor.predict_quality(code, metrics, tokens=tokens), None),
+                "get_suggestions": (lambda: analyzer.get_suggestions(metrics), None),
+                "api_analyze_text": (lambda: client.post("/api/analyze-text", json={"code": code}),
+                                     clear_api_caches),
+                "api_analyze": (lambda: client.post("/api/analyze", files={"file": ("bench.py", code)}),
+                                clear_api_caches),
+            }
+            results[case] = {
+                "lines": len(code.splitlines()),
+                "bytes": len(code.encode('utf-8')),
+                "stages": {stage: measure(runs[stage][0], repeat, runs[stage][1]) for stage in stages}
+            }
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+
+    return {
+        "meta": {
+            "version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Find stages that got slower or use more memory than the baseline
+
+    A stage regresses when its median time or peak memory grows by more
+    than threshold (0.25 = 25%) and by more than the noise floor.
+
+    Returns:
+        One entry per regressed measurement
+    """
+    regressions = []
+    for case, result in current["results"].items():
+        base_stages = baseline.get("results", {}).get(case, {}).get("stages", {})
+        for stage, values in result["stages"].items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            for metric, floor in (("median_ms", MIN_TIME_MS), ("peak_kib", MIN_MEMORY_KIB)):
+                old, new = base[metric], values[metric]
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append({
+                        "case": case,
+                        "stage": stage,
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "ratio": round(new / old, 2) if old else None
+                    })
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite, write the results and compare with a baseline"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage (default: 5)")
+    parser.add_argument("--cases", default=None, help="comma-separated corpus cases (default: all)")
+    parser.add_argument("--stages", default=None, help=f"comma-separated stages (default: {','.join(STAGES)})")
+    parser.add_argument("--output", default=None, help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative slowdown or memory growth (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        cases=args.cases.split(",") if args.cases else None,
+        stages=args.stages.split(",") if args.stages else None,
+        repeat=max(1, args.repeat)
+    )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding='utf-8')
+    else:
+        print(output)
+
+    if not args.baseline:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+    regressions = compare(results, baseline, args.threshold)
+    for entry in regressions:
+        print(f"REGRESSION {entry['case']}/{entry['stage']} {entry['metric']}: "
+              f"{entry['baseline']} -> {entry['current']} (x{entry['ratio']})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Shared fixtures for the API tests
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from src.cache import ResultCache
+from src.pipeline import AnalysisPool
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    """
+    Factory of test clients running the application lifespan
+
+    Analysis runs inline and starts from an empty result cache. Keyword
+    arguments replace further attributes of the app module for the test
+    (e.g. ``LIVE_DEBOUNCE=0``), including ``analysis_pool`` and
+    ``result_cache`` themselves.
+    """
+    clients = []
+
+    def make(**attributes) -> TestClient:
+        attributes.setdefault("analysis_pool", AnalysisPool(workers=0))
+        attributes.setdefault("result_cache", ResultCache())
+        for name, value in attributes.items():
+            monkeypatch.setattr(app_module, name, value)
+        client = TestClient(app_module.app)
+        client.__enter__()
+        clients.append(client)
+        return client
+
+    yield make
+    for client in reversed(clients):
+        client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def client(app_client) -> TestClient:
+    """Test client with inline analysis and an empty result cache"""
+    return app_client()
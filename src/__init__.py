@@ -1,4 +1,4 @@
 """Smart Code Review Assistant - ML-powered code analysis tool"""
 
-__version__ = "1.0.0"
+__version__ = "1.2.0"
 __author__ = "Your Name"
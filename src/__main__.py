@@ -0,0 +1,153 @@
+"""
+Command-line interface for the Smart Code Review Assistant
+
+Usage:
+    python -m src scan <path> [--workers N] [--chunk-size N] [--clones] [--clone-index PATH] [--store DIR]
+    python -m src report <store> [--worst N] [--by-directory METRIC] [--depth N]
+    python -m src history <repo> [--rev REV] [--max-count N] [--first-parent] [--workers N]
+    python -m src build-model [--output PATH]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from .clones import CloneIndex
+from .history import history, HistoryError
+from .ml_models import CodeQualityPredictor
+from .scanner import scan, ScanSummary
+from .store import MetricsStore, NUMERIC_COLUMNS
+
+
+def _scan_command(args: argparse.Namespace) -> int:
+    """Stream one JSON line per file, then the summary"""
+    summary = ScanSummary()
+    out = sys.stdout
+    clone_index = None
+    if args.clone_index and os.path.exists(args.clone_index):
+        clone_index = CloneIndex.load(args.clone_index)
+    elif args.clones or args.clone_index:
+        clone_index = CloneIndex()
+
+    store = MetricsStore() if args.store else None
+
+    scanned = set()
+    for result in scan(args.path, workers=args.workers, chunk_size=args.chunk_size, clone_index=clone_index):
+        summary.add(result)
+        scanned.add(result["path"])
+        if store is not None:
+            store.append(result["path"], result)
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+    out.write(json.dumps({"summary": summary.to_dict()}) + "\n")
+
+    if store is not None:
+        store.save(args.store)
+
+    if args.clone_index:
+        # Files deleted since the index was saved are no longer clones
+        root = os.path.join(args.path, "")
+        for path in clone_index.paths() - scanned:
+            if path.startswith(root):
+                clone_index.remove(path)
+        clone_index.save(args.clone_index)
+    return 0
+
+
+def _report_command(args: argparse.Namespace) -> int:
+    """Print aggregates of a metrics store saved by scan --store"""
+    try:
+        store = MetricsStore.load(args.store)
+    except (OSError, ValueError) as e:
+        print(f"error: cannot open store: {e}", file=sys.stderr)
+        return 1
+    report = store.summary(args.worst)
+    if args.by_directory:
+        report["by_directory"] = store.group_by_directory(args.by_directory, args.depth)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def _history_command(args: argparse.Namespace) -> int:
+    """Stream one JSON line per commit, oldest first, then the totals"""
+    out = sys.stdout
+    blobs = {}
+    commits = 0
+    try:
+        for summary in history(args.repo, rev=args.rev, workers=args.workers, chunk_size=args.chunk_size,
+                               max_count=args.max_count, first_parent=args.first_parent, blobs=blobs):
+            commits += 1
+            out.write(json.dumps(summary) + "\n")
+            out.flush()
+    except HistoryError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    out.write(json.dumps({"summary": {"commits": commits, "blobs_analyzed": len(blobs)}}) + "\n")
+    return 0
+
+
+def _build_model_command(args: argparse.Namespace) -> int:
+    """Train the quality model and save it as the artifact loaded at startup"""
+    predictor = CodeQualityPredictor(model_path=args.output, load=False)
+    path = predictor.save()
+    print(f"Saved model {predictor.version} to {path}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Parse arguments and run the selected command"""
+    parser = argparse.ArgumentParser(prog="python -m src", description="Smart Code Review Assistant")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="analyze every .py file under a directory (NDJSON output)")
+    scan_parser.add_argument("path", help="directory or file to scan")
+    scan_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: available CPUs)")
+    scan_parser.add_argument("--chunk-size", type=int, default=16, help="files analyzed per worker task")
+    scan_parser.add_argument("--clones", action="store_true",
+                             help="also report functions duplicated across files")
+    scan_parser.add_argument("--clone-index", default=None,
+                             help="clone index file to update (implies --clones)")
+    scan_parser.add_argument("--store", default=None,
+                             help="also save the results as a columnar metrics store in this directory")
+    scan_parser.set_defaults(handler=_scan_command)
+
+    report_parser = commands.add_parser("report", help="percentiles, worst files and per-directory means "
+                                                       "of a saved metrics store")
+    report_parser.add_argument("store", help="directory written by scan --store")
+    report_parser.add_argument("--worst", type=int, default=10, help="number of worst files listed")
+    report_parser.add_argument("--by-directory", default=None, choices=[name for name, _, _ in NUMERIC_COLUMNS],
+                               metavar="METRIC", help="mean of a metric per directory")
+    report_parser.add_argument("--depth", type=int, default=None,
+                               help="group by the first N path components")
+    report_parser.set_defaults(handler=_report_command)
+
+    history_parser = commands.add_parser("history", help="quality of every commit of a local git repository "
+                                                         "(NDJSON output)")
+    history_parser.add_argument("repo", help="path of a local git repository")
+    history_parser.add_argument("--rev", default="HEAD", help="revision or range to walk (default: HEAD)")
+    history_parser.add_argument("--max-count", type=int, default=None, help="only the newest N commits")
+    history_parser.add_argument("--first-parent", action="store_true", help="follow only the first parent of merges")
+    history_parser.add_argument("--workers", type=int, default=None,
+                                help="worker processes (default: available CPUs, 0 analyzes inline)")
+    history_parser.add_argument("--chunk-size", type=int, default=16, help="file versions analyzed per worker task")
+    history_parser.set_defaults(handler=_history_command)
+
+    build_parser = commands.add_parser("build-model", help="train the quality model and save the artifact")
+    build_parser.add_argument("--output", default=None,
+                              help="artifact path (default: MODEL_PATH or models/code_quality.joblib)")
+    build_parser.set_defaults(handler=_build_model_command)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Output closed early (e.g. piped into head)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
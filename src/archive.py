@@ -0,0 +1,85 @@
+"""
+Archive Module
+Lazily reads the Python files of an uploaded zip or tar archive
+"""
+
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from .scanner import SKIP_DIRS
+
+
+class UnsupportedArchive(ValueError):
+    """Raised when an upload is neither a zip nor a (compressed) tar archive"""
+
+
+def _wanted(name: str) -> bool:
+    """Python files outside of VCS, cache and virtualenv directories"""
+    path = PurePosixPath(name)
+    if path.suffix != ".py":
+        return False
+    return not any(part in SKIP_DIRS or part.endswith(".egg-info") for part in path.parts[:-1])
+
+
+def _decode(data: bytes, max_bytes: int) -> Tuple[Optional[str], Optional[str]]:
+    """Source text of a member, or an error if it is too large or not UTF-8"""
+    if max_bytes and len(data) > max_bytes:
+        return None, f"Source is larger than {max_bytes} bytes"
+    try:
+        return data.decode('utf-8'), None
+    except UnicodeDecodeError:
+        return None, "File is not valid UTF-8"
+
+
+def iter_python_files(fileobj: BinaryIO, max_bytes: int = 0) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Yield (name, code, error) for every Python file in an archive
+
+    Members are read one at a time, so at most one file (capped at
+    max_bytes) is held in memory regardless of the archive size.
+
+    Args:
+        fileobj: Seekable binary file containing a zip or tar archive
+        max_bytes: Largest member read (0 for no limit)
+
+    Raises:
+        UnsupportedArchive: If the file is not a readable archive
+    """
+    # Read one byte past the limit to detect oversized members
+    read_size = max_bytes + 1 if max_bytes else -1
+
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _wanted(info.filename):
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        data = member.read(read_size)
+                except (zipfile.BadZipFile, NotImplementedError, RuntimeError, OSError) as e:
+                    yield info.filename, None, f"Could not read file: {e}"
+                    continue
+                yield (info.filename, *_decode(data, max_bytes))
+        return
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode="r:*")
+    except (tarfile.TarError, OSError, EOFError) as e:
+        raise UnsupportedArchive(f"Expected a zip or tar archive: {e}")
+
+    with archive:
+        # Iterating the TarFile reads headers lazily, one member at a time
+        for info in archive:
+            if not info.isfile() or not _wanted(info.name):
+                continue
+            member = archive.extractfile(info)
+            if member is None:
+                continue
+            with member:
+                data = member.read(read_size)
+            yield (info.name, *_decode(data, max_bytes))
@@ -0,0 +1,162 @@
+"""
+Result Cache Module
+Content-addressed cache for analysis results with LRU eviction and an optional disk tier
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+
+class ResultCache:
+    """
+    Bounded in-memory LRU cache with an optional on-disk tier
+
+    Keys are SHA-256 digests of the source code combined with a version
+    string, so results are only reused for identical content analyzed by
+    the same analyzer and model version. Changing the version through
+    ``set_version`` drops every stored result. Without a ``version``, a
+    cache with a disk tier keeps the version stored there, so its results
+    survive a restart until the loaded model turns out to differ.
+    """
+
+    VERSION_FILE = "VERSION"
+
+    def __init__(self, max_entries: int = 1024, cache_dir: Optional[Union[str, Path]] = None,
+                 version: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.version = ""
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            version_file = self.cache_dir / self.VERSION_FILE
+            if version_file.exists():
+                self.version = version_file.read_text(encoding='utf-8').strip()
+        if version is not None:
+            self.set_version(version)
+
+    @staticmethod
+    def make_key(code: str, version: str = "") -> str:
+        """Content hash of the source code for the given version"""
+        digest = hashlib.sha256(version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(code.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def key(self, code: str) -> str:
+        """Cache key of the source code for the current version"""
+        return self.make_key(code, self.version)
+
+    def file_key(self, path: Union[str, Path]) -> str:
+        """Cache key of a UTF-8 source file, read in blocks; equals key() of its text"""
+        digest = hashlib.sha256(self.version.encode('utf-8'))
+        digest.update(b'\0')
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def set_version(self, version: str):
+        """Switch to a new analyzer/model version, invalidating old results"""
+        if version == self.version:
+            return
+        self.invalidate()
+        self.version = version
+        if self.cache_dir:
+            (self.cache_dir / self.VERSION_FILE).write_text(version, encoding='utf-8')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None on a miss"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, result)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result in memory and, if enabled, on disk"""
+        with self._lock:
+            self._store(key, result)
+        self._write_disk(key, result)
+
+    def invalidate(self):
+        """Drop every cached result (e.g. after the model changed)"""
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir:
+            for path in self.cache_dir.glob("*/*.json"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "disk_tier": self.cache_dir is not None,
+            "version": self.version
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        """Insert into the LRU (caller holds the lock)"""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            return json.loads(self._disk_path(key).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, result: Dict[str, Any]):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            # Write to a temporary file first so readers never see partial JSON
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(result), encoding='utf-8')
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            pass
@@ -0,0 +1,293 @@
+"""
+Clone Detection Module
+Near-duplicate functions found with MinHash signatures and an LSH index
+"""
+
+import ast
+import json
+import zlib
+from collections import deque
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+
+# Functions with fewer normalized AST nodes are too small to report
+MIN_CLONE_NODES = 50
+
+# Estimated Jaccard similarity of two functions reported as clones
+CLONE_THRESHOLD = 0.8
+
+# Consecutive AST nodes hashed into one shingle
+SHINGLE_SIZE = 4
+
+# Signature length, split into BANDS bands of NUM_PERM // BANDS rows; two
+# functions become candidates when all rows of any band agree, which
+# happens for more than 99.9% of pairs at the threshold
+NUM_PERM = 64
+BANDS = 16
+
+# Universal hash functions (a * x + b) mod p with p the largest 32-bit
+# prime; the seed is fixed so signatures from any process (and saved
+# indexes) stay comparable
+_PRIME = np.uint64(4294967291)
+_RANDOM = np.random.RandomState(20240511)
+_A = _RANDOM.randint(1, 2 ** 32 - 5, size=(NUM_PERM, 1)).astype(np.uint64)
+_B = _RANDOM.randint(0, 2 ** 32 - 5, size=(NUM_PERM, 1)).astype(np.uint64)
+
+INDEX_FORMAT = 1
+
+Key = Tuple[str, str, int]
+
+
+def _node_types(base: type) -> List[type]:
+    types = [base]
+    for subclass in base.__subclasses__():
+        types.extend(_node_types(subclass))
+    return types
+
+
+# Stable id of every AST node type (unlike hash(), the same in every process)
+NODE_IDS: Dict[type, int] = {node_type: zlib.crc32(node_type.__name__.encode('ascii'))
+                             for node_type in _node_types(ast.AST)}
+
+_FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def _normalized_nodes(node: ast.FunctionDef) -> List[int]:
+    """
+    Node type ids of the function body in breadth-first order
+
+    Identifiers, literal values and the function's own signature are left
+    out, so renamed copies of a function normalize to the same sequence.
+    Nested functions contribute a single node; their bodies are
+    fingerprinted on their own. This is the order in which
+    ``MetricsCollector`` visits the nodes.
+    """
+    ids = []
+    queue = deque(node.body)
+    while queue:
+        child = queue.popleft()
+        ids.append(NODE_IDS.get(type(child), 0))
+        if not isinstance(child, _FUNCTION_TYPES):
+            queue.extend(ast.iter_child_nodes(child))
+    return ids
+
+
+def minhashes(sequences: List[List[int]]) -> List[Optional[np.ndarray]]:
+    """
+    MinHash signatures of the shingles of normalized node sequences
+
+    All sequences are hashed with one set of array operations.
+
+    Returns:
+        NUM_PERM uint32 values per sequence, or None where the sequence is
+        too short for the function to be reported as a clone
+    """
+    eligible = [ids for ids in sequences if len(ids) >= MIN_CLONE_NODES]
+    if not eligible:
+        return [None] * len(sequences)
+
+    # Polynomial hash of each window of SHINGLE_SIZE nodes (mod 2**32),
+    # without the windows that span two sequences
+    nodes = np.fromiter(chain.from_iterable(eligible), dtype=np.uint64)
+    windows = len(nodes) - SHINGLE_SIZE + 1
+    shingles = np.zeros(windows, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        shingles = shingles * np.uint64(1000003) + nodes[offset:windows + offset]
+    lengths = np.array([len(ids) for ids in eligible])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    valid = np.ones(windows, dtype=bool)
+    for shift in range(1, SHINGLE_SIZE):
+        valid[(starts + lengths - shift)[:-1]] = False
+    shingles = shingles[valid] & np.uint64(0xFFFFFFFF)
+
+    hashed = (_A * shingles + _B) % _PRIME
+    offsets = starts - np.arange(len(eligible)) * (SHINGLE_SIZE - 1)
+    signatures = iter(np.minimum.reduceat(hashed, offsets, axis=1).astype(np.uint32).T)
+    return [next(signatures) if len(ids) >= MIN_CLONE_NODES else None for ids in sequences]
+
+
+def fingerprint(node: ast.FunctionDef) -> Optional[np.ndarray]:
+    """Signature of a function, None if it is too small to be a clone"""
+    return minhashes([_normalized_nodes(node)])[0]
+
+
+def fingerprint_source(code: str) -> List[Tuple[str, int, np.ndarray]]:
+    """
+    Signatures of all functions of a module large enough to be clones
+
+    Raises:
+        SyntaxError: If the code cannot be parsed
+    """
+    fingerprints = []
+    for node in ast.walk(ast.parse(code)):
+        if isinstance(node, _FUNCTION_TYPES):
+            values = fingerprint(node)
+            if values is not None:
+                fingerprints.append((node.name, node.lineno, values))
+    return fingerprints
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+def duplicate_smells(fingerprints: List[Tuple[str, np.ndarray]]) -> List[str]:
+    """
+    Smells for functions of one module that are near-duplicates
+
+    Each function is compared with the ones before it and reported once,
+    for its most similar predecessor.
+    """
+    if len(fingerprints) < 2:
+        return []
+    index = CloneIndex()
+    smells = []
+    for position, (name, signature) in enumerate(fingerprints):
+        matches = index.query(signature)
+        if matches:
+            (_, other, _), score = matches[0]
+            smells.append(f"Duplicate code: '{name}' is similar to '{other}' ({score:.0%})")
+        index.add(("", name, position), signature)
+    return smells
+
+
+class CloneIndex:
+    """
+    Locality-sensitive hashing index of function signatures
+
+    Signatures are split into bands and every band is hashed into a
+    bucket; only functions sharing a bucket are compared, so a lookup
+    costs time proportional to the number of likely clones rather than
+    the size of the index. Entries are keyed by (path, function name,
+    line); all entries of a path can be removed again, so a project
+    index is updated incrementally when files change, and it can be
+    saved to and loaded from disk.
+    """
+
+    def __init__(self, threshold: float = CLONE_THRESHOLD):
+        self.threshold = threshold
+        self._keys: List[Optional[Key]] = []
+        self._signatures: List[Optional[np.ndarray]] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(BANDS)]
+        self._by_path: Dict[str, List[int]] = {}
+        # Entries of removed functions, reused by the next additions
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_path.values())
+
+    def paths(self) -> Set[str]:
+        """Paths with indexed functions"""
+        return set(self._by_path)
+
+    def _bands(self, signature: np.ndarray):
+        rows = NUM_PERM // BANDS
+        for band in range(BANDS):
+            yield self._buckets[band], signature[band * rows:(band + 1) * rows].tobytes()
+
+    def add(self, key: Key, signature: np.ndarray):
+        """Index the signature of a function"""
+        if self._free:
+            entry = self._free.pop()
+            self._keys[entry], self._signatures[entry] = key, signature
+        else:
+            entry = len(self._keys)
+            self._keys.append(key)
+            self._signatures.append(signature)
+        self._by_path.setdefault(key[0], []).append(entry)
+        for buckets, band in self._bands(signature):
+            buckets.setdefault(band, []).append(entry)
+
+    def remove(self, path: str) -> int:
+        """Drop every function of path; returns how many were removed"""
+        entries = self._by_path.pop(path, [])
+        for entry in entries:
+            for buckets, band in self._bands(self._signatures[entry]):
+                bucket = buckets[band]
+                bucket.remove(entry)
+                if not bucket:
+                    del buckets[band]
+            self._keys[entry] = None
+            self._signatures[entry] = None
+        self._free.extend(entries)
+        return len(entries)
+
+    def query(self, signature: np.ndarray, exclude: Optional[str] = None) -> List[Tuple[Key, float]]:
+        """
+        Indexed functions similar to the signature, most similar first
+
+        Args:
+            signature: Signature from ``fingerprint``
+            exclude: Ignore the functions of this path
+        """
+        candidates = set()
+        for buckets, band in self._bands(signature):
+            candidates.update(buckets.get(band, ()))
+
+        matches = []
+        for entry in candidates:
+            key = self._keys[entry]
+            if key[0] == exclude:
+                continue
+            score = similarity(signature, self._signatures[entry])
+            if score >= self.threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def update_file(self, path: str, fingerprints: List[Tuple[str, int, np.ndarray]]) -> List[str]:
+        """
+        Replace the functions of a file and report its clones in other files
+
+        Args:
+            path: File the fingerprints belong to
+            fingerprints: (name, line, signature) from ``fingerprint_source``
+
+        Returns:
+            One smell per function with a near-duplicate elsewhere
+        """
+        self.remove(path)
+        smells = []
+        for name, line, signature in fingerprints:
+            matches = self.query(signature, exclude=path)
+            if matches:
+                (other_path, other, other_line), score = matches[0]
+                smells.append(f"Duplicate code: '{name}' is similar to '{other}' "
+                              f"in {other_path}:{other_line} ({score:.0%})")
+        for name, line, signature in fingerprints:
+            self.add((path, name, line), signature)
+        return smells
+
+    def save(self, path: Union[str, Path]):
+        """Write the index to a .npz file"""
+        entries = [entry for entry, key in enumerate(self._keys) if key is not None]
+        signatures = (np.stack([self._signatures[entry] for entry in entries]) if entries
+                      else np.empty((0, NUM_PERM), dtype=np.uint32))
+        meta = {"format": INDEX_FORMAT, "num_perm": NUM_PERM, "threshold": self.threshold,
+                "keys": [self._keys[entry] for entry in entries]}
+        with open(path, "wb") as f:
+            np.savez(f, signatures=signatures, meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "CloneIndex":
+        """
+        Read an index written by ``save``
+
+        Raises:
+            ValueError: If the file was written with other hashing parameters
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            signatures = data["signatures"]
+        if meta.get("format") != INDEX_FORMAT or meta.get("num_perm") != NUM_PERM:
+            raise ValueError(f"Incompatible clone index: {path}")
+
+        index = cls(threshold=meta["threshold"])
+        for key, signature in zip(meta["keys"], signatures):
+            index.add(tuple(key), signature)
+        return index
@@ -4,150 +4,303 @@ Performs static code analysis using AST and various metrics
 """
 
 import ast
-from typing import Dict, Any, List
-from radon.complexity import cc_visit
-from radon.metrics import mi_visit, h_visit
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
 from radon.raw import analyze
 import re
 
+from . import __version__
+from .cache import ResultCache
+from .clones import duplicate_smells
+from .metrics_engine import MetricsCollector
+from .telemetry import Stopwatch, NULL_STOPWATCH
+from .tokens import TokenCounts, count_tokens, sum_counts
+
+
+# Line breaks honoured by str.splitlines() but not by the parser's line numbers
+_EXTRA_LINE_BREAKS = re.compile('[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
 
 class CodeAnalyzer:
     """Analyzes Python code for quality metrics and patterns"""
     
-    def __init__(self):
+    version = __version__
+    
+    def __init__(self, unit_cache_size: int = 4096):
         self.metrics = {}
+        # Metrics of top-level units (functions, classes, statements) keyed
+        # by their source text, so re-analysis only recomputes edited units
+        self.unit_cache = ResultCache(max_entries=unit_cache_size)
     
-    def analyze(self, code: str) -> Dict[str, Any]:
+    def analyze(self, code: str, stopwatch: Optional[Stopwatch] = None) -> Dict[str, Any]:
         """
         Perform comprehensive static analysis on Python code
         
         Args:
             code: Python source code as string
+            stopwatch: Optional stopwatch charged with the time of each stage
             
         Returns:
             Dictionary containing various code metrics
         """
+        return self.analyze_with_tokens(code, stopwatch)[0]
+    
+    def analyze_with_tokens(self, code: str,
+                            stopwatch: Optional[Stopwatch] = None) -> Tuple[Dict[str, Any], Optional[TokenCounts]]:
+        """
+        Analyze code and also return the token counts of the source
+        
+        The counts can be passed on to CodeQualityPredictor so the source
+        is not tokenized a second time for the ML features.
+        
+        Returns:
+            The analyze() results and the token counts (None if the code
+            could not be analyzed)
+        """
+        stopwatch = stopwatch or NULL_STOPWATCH
         try:
-            # Parse the code
+            # Parse the code once; every AST based metric comes from this tree
             tree = ast.parse(code)
+            stopwatch.lap("parse")
             
-            # Get basic metrics
-            raw_metrics = analyze(code)
-            
-            # Cyclomatic complexity
-            complexity = cc_visit(code)
-            avg_complexity = sum(block.complexity for block in complexity) / len(complexity) if complexity else 0
-            max_complexity = max((block.complexity for block in complexity), default=0)
-            
-            # Maintainability index
-            mi_score = mi_visit(code, True)
-            
-            # Halstead metrics
-            halstead = h_visit(code)
-            
-            # AST-based metrics
-            ast_metrics = self._analyze_ast(tree)
-            
-            # Code smells
-            smells = self._detect_code_smells(code, tree)
-            
-            return {
-                "lines_of_code": raw_metrics.loc,
-                "logical_lines": raw_metrics.lloc,
-                "source_lines": raw_metrics.sloc,
-                "comments": raw_metrics.comments,
-                "blank_lines": raw_metrics.blank,
-                "comment_ratio": raw_metrics.comments / raw_metrics.loc if raw_metrics.loc > 0 else 0,
-                "avg_complexity": round(avg_complexity, 2),
-                "max_complexity": max_complexity,
-                "maintainability_index": round(mi_score, 2),
-                "halstead_volume": round(halstead.total.volume, 2) if halstead else 0,
-                "halstead_difficulty": round(halstead.total.difficulty, 2) if halstead else 0,
-                "num_functions": ast_metrics["functions"],
-                "num_classes": ast_metrics["classes"],
-                "code_smells": smells
-            }
+            # Token counts (raw line counts included) plus complexity,
+            # Halstead, structure and smells, computed per top-level unit
+            # and recombined
+            tokens, collector = self._collect_metrics(code, tree, stopwatch)
+            return self._module_metrics(tokens, collector, stopwatch), tokens
         
         except SyntaxError as e:
             return {
                 "error": "Syntax error in code",
                 "message": str(e),
                 "lines_of_code": 0
-            }
+            }, None
+        except MemoryError:
+            # Reported by the caller's memory budget (see guard.run_guarded)
+            raise
         except Exception as e:
             return {
                 "error": "Analysis error",
                 "message": str(e),
                 "lines_of_code": 0
-            }
-    
-    def _analyze_ast(self, tree: ast.AST) -> Dict[str, int]:
-        """Analyze AST for structural metrics"""
-        metrics = {
-            "functions": 0,
-            "classes": 0,
-            "imports": 0,
-            "loops": 0,
-            "conditionals": 0
+            }, None
+    
+    def analyze_chunks(self, chunks: Iterable[str],
+                       stopwatch: Optional[Stopwatch] = None) -> Tuple[Dict[str, Any], TokenCounts]:
+        """
+        Analyze a source given as consecutive top-level chunks
+        
+        Each chunk (see streaming.iter_chunks) is parsed on its own and
+        dropped once its metrics are collected, so the syntax tree of the
+        whole module never exists. The metrics equal those of analyze()
+        on the joined chunks.
+        
+        Returns:
+            The analyze() results and the token counts of the whole
+            source, also when it could not be analyzed
+        """
+        stopwatch = stopwatch or NULL_STOPWATCH
+        chunks = iter(chunks)
+        token_parts = [TokenCounts()]
+        collectors: List[MetricsCollector] = []
+        chunk = ""
+        offset = 0
+        try:
+            for chunk in chunks:
+                tree = ast.parse(chunk)
+                stopwatch.lap("parse")
+                for tokens, collector in self._unit_parts(chunk, tree, stopwatch):
+                    token_parts.append(tokens)
+                    collectors.append(collector)
+                offset += chunk.count("\n")
+                chunk = ""
+                
+                # Fold what was collected so far, keeping memory flat
+                if len(collectors) >= 256:
+                    token_parts = [sum_counts(token_parts)]
+                    collectors = [MetricsCollector.merge(collectors, module_complexity=0)]
+            
+            tokens = sum_counts(token_parts)
+            return self._module_metrics(tokens, MetricsCollector.merge(collectors), stopwatch), tokens
+        
+        except SyntaxError as e:
+            if e.lineno is not None:
+                e.lineno += offset
+            error = {"error": "Syntax error in code", "message": str(e), "lines_of_code": 0}
+        except MemoryError:
+            # Reported by the caller's memory budget (see guard.run_guarded)
+            raise
+        except Exception as e:
+            error = {"error": "Analysis error", "message": str(e), "lines_of_code": 0}
+        
+        # The failed chunk and the rest of the source still count for the ML features
+        token_parts.append(count_tokens(chunk))
+        token_parts.extend(count_tokens(rest) for rest in chunks)
+        return error, sum_counts(token_parts)
+    
+    def _module_metrics(self, tokens: TokenCounts, collector: MetricsCollector,
+                        stopwatch: Stopwatch = NULL_STOPWATCH) -> Dict[str, Any]:
+        """The analyze() results from the token counts and AST metrics of a module"""
+        raw_metrics = tokens.raw
+        
+        # Cyclomatic complexity
+        complexity = [block.complexity for block in collector.blocks]
+        avg_complexity = sum(complexity) / len(complexity) if complexity else 0
+        max_complexity = max(complexity, default=0)
+        
+        # Halstead metrics
+        halstead = collector.halstead()
+        
+        # Maintainability index
+        mi_score = collector.maintainability_index(raw_metrics, halstead["volume"])
+        stopwatch.lap("aggregate")
+        
+        # Code smells
+        smells = self._detect_code_smells(tokens, collector)
+        stopwatch.lap("smells")
+        
+        return {
+            "lines_of_code": raw_metrics.loc,
+            "logical_lines": raw_metrics.lloc,
+            "source_lines": raw_metrics.sloc,
+            "comments": raw_metrics.comments,
+            "blank_lines": raw_metrics.blank,
+            "comment_ratio": raw_metrics.comments / raw_metrics.loc if raw_metrics.loc > 0 else 0,
+            "avg_complexity": round(avg_complexity, 2),
+            "max_complexity": max_complexity,
+            "maintainability_index": round(mi_score, 2),
+            "halstead_volume": round(halstead["volume"], 2),
+            "halstead_difficulty": round(halstead["difficulty"], 2),
+            "num_functions": collector.structure["functions"],
+            "num_classes": collector.structure["classes"],
+            "code_smells": smells
         }
+    
+    def _collect_metrics(self, code: str, tree: ast.Module,
+                         stopwatch: Stopwatch = NULL_STOPWATCH) -> Tuple[TokenCounts, MetricsCollector]:
+        """
+        Token counts and AST metrics for the module, reusing memoized units
         
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                metrics["functions"] += 1
-            elif isinstance(node, ast.ClassDef):
-                metrics["classes"] += 1
-            elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                metrics["imports"] += 1
-            elif isinstance(node, (ast.For, ast.While)):
-                metrics["loops"] += 1
-            elif isinstance(node, ast.If):
-                metrics["conditionals"] += 1
-        
-        return metrics
-    
-    def _detect_code_smells(self, code: str, tree: ast.AST) -> List[str]:
-        """Detect common code smells"""
-        smells = []
-        
-        # Long functions (>50 lines)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
-                    func_length = node.end_lineno - node.lineno
-                    if func_length > 50:
-                        smells.append(f"Long function '{node.name}' ({func_length} lines)")
-        
-        # Too many parameters
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                num_params = len(node.args.args)
-                if num_params > 5:
-                    smells.append(f"Function '{node.name}' has too many parameters ({num_params})")
-        
-        # Deeply nested code
-        max_depth = self._get_max_nesting_depth(tree)
-        if max_depth > 4:
-            smells.append(f"Deeply nested code (depth: {max_depth})")
-        
-        # Magic numbers
-        if re.search(r'\b\d{2,}\b', code):
-            smells.append("Magic numbers detected - consider using constants")
+        The module is split into one source segment per top-level statement;
+        classes are further split into one segment per body statement. Each
+        segment runs from the first line of its statement (including
+        decorators) to the line before the next one, so the segments cover
+        the whole file and the token counts can simply be added up.
+        """
+        parts = list(self._unit_parts(code, tree, stopwatch))
+        return sum_counts([tokens for tokens, _ in parts]), MetricsCollector.merge([c for _, c in parts])
+    
+    def _unit_parts(self, code: str, tree: ast.Module,
+                    stopwatch: Stopwatch = NULL_STOPWATCH) -> Iterator[Tuple[TokenCounts, MetricsCollector]]:
+        """Token counts and AST metrics of each top-level unit of the module"""
+        if not tree.body or _EXTRA_LINE_BREAKS.search(code):
+            # Line numbers cannot be mapped to lines, analyze as a single unit
+            yield self._unit_metrics(code, code, "1", lambda: MetricsCollector.for_units(tree.body), stopwatch)
+            return
         
-        return smells
+        lines = code.splitlines()
+        for start, stop, nodes in self._segments(tree.body, 1, len(lines)):
+            node = nodes[0]
+            if len(nodes) == 1 and isinstance(node, ast.ClassDef) and self._has_split_body(node, lines):
+                yield self._class_metrics(code, lines, node, start, stop, stopwatch)
+            else:
+                yield self._unit_metrics(
+                    code, self._segment(lines, start, stop), "1",
+                    lambda: MetricsCollector.for_units(nodes), stopwatch)
     
-    def _get_max_nesting_depth(self, node: ast.AST, depth: int = 0) -> int:
-        """Calculate maximum nesting depth"""
-        max_depth = depth
+    def _class_metrics(self, code: str, lines: List[str], node: ast.ClassDef, start: int, stop: int,
+                       stopwatch: Stopwatch = NULL_STOPWATCH) -> Tuple[TokenCounts, MetricsCollector]:
+        """Metrics of a top-level class from its header and body statements"""
+        members = self._segments(node.body, self._statement_start(node.body[0]), stop)
+        header_tokens, header = self._unit_metrics(
+            code, self._segment(lines, start, members[0][0] - 1), "1:class",
+            lambda: MetricsCollector.for_class_header(node), stopwatch)
+        
+        token_parts = [header_tokens]
+        collectors = []
+        for member_start, member_stop, nodes in members:
+            tokens, collector = self._unit_metrics(
+                code, self._segment(lines, member_start, member_stop), "2",
+                lambda: MetricsCollector.for_units(nodes, level=2), stopwatch)
+            token_parts.append(tokens)
+            collectors.append(collector)
         
-        for child in ast.iter_child_nodes(node):
-            if isinstance(child, (ast.If, ast.For, ast.While, ast.With)):
-                child_depth = self._get_max_nesting_depth(child, depth + 1)
-                max_depth = max(max_depth, child_depth)
+        return sum_counts(token_parts), MetricsCollector.merge_class(node.name, header, collectors)
+    
+    def _unit_metrics(self, code: str, segment: str, kind: str, collect: Callable[[], MetricsCollector],
+                      stopwatch: Stopwatch = NULL_STOPWATCH) -> Tuple[TokenCounts, MetricsCollector]:
+        """Token counts and AST metrics of one segment, memoized by its source text"""
+        key = self.unit_cache.make_key(segment, kind)
+        unit = self.unit_cache.get(key)
+        stopwatch.lap("unit_cache")
+        if unit is None:
+            tokens = count_tokens(segment)
+            if tokens.errors:
+                # Leave sources the tokenizer chokes on to radon, which
+                # reports them with line numbers of the whole file
+                try:
+                    tokens = tokens._replace(**analyze(segment)._asdict())
+                except SyntaxError:
+                    analyze(code)
+                    raise
+            stopwatch.lap("raw_metrics")
+            unit = (tokens, collect())
+            stopwatch.lap("ast_metrics")
+            self.unit_cache.put(key, unit)
+        return unit
+    
+    def _segments(self, body: List[ast.stmt], first_line: int,
+                  last_line: int) -> List[Tuple[int, int, List[ast.stmt]]]:
+        """Group statements into (start, stop, statements) line ranges"""
+        units = []
+        for node in body:
+            start = self._statement_start(node)
+            if units and start <= units[-1][1]:
+                # Statements sharing a line (a = 1; b = 2) stay together
+                units[-1][1] = max(units[-1][1], node.end_lineno)
+                units[-1][2].append(node)
             else:
-                child_depth = self._get_max_nesting_depth(child, depth)
-                max_depth = max(max_depth, child_depth)
+                units.append([start, node.end_lineno, [node]])
+        units[0][0] = first_line
+        
+        return [
+            (start, units[i + 1][0] - 1 if i + 1 < len(units) else last_line, nodes)
+            for i, (start, _, nodes) in enumerate(units)
+        ]
+    
+    @staticmethod
+    def _statement_start(node: ast.stmt) -> int:
+        """First line of a statement, including its decorators"""
+        return min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+    
+    @staticmethod
+    def _has_split_body(node: ast.ClassDef, lines: List[str]) -> bool:
+        """Whether the class body starts on its own line, after the header"""
+        first = node.body[0]
+        decorators = getattr(first, 'decorator_list', [])
+        if decorators:
+            first = min(decorators, key=lambda d: (d.lineno, d.col_offset))
+            prefix = lines[first.lineno - 1][:first.col_offset].strip()
+            return prefix == '@' and first.lineno > node.lineno
+        return first.lineno > node.lineno and not lines[first.lineno - 1][:first.col_offset].strip()
+    
+    @staticmethod
+    def _segment(lines: List[str], start: int, stop: int) -> str:
+        # Trailing newline keeps a final blank line in radon's count
+        return "\n".join(lines[start - 1:stop]) + "\n"
+    
+    def _detect_code_smells(self, tokens: TokenCounts, collector: MetricsCollector) -> List[str]:
+        """Detect common code smells"""
+        # Long functions, too many parameters and deep nesting
+        smells = collector.smells()
         
-        return max_depth
+        # Magic numbers (number literals only, not digits in strings or comments)
+        if tokens.magic_numbers:
+            smells.append("Magic numbers detected - consider using constants")
+        
+        # Near-duplicate functions within the module
+        smells.extend(duplicate_smells([(name, signature) for _, name, signature in collector.fingerprints]))
+        
+        return smells
     
     def get_suggestions(self, metrics: Dict[str, Any]) -> List[str]:
         """
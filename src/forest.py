@@ -0,0 +1,103 @@
+"""
+Forest Inference Module
+Random-forest scoring on flat NumPy arrays, without per-tree Python dispatch
+"""
+
+import numpy as np
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into node arrays
+
+    All trees share one set of arrays (feature, threshold, left/right child
+    and per-node class probabilities), with each tree's nodes at an offset.
+    Leaves point to themselves, so every sample walks all trees at once for
+    ``depth`` vectorized steps. Probabilities are identical to
+    scikit-learn's ``predict_proba``: inputs are compared as float32 like
+    the tree code does, and trees are accumulated in the same order.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, proba: np.ndarray, roots: np.ndarray, depth: int,
+                 classes: np.ndarray, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.proba = proba
+        self.roots = roots
+        self.depth = depth
+        self.classes = classes
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """Compile a fitted single-output RandomForestClassifier"""
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :model.n_classes_]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            proba=np.concatenate(probas),
+            roots=np.array(roots, dtype=np.intp),
+            depth=depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+        )
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Class probabilities for each row of X
+
+        Args:
+            X: Feature matrix (dense or scipy sparse), one row per sample
+
+        Returns:
+            Array of shape (n_samples, n_classes)
+        """
+        if hasattr(X, "toarray"):
+            # Sparse TF-IDF rows are small (max_features columns)
+            X = X.toarray()
+        # The tree code compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Sum the trees one after another, as scikit-learn does (cumsum is
+        # sequential, unlike the pairwise summation of np.sum)
+        per_tree = self.proba[nodes]
+        return np.cumsum(per_tree, axis=1)[:, -1] / len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        """Most likely class for each row of X"""
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
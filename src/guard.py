@@ -0,0 +1,138 @@
+"""
+Guard Module
+Resource budgets that keep one pathological source from degrading the service
+"""
+
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, Optional
+
+from .streaming import Source, source_size
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+class BudgetExceeded(Exception):
+    """Raised when a source exceeds the size, time or memory budget"""
+
+    def __init__(self, budget: str, limit: float, message: str):
+        super().__init__(budget, limit, message)
+        self.budget = budget
+        self.limit = limit
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Structured result returned to API clients"""
+        return {
+            "error": "Analysis budget exceeded",
+            "budget": self.budget,
+            "limit": self.limit,
+            "message": self.message
+        }
+
+
+class _Alarm(BaseException):
+    """
+    Raised by the wall-clock alarm
+
+    Derives from BaseException so the analyzer's catch-all error handling
+    cannot swallow it; ``time_budget`` turns it into BudgetExceeded.
+    """
+
+
+def check_source_size(code: Source, max_bytes: int):
+    """Reject sources larger than max_bytes (0 disables the check)"""
+    if not max_bytes:
+        return
+    size = source_size(code)
+    if size > max_bytes:
+        raise BudgetExceeded("source_size", max_bytes,
+                             f"Source is {size} bytes, the limit is {max_bytes} bytes")
+
+
+def _raise_alarm(signum, frame):
+    raise _Alarm()
+
+
+@contextmanager
+def time_budget(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Interrupt the block with BudgetExceeded after the given wall-clock time
+
+    Uses SIGALRM, so the budget is only enforced in the main thread of a
+    process (as in pool workers); elsewhere the block runs unbounded.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    previous = signal.signal(signal.SIGALRM, _raise_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    except _Alarm:
+        raise BudgetExceeded("time", seconds, f"Analysis exceeded {seconds:g}s") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _address_space() -> Optional[int]:
+    """Current virtual memory size of this process in bytes (Linux only)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def limit_memory(max_bytes: int) -> Optional[int]:
+    """
+    Cap further memory growth of the current process at max_bytes
+
+    The limit is applied to the address space on top of what the process
+    already uses (the loaded models), so allocations past the budget fail
+    with MemoryError instead of exhausting the host.
+
+    Returns:
+        The address space limit applied, or None if unsupported or disabled
+    """
+    if not max_bytes or resource is None:
+        return None
+    current = _address_space()
+    if current is None:
+        return None
+    limit = current + max_bytes
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    return limit
+
+
+def run_guarded(fn: Callable[..., Any], *args, seconds: Optional[float] = None,
+                memory_limit: Optional[int] = None) -> Any:
+    """
+    Call fn under a wall-clock budget, reporting memory exhaustion as a budget
+
+    Args:
+        fn: Function to call with args
+        seconds: Wall-clock budget (None or 0 for unbounded)
+        memory_limit: Memory budget reported when fn runs out of memory
+
+    Raises:
+        BudgetExceeded: If fn ran out of time or memory
+    """
+    try:
+        with time_budget(seconds):
+            return fn(*args)
+    except MemoryError:
+        raise BudgetExceeded("memory", memory_limit or 0, "Analysis exceeded the memory budget") from None
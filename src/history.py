@@ -0,0 +1,318 @@
+"""
+History Module
+Quality trends across the commits of a local git repository
+"""
+
+import os
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Iterator, NamedTuple, Optional, Tuple
+
+from . import pipeline
+from .scanner import SKIP_DIRS
+
+
+class HistoryError(ValueError):
+    """Raised when the path is not a local git repository or git fails"""
+
+
+class Commit(NamedTuple):
+    """A commit and the Python files of its tree as (path, blob id)"""
+    sha: str
+    timestamp: int
+    files: List[Tuple[str, str]]
+
+
+class BlobStats(NamedTuple):
+    """The parts of one file version's analysis that commits are aggregated from"""
+    lines_of_code: int
+    avg_complexity: float
+    max_complexity: int
+    maintainability_index: float
+    quality_score: float
+    rating: str
+    error: bool
+
+
+def _git(repo: str, *args: str) -> str:
+    """Run a git command in repo and return its output"""
+    try:
+        process = subprocess.run(["git", "-C", repo, *args], capture_output=True, check=True,
+                                 env=_git_env())
+    except FileNotFoundError:
+        raise HistoryError("git is not installed")
+    except subprocess.CalledProcessError as e:
+        raise HistoryError(e.stderr.decode("utf-8", "replace").strip() or f"git {args[0]} failed")
+    return process.stdout.decode("utf-8", "surrogateescape")
+
+
+def _git_env() -> Dict[str, str]:
+    # Never fetch missing objects of partial clones: history only reads what is on disk
+    return {**os.environ, "GIT_NO_LAZY_FETCH": "1", "GIT_TERMINAL_PROMPT": "0"}
+
+
+def _is_python_file(path: str) -> bool:
+    parts = path.split("/")
+    return path.endswith(".py") and not any(
+        part in SKIP_DIRS or part.endswith(".egg-info") for part in parts[:-1]
+    )
+
+
+def list_commits(repo: str, rev: str = "HEAD", max_count: Optional[int] = None,
+                 first_parent: bool = False) -> Iterator[Commit]:
+    """
+    Lazily yield the commits reachable from rev, oldest first
+
+    Args:
+        repo: Path of a local git repository (or a directory inside one)
+        rev: Revision or range passed to git rev-list
+        max_count: Only the newest max_count commits
+        first_parent: Follow only the first parent of merges
+
+    Raises:
+        HistoryError: If repo is not a git repository or rev is unknown
+    """
+    if not os.path.isdir(repo):
+        raise HistoryError(f"Not a local directory: {repo}")
+    args = ["rev-list", "--reverse", "--timestamp"]
+    if max_count:
+        args.append(f"--max-count={max_count}")
+    if first_parent:
+        args.append("--first-parent")
+    for line in _git(repo, *args, rev, "--").splitlines():
+        timestamp, sha = line.split()
+        yield Commit(sha, int(timestamp), _tree_files(repo, sha))
+
+
+def _tree_files(repo: str, sha: str) -> List[Tuple[str, str]]:
+    """Python files of a commit's tree as (path, blob id)"""
+    files = []
+    for entry in _git(repo, "ls-tree", "-r", "-z", sha).split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        _, kind, oid = info.split()
+        if kind == "blob" and _is_python_file(path):
+            files.append((path, oid))
+    return files
+
+
+class BlobReader:
+    """Reads blob contents through one long-running ``git cat-file --batch``"""
+
+    def __init__(self, repo: str):
+        self._process = subprocess.Popen(["git", "-C", repo, "cat-file", "--batch"],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         env=_git_env())
+
+    def read(self, oid: str) -> bytes:
+        """
+        Raw content of a blob
+
+        Raises:
+            HistoryError: If the object is missing from the repository
+        """
+        self._process.stdin.write(oid.encode("ascii") + b"\n")
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise HistoryError(f"Missing object {oid}")
+        content = self._process.stdout.read(int(header[2]))
+        self._process.stdout.read(1)
+        return content
+
+    def close(self):
+        # Forked pool workers inherit the pipe, so git may never see EOF
+        self._process.stdin.close()
+        self._process.terminate()
+        self._process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def analyze_blobs(contents: List[bytes], analyzer, predictor) -> List[BlobStats]:
+    """
+    Analyze file versions, scoring them with one model call
+
+    Args:
+        contents: Raw blob contents
+        analyzer: Analyzer used for static metrics
+        predictor: Model used for the quality prediction
+
+    Returns:
+        One entry per blob; blobs that are not UTF-8 count as errors
+    """
+    stats: List[Optional[BlobStats]] = []
+    codes, decoded = [], []
+    for content in contents:
+        try:
+            codes.append(content.decode("utf-8"))
+            decoded.append(len(stats))
+            stats.append(None)
+        except UnicodeDecodeError:
+            stats.append(_ERROR)
+
+    for index, result in zip(decoded, pipeline.analyze_batch(codes, analyzer, predictor)):
+        stats[index] = _blob_stats(result)
+    return stats
+
+
+_ERROR = BlobStats(0, 0.0, 0, 0.0, 0.0, "?", True)
+
+
+def _blob_stats(result: Dict[str, Any]) -> BlobStats:
+    metrics = result["metrics"]
+    if "error" in metrics:
+        return _ERROR
+    return BlobStats(
+        metrics.get("lines_of_code", 0),
+        metrics.get("avg_complexity", 0),
+        metrics.get("max_complexity", 0),
+        metrics.get("maintainability_index", 0),
+        result.get("overall_score", 0),
+        result["ml_prediction"].get("rating", "?"),
+        False
+    )
+
+
+def _analyze_blobs_in_worker(contents: List[bytes]) -> List[BlobStats]:
+    """Pool task: analyze blobs with the worker's preloaded models"""
+    return analyze_blobs(contents, pipeline._worker_analyzer, pipeline._worker_predictor)
+
+
+def commit_summary(commit: Commit, blobs: Dict[str, BlobStats], new_blobs: int = 0) -> Dict[str, Any]:
+    """
+    Aggregate the analyses of a commit's files
+
+    Args:
+        commit: The commit
+        blobs: Analysis of every blob id in the commit's tree
+        new_blobs: Number of file versions first seen in this commit
+
+    Returns:
+        Per-commit averages as a JSON-serializable dictionary
+    """
+    stats = [blobs[oid] for _, oid in commit.files]
+    analyzed = [item for item in stats if not item.error]
+    count = len(analyzed) or 1
+    ratings: Dict[str, int] = {}
+    for item in analyzed:
+        ratings[item.rating] = ratings.get(item.rating, 0) + 1
+    return {
+        "commit": commit.sha,
+        "timestamp": commit.timestamp,
+        "files": len(stats),
+        "analyzed": len(analyzed),
+        "errors": len(stats) - len(analyzed),
+        "new_blobs": new_blobs,
+        "lines_of_code": sum(item.lines_of_code for item in analyzed),
+        "avg_quality_score": round(sum(item.quality_score for item in analyzed) / count, 2),
+        "avg_complexity": round(sum(item.avg_complexity for item in analyzed) / count, 2),
+        "avg_maintainability_index": round(sum(item.maintainability_index for item in analyzed) / count, 2),
+        "max_complexity": max((item.max_complexity for item in analyzed), default=0),
+        "ratings": dict(sorted(ratings.items()))
+    }
+
+
+def history(repo: str, rev: str = "HEAD", workers: Optional[int] = None, chunk_size: int = 16,
+            max_count: Optional[int] = None, first_parent: bool = False,
+            blobs: Optional[Dict[str, BlobStats]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze the history of a local git repository, one summary per commit
+
+    A file version is identified by its blob id, so each distinct version
+    is read and analyzed exactly once no matter how many commits contain
+    it. New blobs are analyzed in parallel while later commits are listed,
+    with a bounded number of chunks in flight.
+
+    Args:
+        repo: Path of a local git repository
+        rev: Revision or range to walk (default: HEAD)
+        workers: Worker processes (default: available CPUs, 0 analyzes inline)
+        chunk_size: Blobs analyzed per worker task
+        max_count: Only the newest max_count commits
+        first_parent: Follow only the first parent of merges
+        blobs: Analyses of blobs seen before, keyed by blob id; filled in
+            as blobs are analyzed, so it can be reused across runs
+
+    Yields:
+        One summary per commit, oldest first
+
+    Raises:
+        HistoryError: If repo is not a git repository or rev is unknown
+    """
+    if workers is None:
+        workers = pipeline.available_cpus()
+    chunk_size = max(1, chunk_size)
+    max_in_flight = max(1, workers) * 2
+    known: Dict[str, Optional[BlobStats]] = blobs if blobs is not None else {}
+    commits = list_commits(repo, rev, max_count, first_parent)
+
+    if workers == 0:
+        from .code_analyzer import CodeAnalyzer
+        from .ml_models import CodeQualityPredictor
+        analyzer, predictor = CodeAnalyzer(), CodeQualityPredictor()
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=pipeline._init_worker,
+                                       mp_context=pipeline.worker_context())
+
+    def submit(oids: List[str]) -> Future:
+        contents = [reader.read(oid) for oid in oids]
+        if executor is not None:
+            return executor.submit(_analyze_blobs_in_worker, contents)
+        future: Future = Future()
+        future.set_result(analyze_blobs(contents, analyzer, predictor))
+        return future
+
+    def collect(done) -> None:
+        for future in done:
+            oids = pending.pop(future)
+            try:
+                results = future.result()
+            except Exception:
+                results = [_ERROR] * len(oids)
+            known.update(zip(oids, results))
+
+    def ready() -> Iterator[Dict[str, Any]]:
+        # Commits are reported in order, as soon as all their blobs are known
+        while waiting and all(known[oid] is not None for _, oid in waiting[0][0].files):
+            commit, new_blobs = waiting.popleft()
+            yield commit_summary(commit, known, new_blobs)
+
+    pending: Dict[Future, List[str]] = {}
+    waiting: deque = deque()
+    batch: List[str] = []
+    try:
+        with BlobReader(repo) as reader:
+            for commit in commits:
+                new = list(dict.fromkeys(oid for _, oid in commit.files if oid not in known))
+                known.update(dict.fromkeys(new))
+                batch.extend(new)
+                waiting.append((commit, len(new)))
+
+                while len(batch) >= chunk_size:
+                    pending[submit(batch[:chunk_size])] = batch[:chunk_size]
+                    del batch[:chunk_size]
+                    if len(pending) >= max_in_flight:
+                        collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                collect([future for future in pending if future.done()])
+                yield from ready()
+
+            if batch:
+                pending[submit(batch)] = batch
+            collect(wait(pending).done)
+            yield from ready()
+    except BaseException:
+        # Unfinished blobs must not stay in a cache that outlives this run
+        for oid in [oid for oid, stats in known.items() if stats is None]:
+            del known[oid]
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,156 @@
+"""
+HTTP Cache Module
+Entity tags, conditional requests and compression of large JSON responses
+"""
+
+import gzip
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def make_etag(*parts: str) -> str:
+    """Strong entity tag identifying a response built from the given parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches the entity tag
+
+    The header may list several tags or be ``*``; tags are compared
+    weakly, so a compressed variant (``W/"..."``) matches its source.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag.strip()) for tag in if_none_match.split(",")}
+
+
+class CachedFile:
+    """
+    Contents and entity tag of a file, read again only when it changes
+
+    A request costs one ``stat`` instead of reading and hashing the file.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._signature: Optional[Tuple[int, int]] = None
+        self._content = b""
+        self._etag = ""
+
+    def get(self) -> Optional[Tuple[bytes, str]]:
+        """Contents and entity tag, None if the file does not exist"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            content = self.path.read_bytes()
+            self._content, self._etag = content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+            self._signature = signature
+        return self._content, self._etag
+
+
+class ConditionalStaticFiles(StaticFiles):
+    """Static files whose validators follow If-None-Match lists and weak tags"""
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        if "if-none-match" in request_headers:
+            # If-Modified-Since is ignored when If-None-Match is present
+            return etag_matches(request_headers["if-none-match"], response_headers.get("etag", ""))
+        return super().is_not_modified(response_headers, request_headers)
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        # Cached copies are revalidated; unchanged files then cost a 304
+        response.headers.setdefault("cache-control", "no-cache")
+        return response
+
+
+class JSONCompressionMiddleware:
+    """
+    Gzip JSON responses of at least ``minimum_size`` bytes
+
+    Only complete JSON bodies are compressed; streamed responses (NDJSON
+    archives, server-sent events) pass through untouched so that their
+    chunks are not held back in a compressor. A compressed response's
+    entity tag becomes weak, since its bytes differ from the identity
+    encoding.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.minimum_size or not _accepts_gzip(scope):
+            await self.app(scope, receive, send)
+            return
+
+        start: List[Message] = []
+
+        async def send_compressed(message: Message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (headers.get("content-type", "").startswith("application/json")
+                        and "content-encoding" not in headers):
+                    start.append(message)
+                    return
+                await send(message)
+            elif message["type"] == "http.response.body" and start:
+                await self._send_body(start.pop(), message, send)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send_body(self, start: Message, message: Message, send: Send):
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if message.get("more_body", False) or len(body) < self.minimum_size:
+            await send(start)
+            await send(message)
+            return
+
+        body = gzip.compress(body, compresslevel=self.compresslevel, mtime=0)
+        headers["content-encoding"] = "gzip"
+        headers["content-length"] = str(len(body))
+        if "etag" in headers and not headers["etag"].startswith("W/"):
+            headers["etag"] = "W/" + headers["etag"]
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
+
+
+def _accepts_gzip(scope: Scope) -> bool:
+    """Whether the client's Accept-Encoding allows gzip"""
+    for coding in Headers(scope=scope).get("accept-encoding", "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            return True
+    return False
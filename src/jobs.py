@@ -0,0 +1,243 @@
+"""
+Jobs Module
+Background analysis jobs on a bounded in-process queue, with progress events
+"""
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class QueueFull(Exception):
+    """Raised when the job queue has no free slot"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    One submitted batch of sources: progress, results and an event log
+
+    Every change is appended to ``events`` as (name, data), so progress
+    streams can resume from any position (e.g. a Last-Event-ID).
+    """
+
+    def __init__(self, items: List[Any], size: int = 0):
+        self.id = uuid.uuid4().hex
+        # Inputs are released once the job finished
+        self.items: Optional[List[Any]] = items
+        # Bytes of input held until then
+        self.size = size
+        self.total = len(items)
+        self.results: List[Optional[Dict[str, Any]]] = [None] * self.total
+        self.completed = 0
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Tuple[str, Dict[str, Any]]] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def publish(self, name: str, data: Dict[str, Any]):
+        """Append an event and wake up everyone waiting for one"""
+        self.events.append((name, data))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """Wait until there are more than ``after`` events; False on timeout"""
+        if len(self.events) > after:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def start(self):
+        self.state = "running"
+        self.started_at = time.time()
+        self.publish("state", {"state": self.state, "total": self.total})
+
+    def record(self, index: int, result: Dict[str, Any]):
+        """Store the result of one source"""
+        self.results[index] = result
+        self.completed += 1
+        self.publish("file", {"index": index, "completed": self.completed, "total": self.total,
+                              "result": result})
+
+    def finish(self, error: Optional[str] = None):
+        self.state = "failed" if error else "done"
+        self.error = error
+        self.finished_at = time.time()
+        self.items = None
+        self.publish("done", self.to_dict(results=False))
+
+    def to_dict(self, results: bool = True) -> Dict[str, Any]:
+        """Status and progress, plus the results of finished sources"""
+        status = {
+            "id": self.id,
+            "status": self.state,
+            "total": self.total,
+            "completed": self.completed,
+            "errors": sum(result is not None and "error" in result for result in self.results),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            status["error"] = self.error
+        if results:
+            status["files"] = [result for result in self.results if result is not None]
+        return status
+
+
+class JobQueue:
+    """
+    Bounded queue of jobs processed by a fixed number of asyncio workers
+
+    Configured from the environment:
+        JOB_QUEUE_SIZE: jobs waiting to start before submissions are
+            rejected (default: 100)
+        JOB_QUEUE_BYTES: input bytes held by unfinished jobs before
+            submissions are rejected (default: 268435456); a job larger
+            than that is still accepted into an otherwise empty queue
+        JOB_WORKERS: jobs processed at the same time (default: 2)
+        JOB_RESULT_TTL: seconds a finished job is kept (default: 3600)
+
+    The handler does the actual work; it receives the job, records a result
+    per item and returns when all are done. Workers run on the event loop
+    that called ``start``; no external broker is involved, so jobs are lost
+    when the process exits.
+    """
+
+    def __init__(self, handler: Callable[[Job], Awaitable[None]], max_queued: Optional[int] = None,
+                 workers: Optional[int] = None, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        if max_queued is None:
+            max_queued = int(os.getenv("JOB_QUEUE_SIZE", 100))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("JOB_QUEUE_BYTES", 256 * 1024 * 1024))
+        if workers is None:
+            workers = int(os.getenv("JOB_WORKERS", 2))
+        if ttl is None:
+            ttl = float(os.getenv("JOB_RESULT_TTL", 3600))
+
+        self.handler = handler
+        self.max_queued = max(1, max_queued)
+        self.max_bytes = max(0, max_bytes)
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._held_bytes = 0
+        # Moving average of job durations, used to suggest a retry delay
+        self._average_seconds = 5.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and self._loop is asyncio.get_running_loop()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancel the workers; running jobs are marked as failed"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, items: List[Any], size: int = 0) -> Job:
+        """
+        Queue a job for the given items
+
+        Args:
+            items: Inputs passed to the handler
+            size: Bytes the items hold, counted against max_bytes
+
+        Raises:
+            QueueFull: If max_queued jobs are already waiting, or the
+                unfinished jobs already hold max_bytes
+        """
+        self._purge()
+        self.start()
+        if self._held_bytes and self._held_bytes + size > self.max_bytes:
+            raise QueueFull(self.retry_after())
+        job = Job(items, size)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(self.retry_after())
+        self._jobs[job.id] = job
+        self._held_bytes += size
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A queued, running or recently finished job"""
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up"""
+        return max(1, math.ceil(self._average_seconds / self.workers))
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.start()
+            try:
+                await self.handler(job)
+            except asyncio.CancelledError:
+                job.finish("Job was cancelled")
+                raise
+            except Exception as e:
+                job.finish(str(e) or type(e).__name__)
+            else:
+                job.finish()
+            finally:
+                self._held_bytes -= job.size
+                self._queue.task_done()
+            self._average_seconds = 0.8 * self._average_seconds + 0.2 * (job.finished_at - job.started_at)
+
+    def _purge(self):
+        """Forget jobs that finished more than ttl seconds ago"""
+        expired = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < expired]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue configuration and occupancy"""
+        states = [job.state for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "max_bytes": self.max_bytes,
+            "held_bytes": self._held_bytes,
+            "result_ttl": self.ttl,
+            "queued": self.queued,
+            "running": states.count("running"),
+            "finished": states.count("done") + states.count("failed")
+        }
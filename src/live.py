@@ -0,0 +1,91 @@
+"""
+Live Analysis Module
+Per-connection document state for as-you-type analysis over a WebSocket
+"""
+
+from typing import Any, Dict
+
+
+class EditError(ValueError):
+    """Raised when an edit message does not apply to the session's document"""
+
+
+class LiveDocument:
+    """
+    The editor's document as last synchronized, and the last analysis sent
+
+    Clients send either the whole text (``{"code": ...}``) or replacements
+    of code point ranges of the current text (``{"changes": [{"start",
+    "end", "text"}]}``), each with an increasing ``version``.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.version = 0
+        # Analysis result the client currently shows
+        self.result: Dict[str, Any] = {}
+
+    def apply(self, message: Dict[str, Any]):
+        """
+        Apply an edit message to the document
+
+        Raises:
+            EditError: If the message is malformed or its ranges do not fit
+                the document (the client should resend the whole text)
+        """
+        if not isinstance(message, dict):
+            raise EditError("Expected a JSON object")
+        version = message.get("version", self.version + 1)
+        if not isinstance(version, int):
+            raise EditError("Version must be an integer")
+
+        if "code" in message:
+            if not isinstance(message["code"], str):
+                raise EditError("Code must be a string")
+            text = message["code"]
+        elif isinstance(message.get("changes"), list):
+            text = self.text
+            for change in message["changes"]:
+                start, end, insert = (change.get(key) if isinstance(change, dict) else None
+                                      for key in ("start", "end", "text"))
+                if not (isinstance(start, int) and isinstance(end, int) and isinstance(insert, str)
+                        and 0 <= start <= end <= len(text)):
+                    raise EditError("Change does not apply to the current document")
+                text = text[:start] + insert + text[end:]
+        else:
+            raise EditError("Expected 'code' or 'changes'")
+
+        self.text = text
+        self.version = version
+
+    def update(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Record a new analysis and return what changed since the last one
+
+        Sections that are dicts (e.g. ``metrics``) only contain the keys
+        whose values changed, with None for removed keys; other sections are
+        sent whole. An empty dict means nothing changed.
+        """
+        changes = changed_fields(self.result, result)
+        self.result = result
+        return changes
+
+    def reset(self):
+        """Forget the last analysis, so the next one is sent in full"""
+        self.result = {}
+
+
+def changed_fields(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Sections of new that differ from old, dict sections reduced to changed keys"""
+    changes: Dict[str, Any] = {}
+    for section, value in new.items():
+        previous = old.get(section)
+        if value == previous:
+            continue
+        if isinstance(value, dict) and isinstance(previous, dict):
+            changes[section] = {key: item for key, item in value.items() if previous.get(key) != item}
+            changes[section].update({key: None for key in previous if key not in value})
+        else:
+            changes[section] = value
+    changes.update({section: None for section in old if section not in new})
+    return changes
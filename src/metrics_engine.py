@@ -0,0 +1,348 @@
+"""
+Metrics Engine Module
+Computes complexity, Halstead, structural and smell metrics in a single AST pass
+"""
+
+import ast
+import math
+from collections import deque
+from operator import itemgetter
+from typing import Dict, Any, List, Optional, Tuple
+
+from radon.metrics import mi_compute
+
+from .clones import NODE_IDS, minhashes
+
+
+# Statements that increase the nesting depth
+NESTING_NODES = (ast.If, ast.For, ast.While, ast.With)
+
+# Thresholds used by the code smell detection
+LONG_FUNCTION_LINES = 50
+MAX_PARAMETERS = 5
+
+
+class _Scope:
+    """Complexity accumulator mirroring one radon ComplexityVisitor"""
+
+    __slots__ = ("complexity", "functions", "classes")
+
+    def __init__(self, complexity: int = 0):
+        self.complexity = complexity
+        self.functions: List["_FunctionBlock"] = []
+        self.classes: List["_ClassBlock"] = []
+
+
+class _FunctionBlock:
+    """A function or method whose complexity is resolved after the pass"""
+
+    __slots__ = ("name", "body")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.body = _Scope()
+
+    @property
+    def complexity(self) -> int:
+        return 1 + self.body.complexity
+
+
+class _ClassBlock:
+    """A class whose complexity is resolved after the pass"""
+
+    __slots__ = ("name", "body")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.body = _Scope()
+
+    @property
+    def methods(self) -> List[_FunctionBlock]:
+        return self.body.functions
+
+    @property
+    def real_complexity(self) -> int:
+        return 1 + self.body.complexity + sum(m.complexity for m in self.methods)
+
+    @property
+    def complexity(self) -> int:
+        methods = len(self.methods)
+        if not methods:
+            return self.real_complexity
+        return int(self.real_complexity / float(methods)) + (methods > 1)
+
+
+class MetricsCollector:
+    """
+    Single-pass collector for AST based metrics
+
+    Walks the tree once (breadth-first, without recursion) and gathers the
+    cyclomatic complexity blocks, Halstead operators/operands, structural
+    counts, maximum nesting depth and AST based code smells. The complexity
+    and Halstead rules follow radon's visitors so results stay comparable
+    with ``cc_visit``, ``h_visit`` and ``mi_visit``.
+    """
+
+    def __init__(self, module_complexity: int = 1):
+        self.module = _Scope(complexity=module_complexity)
+
+        # Halstead counters
+        self.operators = 0
+        self.operands = 0
+        self.operators_seen = set()
+        self.operands_seen = set()
+        self.anonymous_operands = 0
+
+        # Structural counts
+        self.structure = {
+            "functions": 0,
+            "classes": 0,
+            "imports": 0,
+            "loops": 0,
+            "conditionals": 0
+        }
+        self.max_depth = 0
+
+        # Smells found while walking as (tree level, message), so results
+        # of separately visited units can be merged back into ast.walk order
+        self.long_functions: List[Tuple[int, str]] = []
+        self.many_parameters: List[Tuple[int, str]] = []
+        # MinHash signatures of functions large enough to be clones, as
+        # (tree level, name, signature)
+        self.fingerprints: List[Tuple[int, str, Any]] = []
+
+    def visit(self, tree: ast.AST) -> "MetricsCollector":
+        """Collect metrics for the given tree"""
+        return self._walk([tree], 0, self.module)
+
+    @classmethod
+    def for_units(cls, nodes: List[ast.stmt], level: int = 1) -> "MetricsCollector":
+        """
+        Collect metrics for consecutive statements of a module or class body
+
+        The result only covers the given statements; combine the collectors
+        of all statements with ``merge`` (or ``merge_class`` for the body of
+        a class) to get the metrics of the whole module.
+        """
+        collector = cls(module_complexity=0)
+        return collector._walk(nodes, level, collector.module)
+
+    @classmethod
+    def for_class_header(cls, node: ast.ClassDef, level: int = 1) -> "MetricsCollector":
+        """Collect metrics for a class definition without its body"""
+        collector = cls(module_complexity=0)
+        collector.structure["classes"] += 1
+        header = [child for child in ast.iter_child_nodes(node) if not isinstance(child, ast.stmt)]
+        return collector._walk(header, level + 1, None)
+
+    @classmethod
+    def merge(cls, collectors: List["MetricsCollector"], module_complexity: int = 1) -> "MetricsCollector":
+        """Combine the collectors of all top-level statements of a module"""
+        merged = cls(module_complexity=module_complexity)
+        for collector in collectors:
+            merged.module.complexity += collector.module.complexity
+            merged.module.functions.extend(collector.module.functions)
+            merged.module.classes.extend(collector.module.classes)
+            merged.operators += collector.operators
+            merged.operands += collector.operands
+            merged.operators_seen.update(collector.operators_seen)
+            merged.operands_seen.update(collector.operands_seen)
+            merged.anonymous_operands += collector.anonymous_operands
+            for key, value in collector.structure.items():
+                merged.structure[key] += value
+            merged.max_depth = max(merged.max_depth, collector.max_depth)
+            merged.long_functions.extend(collector.long_functions)
+            merged.many_parameters.extend(collector.many_parameters)
+            merged.fingerprints.extend(collector.fingerprints)
+
+        # Breadth-first order is level by level, statement by statement
+        merged.long_functions.sort(key=itemgetter(0))
+        merged.many_parameters.sort(key=itemgetter(0))
+        merged.fingerprints.sort(key=itemgetter(0))
+        return merged
+
+    @classmethod
+    def merge_class(cls, name: str, header: "MetricsCollector",
+                    members: List["MetricsCollector"]) -> "MetricsCollector":
+        """Combine a class header with the collectors of its body statements"""
+        merged = cls.merge([header] + members, module_complexity=0)
+        block = _ClassBlock(name)
+        block.body = merged.module
+        merged.module = _Scope()
+        merged.module.classes.append(block)
+        return merged
+
+    def _walk(self, roots: List[ast.AST], level: int, scope: Optional[_Scope]) -> "MetricsCollector":
+        """Breadth-first traversal starting from roots at the given tree level"""
+        # Each entry: node, tree level, nesting depth, complexity scope (None
+        # when the node does not count towards complexity), Halstead context,
+        # whether the node counts towards Halstead metrics and the node type
+        # ids of the enclosing function's body (for clone fingerprints)
+        queue = deque((root, level, self._depth(root, 0), scope, None, True, None) for root in roots)
+        popleft = queue.popleft
+        append = queue.append
+        structure = self.structure
+        functions = []
+
+        while queue:
+            node, level, depth, scope, context, halstead, nodes = popleft()
+            node_type = type(node)
+            name = node_type.__name__
+            if nodes is not None:
+                nodes.append(NODE_IDS.get(node_type, 0))
+
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+            # Structural metrics and smells
+            if node_type is ast.FunctionDef:
+                structure["functions"] += 1
+                self._check_function(node, level)
+            elif node_type is ast.ClassDef:
+                structure["classes"] += 1
+            elif node_type is ast.Import or node_type is ast.ImportFrom:
+                structure["imports"] += 1
+            elif node_type is ast.For or node_type is ast.While:
+                structure["loops"] += 1
+            elif node_type is ast.If:
+                structure["conditionals"] += 1
+
+            # Functions and classes open new complexity scopes
+            if name in ("FunctionDef", "AsyncFunctionDef"):
+                block = _FunctionBlock(node.name)
+                scope.functions.append(block)
+                body_nodes = []
+                functions.append((level, node.name, body_nodes))
+                for child in node.body:
+                    append((child, level + 1, self._depth(child, depth), block.body, node.name, True, body_nodes))
+                continue
+
+            if name == "ClassDef":
+                block = _ClassBlock(node.name)
+                scope.classes.append(block)
+                for child in ast.iter_child_nodes(node):
+                    if isinstance(child, ast.stmt):
+                        append((child, level + 1, self._depth(child, depth), block.body, context, True, nodes))
+                    else:
+                        append((child, level + 1, depth, None, context, True, nodes))
+                continue
+
+            if scope is not None:
+                scope.complexity += self._decision_points(node, name)
+            if halstead:
+                self._count_operations(node, name, context)
+
+            # Assert statements do not count their operands as decisions
+            child_scope = None if name == "Assert" else scope
+            for child in ast.iter_child_nodes(node):
+                append((child, level + 1, self._depth(child, depth), child_scope, context, halstead, nodes))
+
+        # Bodies are complete once the walk is done
+        signatures = minhashes([body_nodes for _, _, body_nodes in functions])
+        for (level, name, _), signature in zip(functions, signatures):
+            if signature is not None:
+                self.fingerprints.append((level, name, signature))
+        return self
+
+    @staticmethod
+    def _depth(node: ast.AST, depth: int) -> int:
+        """Nesting depth of a child node"""
+        return depth + 1 if isinstance(node, NESTING_NODES) else depth
+
+    def _check_function(self, node: ast.FunctionDef, level: int):
+        """Record smells attached to a single function"""
+        if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
+            func_length = node.end_lineno - node.lineno
+            if func_length > LONG_FUNCTION_LINES:
+                self.long_functions.append((level, f"Long function '{node.name}' ({func_length} lines)"))
+
+        num_params = len(node.args.args)
+        if num_params > MAX_PARAMETERS:
+            self.many_parameters.append((level, f"Function '{node.name}' has too many parameters ({num_params})"))
+
+    @staticmethod
+    def _decision_points(node: ast.AST, name: str) -> int:
+        """Cyclomatic complexity added by a single node"""
+        if name == "Try":
+            return len(node.handlers) + bool(node.orelse)
+        if name == "BoolOp":
+            return len(node.values) - 1
+        if name in ("If", "IfExp", "Assert"):
+            return 1
+        if name == "Match":
+            wildcard = any(getattr(case.pattern, "pattern", False) is None for case in node.cases)
+            return max(0, len(node.cases) - wildcard)
+        if name in ("For", "While", "AsyncFor"):
+            return bool(node.orelse) + 1
+        if name == "comprehension":
+            return len(node.ifs) + 1
+        return 0
+
+    def _count_operations(self, node: ast.AST, name: str, context: Optional[str]):
+        """Update Halstead operator and operand counts for a single node"""
+        if name == "BinOp":
+            ops, operands = (node.op,), (node.left, node.right)
+        elif name == "UnaryOp":
+            ops, operands = (node.op,), (node.operand,)
+        elif name == "BoolOp":
+            ops, operands = (node.op,), node.values
+        elif name == "AugAssign":
+            ops, operands = (node.op,), (node.target, node.value)
+        elif name == "Compare":
+            ops, operands = node.ops, node.comparators + [node.left]
+        else:
+            return
+
+        self.operators += len(ops)
+        self.operands += len(operands)
+        self.operators_seen.update(type(op).__name__ for op in ops)
+        for operand in operands:
+            if isinstance(operand, ast.Name):
+                self.operands_seen.add((context, operand.id))
+            elif isinstance(operand, ast.Attribute):
+                self.operands_seen.add((context, operand.attr))
+            elif isinstance(operand, ast.Constant):
+                self.operands_seen.add((context, operand.value))
+            else:
+                # Any other expression counts as a distinct operand
+                self.anonymous_operands += 1
+
+    @property
+    def blocks(self) -> List[Any]:
+        """Complexity blocks as reported by radon's cc_visit"""
+        blocks: List[Any] = list(self.module.functions)
+        for cls in self.module.classes:
+            blocks.append(cls)
+            blocks.extend(cls.methods)
+        return blocks
+
+    @property
+    def total_complexity(self) -> int:
+        """Module complexity used by the maintainability index"""
+        return (
+            self.module.complexity
+            + sum(f.complexity - 1 for f in self.module.functions)
+            + sum(c.real_complexity - 1 for c in self.module.classes)
+        )
+
+    def halstead(self) -> Dict[str, float]:
+        """Halstead volume and difficulty for the whole tree"""
+        h1, h2 = len(self.operators_seen), len(self.operands_seen) + self.anonymous_operands
+        h = h1 + h2
+        length = self.operators + self.operands
+        volume = length * math.log(h, 2) if h != 0 else 0
+        difficulty = (h1 * self.operands) / float(2 * h2) if h2 != 0 else 0
+        return {"volume": volume, "difficulty": difficulty}
+
+    def maintainability_index(self, raw_metrics: Any, volume: float) -> float:
+        """Maintainability index (counting multi-line strings as comments)"""
+        comment_lines = raw_metrics.comments + raw_metrics.multi
+        comments = comment_lines / float(raw_metrics.sloc) * 100 if raw_metrics.sloc != 0 else 0
+        return mi_compute(volume, self.total_complexity, raw_metrics.lloc, comments)
+
+    def smells(self) -> List[str]:
+        """AST based code smells in reporting order"""
+        smells = [message for _, message in self.long_functions + self.many_parameters]
+        if self.max_depth > 4:
+            smells.append(f"Deeply nested code (depth: {self.max_depth})")
+        return smells
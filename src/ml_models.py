@@ -3,211 +3,606 @@ ML Models Module
 Uses machine learning to predict code quality
 """
 
-import re
+import os
+import hashlib
+import tempfile
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+import sklearn
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 from pathlib import Path
 
+from .forest import CompiledForest
+from .telemetry import Stopwatch, NULL_STOPWATCH
+from .tokens import TokenCounts, count_tokens
+
+
+# Location of the pre-trained model artifact (override with MODEL_PATH)
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parent.parent / "models" / "code_quality.joblib"
+
+# Bump when the layout of the saved artifact changes
+MODEL_FORMAT = 2
+
+# Heuristic features reported with every prediction, in feature matrix order
+FEATURE_NAMES = (
+    "line_length_avg", "has_docstrings", "has_type_hints", "num_comments", "num_functions",
+    "num_classes", "has_main_guard", "uses_comprehension", "proper_naming",
+)
+_FEATURE_TYPES = (float, bool, bool, int, int, int, bool, bool, bool)
+
+# Lowest score of each letter grade
+_RATING_THRESHOLDS = np.array([40, 55, 70, 85])
+_RATING_LETTERS = np.array(["F", "D", "C", "B", "A"])
+
+
+def seed_samples() -> List[Tuple[str, str]]:
+    """Synthetic (source, label) examples the model is first trained on"""
+    # Training samples (good vs bad code patterns)
+    training_samples = [
+        # Good code examples
+        ("def calculate_sum(numbers): return sum(numbers)", "good"),
+        ("class DataProcessor:\n    def __init__(self):\n        self.data = []", "good"),
+        ("def validate_email(email: str) -> bool:\n    return '@' in email", "good"),
+        ("import logging\nlogger = logging.getLogger(__name__)", "good"),
+        ("def process_data(data: list) -> dict:\n    result = {}\n    return result", "good"),
+        
+        # Bad code examples
+        ("def f(x): return x+x+x+x+x+x", "bad"),
+        ("a=1;b=2;c=3;d=4;e=5;f=6", "bad"),
+        ("def foo():\n    if True:\n        if True:\n            if True:\n                pass", "bad"),
+        ("x = 12345678; y = 98765432", "bad"),
+        ("def function(a,b,c,d,e,f,g,h,i): pass", "bad"),
+    ]
+    
+    # Add more synthetic examples
+    good_patterns = [
+        "def well_named_function():\n    '''Docstring'''\n    pass",
+        "class MyClass:\n    '''Class docstring'''\n    pass",
+        "# This is a helpful comment\nresult = process_input(data)",
+        "try:\n    risky_operation()\nexcept Exception as e:\n    handle_error(e)",
+        "with open('file.txt') as f:\n    content = f.read()",
+    ]
+    
+    bad_patterns = [
+        "def a(): pass\ndef b(): pass\ndef c(): pass",
+        "x=1;y=2;z=3;a=4;b=5;c=6;d=7",
+        "global var1, var2, var3, var4",
+        "eval(user_input)",
+        "except: pass",
+    ]
+    
+    return (
+        training_samples + 
+        [(p, "good") for p in good_patterns] +
+        [(p, "bad") for p in bad_patterns]
+    )
+
 
 class CodeQualityPredictor:
     """ML-based code quality prediction"""
     
-    def __init__(self):
+    def __init__(self, model_path: Optional[Union[str, Path]] = None, load: bool = True):
+        """
+        Load the pre-trained model artifact, training from scratch if there is none
+        
+        Args:
+            model_path: Artifact location (default: MODEL_PATH or models/code_quality.joblib)
+            load: Set to False to always train, e.g. when building the artifact
+        """
         self.vectorizer = TfidfVectorizer(max_features=100, ngram_range=(1, 2))
         self.model = RandomForestClassifier(n_estimators=50, random_state=42)
-        self._train_initial_model()
+        self.model_path = Path(model_path or os.getenv("MODEL_PATH") or DEFAULT_MODEL_PATH)
+        
+        if load and self._load_artifact(self.model_path):
+            self.source = "artifact"
+        else:
+            self._train_initial_model()
+            self.source = "trained"
     
-    def _train_initial_model(self):
-        """Train a basic model with synthetic examples"""
-        # Training samples (good vs bad code patterns)
-        training_samples = [
-            # Good code examples
-            ("def calculate_sum(numbers): return sum(numbers)", "good"),
-            ("class DataProcessor:\n    def __init__(self):\n        self.data = []", "good"),
-            ("def validate_email(email: str) -> bool:\n    return '@' in email", "good"),
-            ("import logging\nlogger = logging.getLogger(__name__)", "good"),
-            ("def process_data(data: list) -> dict:\n    result = {}\n    return result", "good"),
+    @classmethod
+    def from_artifact(cls, path: Union[str, Path]) -> "CodeQualityPredictor":
+        """
+        Load a saved model, without falling back to training
+        
+        Raises:
+            ValueError: If the artifact is missing or unusable
+        """
+        predictor = cls.__new__(cls)
+        predictor.model_path = Path(path)
+        if not predictor._load_artifact(predictor.model_path):
+            raise ValueError(f"No usable model artifact at {path}")
+        predictor.source = "artifact"
+        return predictor
+    
+    def _load_artifact(self, path: Path) -> bool:
+        """
+        Load a saved model, returning False if it is missing or unusable
+        
+        Arrays are memory-mapped so worker processes loading the same
+        artifact share its pages instead of each holding a private copy.
+        """
+        if not path.is_file():
+            return False
+        try:
+            artifact = joblib.load(path, mmap_mode="r")
+        except Exception:
+            return False
+        
+        if not isinstance(artifact, dict):
+            return False
+        # Pickled estimators are only reliable with the version that wrote them
+        if artifact.get("format") != MODEL_FORMAT or artifact.get("sklearn_version") != sklearn.__version__:
+            return False
+        
+        self.vectorizer = artifact["vectorizer"]
+        self.model = artifact["model"]
+        self.forest = artifact["forest"]
+        self.version = artifact["version"]
+        return True
+    
+    def save(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Write the trained model to a versioned artifact
+        
+        The file is written uncompressed (so it can be memory-mapped) and
+        atomically replaced, so running servers never see a partial file.
+        
+        Args:
+            path: Destination (default: the predictor's model_path)
             
-            # Bad code examples
-            ("def f(x): return x+x+x+x+x+x", "bad"),
-            ("a=1;b=2;c=3;d=4;e=5;f=6", "bad"),
-            ("def foo():\n    if True:\n        if True:\n            if True:\n                pass", "bad"),
-            ("x = 12345678; y = 98765432", "bad"),
-            ("def function(a,b,c,d,e,f,g,h,i): pass", "bad"),
-        ]
-        
-        # Add more synthetic examples
-        good_patterns = [
-            "def well_named_function():\n    '''Docstring'''\n    pass",
-            "class MyClass:\n    '''Class docstring'''\n    pass",
-            "# This is a helpful comment\nresult = process_input(data)",
-            "try:\n    risky_operation()\nexcept Exception as e:\n    handle_error(e)",
-            "with open('file.txt') as f:\n    content = f.read()",
-        ]
-        
-        bad_patterns = [
-            "def a(): pass\ndef b(): pass\ndef c(): pass",
-            "x=1;y=2;z=3;a=4;b=5;c=6;d=7",
-            "global var1, var2, var3, var4",
-            "eval(user_input)",
-            "except: pass",
-        ]
-        
-        all_samples = (
-            training_samples + 
-            [(p, "good") for p in good_patterns] +
-            [(p, "bad") for p in bad_patterns]
-        )
+        Returns:
+            Path of the written artifact
+        """
+        path = Path(path or self.model_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        artifact = {
+            "format": MODEL_FORMAT,
+            "version": self.version,
+            "sklearn_version": sklearn.__version__,
+            "vectorizer": self.vectorizer,
+            "model": self.model,
+            "forest": self.forest,
+        }
         
-        codes, labels = zip(*all_samples)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(artifact, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+    
+    def _train_initial_model(self):
+        """Train a basic model with synthetic examples"""
+        codes, labels = zip(*seed_samples())
+        self.train(codes, labels)
+    
+    def train(self, codes: Sequence[str], labels: Sequence[str]):
+        """
+        Fit the vectorizer and forest on labeled sources
         
+        Args:
+            codes: Python source codes
+            labels: "good" or "bad", one per source
+        """
         # Extract features
         X = self.vectorizer.fit_transform(codes)
         y = [1 if label == "good" else 0 for label in labels]
         
         # Train model
         self.model.fit(X, y)
+        
+        # Fingerprint of training data and parameters, used to key cached results
+        self.version = self._fingerprint(codes, y)
+        # Inference runs on the flattened forest, not on scikit-learn
+        self.forest = CompiledForest.from_sklearn(self.model)
+    
+    def accuracy(self, codes: Sequence[str], labels: Sequence[str]) -> float:
+        """Share of labeled sources the classifier puts on the right side (1.0 if none)"""
+        if not codes:
+            return 1.0
+        probabilities = self.forest.predict_proba(self.vectorizer.transform(codes))
+        predicted = self.model.classes_[probabilities.argmax(axis=1)]
+        expected = np.array([1 if label == "good" else 0 for label in labels])
+        return float(np.mean(predicted == expected))
+    
+    def _fingerprint(self, codes, labels) -> str:
+        """Short hash identifying the trained model"""
+        digest = hashlib.sha256(repr((
+            list(codes),
+            list(labels),
+            sorted(self.vectorizer.get_params().items(), key=str),
+            sorted(self.model.get_params().items(), key=str),
+        )).encode('utf-8'))
+        return digest.hexdigest()[:12]
     
-    def predict_quality(self, code: str, metrics: Dict[str, Any] = None) -> Dict[str, Any]:
+    def predict_quality(self, code: str, metrics: Dict[str, Any] = None,
+                        stopwatch: Optional[Stopwatch] = None,
+                        tokens: Optional[TokenCounts] = None) -> Dict[str, Any]:
         """
         Predict code quality using ML model with optional static metrics
         
         Args:
             code: Python source code
             metrics: Optional static analysis metrics for better scoring
+            stopwatch: Optional stopwatch charged with the time of each stage
+            tokens: Token counts of code from the analyzer, if available
             
         Returns:
             Dictionary with prediction results
         """
+        stopwatch = stopwatch or NULL_STOPWATCH
         try:
-            # Extract features
-            features = self._extract_features(code)
-            
             # Vectorize code
             X = self.vectorizer.transform([code])
+            stopwatch.lap("vectorize")
             
             # Predict
-            prediction = self.model.predict(X)[0]
-            probabilities = self.model.predict_proba(X)[0]
+            probabilities = self.forest.predict_proba(X)
+            stopwatch.lap("inference")
+            
+            result = self._build_predictions([code], probabilities, [metrics], [tokens])[0]
+            stopwatch.lap("scoring")
+            return result
+        
+        except Exception as e:
+            return self._failed_prediction(e)
+    
+    def predict_quality_batch(self, codes: List[str],
+                              metrics: Optional[List[Dict[str, Any]]] = None,
+                              tokens: Optional[List[Optional[TokenCounts]]] = None) -> List[Dict[str, Any]]:
+        """
+        Predict code quality for many sources with a single model call
+        
+        Args:
+            codes: Python source codes
+            metrics: Optional static analysis metrics, one entry per source
+            tokens: Optional token counts from the analyzer, one entry per source
+            
+        Returns:
+            List of prediction results, identical to predict_quality per source
+        """
+        if metrics is None:
+            metrics = [None] * len(codes)
+        if tokens is None:
+            tokens = [None] * len(codes)
+        if not codes:
+            return []
+        
+        try:
+            # Vectorize, predict and score the whole batch at once
+            X = self.vectorizer.transform(codes)
+            probabilities = self.forest.predict_proba(X)
+            return self._build_predictions(codes, probabilities, metrics, tokens)
+        except Exception:
+            # Fall back to per-source prediction so one bad input is isolated
+            return [
+                self.predict_quality(code, m, tokens=t)
+                for code, m, t in zip(codes, metrics, tokens)
+            ]
+    
+    def predict_quality_arrays(self, codes: List[str],
+                               metrics: Optional[List[Dict[str, Any]]] = None,
+                               tokens: Optional[List[Optional[TokenCounts]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Score many sources as arrays, without building a result per source
+        
+        Meant for bulk rescoring; values match predict_quality_batch.
+        
+        Args:
+            codes: Python source codes
+            metrics: Optional static analysis metrics, one entry per source
+            tokens: Optional token counts from the analyzer, one entry per source
             
-            # Calculate quality score (0-100)
-            if metrics and 'maintainability_index' in metrics:
-                # Use static metrics for better scoring
-                quality_score = self._calculate_composite_score(features, probabilities, metrics)
-            else:
-                quality_score = self._calculate_quality_score(features, probabilities)
+        Returns:
+            Arrays of length N: quality_score (unrounded), prediction,
+            confidence, rating, plus the (N, len(FEATURE_NAMES)) features
+        """
+        if metrics is None:
+            metrics = [None] * len(codes)
+        probabilities = self.forest.predict_proba(self.vectorizer.transform(codes))
+        features = self.extract_feature_matrix(codes, tokens)
+        scores = self._score_matrix(features, probabilities, metrics)
+        return {
+            "quality_score": scores,
+            "prediction": np.where(scores >= 70, "good", "needs_improvement"),
+            "confidence": np.round(probabilities.max(axis=1) * 100, 2),
+            "rating": self._ratings(scores),
+            "features": features
+        }
+    
+    def stream_features(self) -> "StreamedFeatures":
+        """Accumulator for the ML inputs of a source read in chunks"""
+        return StreamedFeatures(self.vectorizer)
+    
+    def predict_quality_streamed(self, features: "StreamedFeatures", metrics: Dict[str, Any] = None,
+                                 tokens: Optional[TokenCounts] = None,
+                                 stopwatch: Optional[Stopwatch] = None) -> Dict[str, Any]:
+        """
+        Predict the quality of a source that was fed to StreamedFeatures in chunks
+        
+        Args:
+            features: Features accumulated over the whole source
+            metrics: Optional static analysis metrics for better scoring
+            tokens: Token counts of the whole source
+            stopwatch: Optional stopwatch charged with the time of each stage
             
-            return {
-                "quality_score": round(quality_score, 2),
-                "prediction": "good" if quality_score >= 70 else "needs_improvement",
-                "confidence": round(max(probabilities) * 100, 2),
-                "features": features,
-                "rating": self._get_rating(quality_score)
-            }
+        Returns:
+            Dictionary with prediction results, as predict_quality returns
+            for the joined source
+        """
+        stopwatch = stopwatch or NULL_STOPWATCH
+        try:
+            X = features.tfidf()
+            stopwatch.lap("vectorize")
+            probabilities = self.forest.predict_proba(X)
+            stopwatch.lap("inference")
+            result = self._predictions(features.feature_matrix(tokens), probabilities, [metrics])[0]
+            stopwatch.lap("scoring")
+            return result
         
         except Exception as e:
-            return {
-                "quality_score": 50,
-                "prediction": "unknown",
-                "confidence": 0,
-                "error": str(e),
-                "rating": "C"
-            }
-    
-    def _extract_features(self, code: str) -> Dict[str, Any]:
-        """Extract features from code"""
-        lines = code.split('\n')
+            return self._failed_prediction(e)
+    
+    def _build_predictions(self, codes: List[str], probabilities: np.ndarray,
+                           metrics: List[Optional[Dict[str, Any]]],
+                           tokens: List[Optional[TokenCounts]]) -> List[Dict[str, Any]]:
+        """Turn model probabilities for many sources into prediction results"""
+        return self._predictions(self.extract_feature_matrix(codes, tokens), probabilities, metrics)
+    
+    def _predictions(self, features: np.ndarray, probabilities: np.ndarray,
+                     metrics: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Prediction results from the feature matrix and model probabilities"""
+        scores = self._score_matrix(features, probabilities, metrics)
+        rounded = np.round(scores, 2)
+        confidence = np.round(probabilities.max(axis=1) * 100, 2)
+        ratings = self._ratings(scores)
         
+        results = []
+        for i, score in enumerate(scores.tolist()):
+            results.append({
+                # Scores clipped to the range bounds are reported as integers
+                "quality_score": 0 if score <= 0 else 100 if score >= 100 else float(rounded[i]),
+                "prediction": "good" if score >= 70 else "needs_improvement",
+                "confidence": float(confidence[i]),
+                "features": self._feature_dict(features[i]),
+                "rating": str(ratings[i]),
+                "model_version": self.version
+            })
+        return results
+    
+    def _failed_prediction(self, error: Exception) -> Dict[str, Any]:
+        """Neutral result returned when prediction fails"""
         return {
-            "line_length_avg": sum(len(line) for line in lines) / len(lines) if lines else 0,
-            "has_docstrings": '"""' in code or "'''" in code,
-            "has_type_hints": '->' in code or ': ' in code,
-            "num_comments": len(re.findall(r'#.*', code)),
-            "num_functions": len(re.findall(r'def\s+\w+', code)),
-            "num_classes": len(re.findall(r'class\s+\w+', code)),
-            "has_main_guard": '__main__' in code,
-            "uses_comprehension": '[' in code and 'for' in code,
-            "proper_naming": bool(re.search(r'def\s+[a-z_][a-z0-9_]*', code)),
+            "quality_score": 50,
+            "prediction": "unknown",
+            "confidence": 0,
+            "error": str(error),
+            "rating": "C",
+            "model_version": self.version
         }
     
-    def _calculate_quality_score(self, features: Dict[str, Any], probabilities: np.ndarray) -> float:
-        """Calculate overall quality score with balanced weighting"""
-        # Base score from ML prediction (40% weight)
-        ml_score = probabilities[1] * 100
-        base_score = ml_score * 0.4
-        
-        # Feature-based score (60% weight)
-        feature_score = 50  # Start at middle
-        
-        # Positive features (each worth up to 10 points)
-        if features["has_docstrings"]:
-            feature_score += 8
-        if features["has_type_hints"]:
-            feature_score += 8
-        if features["num_comments"] > 0:
-            feature_score += 4  # Reduced weight for comments
-        if features["has_main_guard"]:
-            feature_score += 3
-        if features["proper_naming"]:
-            feature_score += 7
-        if features["uses_comprehension"]:
-            feature_score += 3
-        
-        # Penalties
-        if features["line_length_avg"] > 100:
-            feature_score -= 5
-        if features["num_functions"] == 0 and features["num_classes"] == 0:
-            feature_score -= 10  # Empty or trivial code
-        
-        # Combine scores
-        final_score = min(100, max(0, base_score + feature_score * 0.6))
-        return final_score
-    
-    def _calculate_composite_score(self, features: Dict[str, Any], 
-                                   probabilities: np.ndarray, 
-                                   metrics: Dict[str, Any]) -> float:
-        """Calculate score using both ML and static analysis metrics"""
-        # ML component (30% weight)
-        ml_score = probabilities[1] * 100 * 0.3
-        
-        # Maintainability Index (30% weight) - normalized to 0-100
-        mi_score = metrics.get('maintainability_index', 50) * 0.3
-        
-        # Complexity (20% weight) - lower is better
-        complexity = metrics.get('avg_complexity', 5)
-        complexity_score = max(0, 100 - (complexity * 5)) * 0.2
-        
-        # Feature-based (20% weight)
-        feature_score = 0
-        if features["has_docstrings"]:
-            feature_score += 5
-        if features["has_type_hints"]:
-            feature_score += 5
-        if features["proper_naming"]:
-            feature_score += 4
-        if features["num_comments"] > 0:
-            feature_score += 2
-        if metrics.get('comment_ratio', 0) > 0.1:
-            feature_score += 4
-        
-        feature_score = min(100, feature_score * 5) * 0.2
-        
-        # Calculate final score
-        final_score = ml_score + mi_score + complexity_score + feature_score
-        return min(100, max(0, final_score))
-    
-    def _get_rating(self, score: float) -> str:
-        """Convert score to letter grade"""
-        if score >= 85:
-            return "A"
-        elif score >= 70:
-            return "B"
-        elif score >= 55:
-            return "C"
-        elif score >= 40:
-            return "D"
+    def extract_feature_matrix(self, codes: List[str],
+                               tokens: Optional[List[Optional[TokenCounts]]] = None) -> np.ndarray:
+        """
+        Extract heuristic features of many sources into a matrix
+        
+        Comments, functions, classes and docstrings are counted on the
+        tokens of each source, so e.g. a '#' inside a string is no comment.
+        
+        Args:
+            codes: Python source codes
+            tokens: Token counts already computed by the analyzer, one entry
+                per source (None entries are tokenized here)
+            
+        Returns:
+            Array of shape (N, len(FEATURE_NAMES)); flags are 0/1
+        """
+        n = len(codes)
+        if not n:
+            return np.zeros((0, len(FEATURE_NAMES)))
+        
+        if tokens is None:
+            tokens = [None] * n
+        counts = np.array([
+            counts if counts is not None else count_tokens(code)
+            for code, counts in zip(codes, tokens)
+        ]).reshape(n, len(TokenCounts._fields))
+        
+        return _feature_matrix(
+            counts,
+            lengths=np.fromiter(map(len, codes), dtype=np.int64, count=n),
+            newlines=np.fromiter((code.count('\n') for code in codes), dtype=np.int64, count=n),
+            type_hints=['->' in code or ': ' in code for code in codes],
+            main_guard=['__main__' in code for code in codes],
+            comprehension=['[' in code and 'for' in code for code in codes]
+        )
+    
+    @staticmethod
+    def _feature_dict(row: np.ndarray) -> Dict[str, Any]:
+        """Features of one source as reported in the prediction result"""
+        return {
+            name: kind(value)
+            for name, kind, value in zip(FEATURE_NAMES, _FEATURE_TYPES, row.tolist())
+        }
+    
+    def _score_matrix(self, features: np.ndarray, probabilities: np.ndarray,
+                      metrics: List[Optional[Dict[str, Any]]]) -> np.ndarray:
+        """
+        Quality scores (0-100) for all sources
+        
+        Sources with static metrics get the composite score, the others the
+        score based on the ML prediction and source features alone.
+        """
+        f = {name: features[:, i] for i, name in enumerate(FEATURE_NAMES)}
+        ml_score = probabilities[:, 1] * 100
+        
+        # Without static metrics: ML prediction (40% weight) and features (60% weight)
+        feature_score = (
+            50
+            + 8 * f["has_docstrings"]
+            + 8 * f["has_type_hints"]
+            + 4 * (f["num_comments"] > 0)  # Reduced weight for comments
+            + 3 * f["has_main_guard"]
+            + 7 * f["proper_naming"]
+            + 3 * f["uses_comprehension"]
+            - 5 * (f["line_length_avg"] > 100)
+            - 10 * ((f["num_functions"] == 0) & (f["num_classes"] == 0))  # Empty or trivial code
+        )
+        basic = ml_score * 0.4 + feature_score * 0.6
+        
+        # With static metrics: ML (30%), maintainability (30%), complexity (20%)
+        # and features (20%)
+        composite_rows = np.array([bool(m) and 'maintainability_index' in m for m in metrics])
+        composite = basic
+        if composite_rows.any():
+            known = [m if use else {} for m, use in zip(metrics, composite_rows)]
+            mi = np.array([m.get('maintainability_index', 50) for m in known], dtype=float)
+            complexity = np.array([m.get('avg_complexity', 5) for m in known], dtype=float)
+            comment_ratio = np.array([m.get('comment_ratio', 0) for m in known], dtype=float)
+            
+            metric_feature_score = (
+                5 * f["has_docstrings"]
+                + 5 * f["has_type_hints"]
+                + 4 * f["proper_naming"]
+                + 2 * (f["num_comments"] > 0)
+                + 4 * (comment_ratio > 0.1)
+            )
+            composite = (
+                ml_score * 0.3
+                + mi * 0.3
+                + np.maximum(0, 100 - complexity * 5) * 0.2
+                + np.minimum(100, metric_feature_score * 5) * 0.2
+            )
+        
+        scores = np.where(composite_rows, composite, basic)
+        return np.minimum(100, np.maximum(0, scores))
+    
+    @staticmethod
+    def _ratings(scores: np.ndarray) -> np.ndarray:
+        """Convert scores to letter grades"""
+        return _RATING_LETTERS[np.searchsorted(_RATING_THRESHOLDS, scores, side='right')]
+
+
+def _feature_matrix(counts: np.ndarray, lengths: np.ndarray, newlines: np.ndarray,
+                    type_hints: Any, main_guard: Any, comprehension: Any) -> np.ndarray:
+    """
+    Heuristic feature matrix from per-source token counts and text statistics
+    
+    Args:
+        counts: Token counts, shape (N, len(TokenCounts._fields))
+        lengths: Characters per source
+        newlines: '\n' characters per source
+        type_hints: Whether each source contains '->' or ': '
+        main_guard: Whether each source contains '__main__'
+        comprehension: Whether each source contains both '[' and 'for'
+    """
+    def count(field: str) -> np.ndarray:
+        return counts[:, TokenCounts._fields.index(field)]
+    
+    matrix = np.zeros((len(counts), len(FEATURE_NAMES)))
+    column = FEATURE_NAMES.index
+    # Mean length of the lines separated by '\n'
+    matrix[:, column("line_length_avg")] = (lengths - newlines) / (newlines + 1)
+    matrix[:, column("has_docstrings")] = count("docstrings") > 0
+    matrix[:, column("has_type_hints")] = type_hints
+    matrix[:, column("num_comments")] = count("comments")
+    matrix[:, column("num_functions")] = count("functions")
+    matrix[:, column("num_classes")] = count("classes")
+    matrix[:, column("has_main_guard")] = main_guard
+    matrix[:, column("uses_comprehension")] = comprehension
+    matrix[:, column("proper_naming")] = count("proper_functions") > 0
+    return matrix
+
+
+class StreamedFeatures:
+    """
+    ML inputs of a source that is read in chunks
+    
+    Accumulates the vectorizer's term counts and the text statistics of
+    the heuristic features chunk by chunk, so the source is never held
+    whole. Chunks must split the source at line starts (as
+    streaming.iter_chunks does): no word or feature pattern then spans
+    two chunks, and only the n-grams across a boundary need joining.
+    """
+    
+    def __init__(self, vectorizer: TfidfVectorizer):
+        self.vectorizer = vectorizer
+        self._analyze = vectorizer.build_analyzer()
+        self._preprocess = vectorizer.build_preprocessor()
+        self._tokenize = vectorizer.build_tokenizer()
+        self._stop_words = vectorizer.get_stop_words()
+        self._min_n, self._max_n = vectorizer.ngram_range
+        self._counts = np.zeros(len(vectorizer.vocabulary_))
+        self._tail: List[str] = []
+        
+        self.length = 0
+        self.newlines = 0
+        self.type_hints = False
+        self.main_guard = False
+        self.brackets = False
+        self.fors = False
+    
+    def update(self, chunk: str):
+        """Add the next chunk of the source"""
+        vocabulary = self.vectorizer.vocabulary_
+        for term in self._analyze(chunk):
+            index = vocabulary.get(term)
+            if index is not None:
+                self._counts[index] += 1
+        
+        if self._max_n > 1:
+            words = self._tokenize(self._preprocess(chunk))
+            if self._stop_words:
+                words = [word for word in words if word not in self._stop_words]
+            if words:
+                # N-grams made of words from both sides of the boundary
+                joined = self._tail + words[:self._max_n - 1]
+                for n in range(max(self._min_n, 2), self._max_n + 1):
+                    for start in range(max(0, len(self._tail) - n + 1), len(self._tail)):
+                        if start + n <= len(joined):
+                            index = vocabulary.get(" ".join(joined[start:start + n]))
+                            if index is not None:
+                                self._counts[index] += 1
+                self._tail = (self._tail + words)[-(self._max_n - 1):]
+        
+        self.length += len(chunk)
+        self.newlines += chunk.count('\n')
+        self.type_hints = self.type_hints or '->' in chunk or ': ' in chunk
+        self.main_guard = self.main_guard or '__main__' in chunk
+        self.brackets = self.brackets or '[' in chunk
+        self.fors = self.fors or 'for' in chunk
+    
+    def tfidf(self) -> np.ndarray:
+        """The row vectorizer.transform returns for the whole source, as a dense (1, F) array"""
+        vectorizer = self.vectorizer
+        row = self._counts.copy()
+        if vectorizer.sublinear_tf:
+            np.log(row, where=row > 0, out=row)
+            row[row != 0] += 1
+        if vectorizer.use_idf:
+            row *= vectorizer.idf_
+        if vectorizer.norm == 'l2':
+            norm = np.sqrt(np.dot(row, row))
+        elif vectorizer.norm == 'l1':
+            norm = np.abs(row).sum()
         else:
-            return "F"
+            norm = 0
+        if norm > 0:
+            row /= norm
+        return row.reshape(1, -1)
+    
+    def feature_matrix(self, tokens: TokenCounts) -> np.ndarray:
+        """Heuristic features of the whole source, shape (1, len(FEATURE_NAMES))"""
+        return _feature_matrix(
+            np.array([tokens], dtype=float).reshape(1, -1),
+            lengths=np.array([self.length]),
+            newlines=np.array([self.newlines]),
+            type_hints=[self.type_hints],
+            main_guard=[self.main_guard],
+            comprehension=[self.brackets and self.fors]
+        )
@@ -0,0 +1,578 @@
+"""
+Analysis Pipeline Module
+Runs the analyzer and ML model, either inline or in a pool of worker processes
+"""
+
+import asyncio
+import gc
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from .guard import BudgetExceeded, limit_memory, run_guarded
+from .profiling import SamplingProfiler
+from .streaming import Source, SourceFile, iter_chunks, source_lines
+from .telemetry import Stopwatch
+
+if TYPE_CHECKING:
+    # Imported lazily: scikit-learn and radon are slow to import
+    from .code_analyzer import CodeAnalyzer
+    from .ml_models import CodeQualityPredictor
+    from .tokens import TokenCounts
+
+logger = logging.getLogger(__name__)
+
+
+def analyze_source(code: str, analyzer: "CodeAnalyzer", predictor: "CodeQualityPredictor",
+                   timed: bool = False) -> Dict[str, Any]:
+    """
+    Run static analysis, ML prediction and suggestions for one source
+
+    Args:
+        code: Python source code as string
+        analyzer: Analyzer used for static metrics
+        predictor: Model used for the quality prediction
+        timed: Add a ``timings`` entry with the seconds spent per stage
+
+    Returns:
+        Metrics, ML prediction, suggestions and overall score
+    """
+    stopwatch = Stopwatch() if timed else None
+    # The token counts of the analysis are reused for the ML features
+    static_analysis, tokens = analyzer.analyze_with_tokens(code, stopwatch)
+    ml_prediction = predictor.predict_quality(code, static_analysis, stopwatch, tokens)
+    result = _assemble_result(analyzer, static_analysis, ml_prediction)
+    if stopwatch is not None:
+        stopwatch.lap("suggestions")
+        result["timings"] = stopwatch.timings
+    return result
+
+
+def analyze_large(source: Source, analyzer: "CodeAnalyzer", predictor: "CodeQualityPredictor",
+                  timed: bool = False) -> Dict[str, Any]:
+    """
+    Streaming variant of analyze_source for large sources
+
+    The source (a string or a file on disk) is decoded incrementally and
+    split into top-level chunks; each chunk is parsed and measured on its
+    own, and the ML inputs are accumulated on the way. Peak memory follows
+    the largest top-level statement instead of the file, and the result
+    equals what analyze_source returns for the same source.
+    """
+    stopwatch = Stopwatch() if timed else None
+    features = predictor.stream_features()
+
+    def chunks():
+        for chunk in iter_chunks(source_lines(source)):
+            features.update(chunk)
+            yield chunk
+
+    static_analysis, tokens = analyzer.analyze_chunks(chunks(), stopwatch)
+    ml_prediction = predictor.predict_quality_streamed(features, static_analysis, tokens, stopwatch)
+    result = _assemble_result(analyzer, static_analysis, ml_prediction)
+    if stopwatch is not None:
+        stopwatch.lap("suggestions")
+        result["timings"] = stopwatch.timings
+    return result
+
+
+def profile_source(code: Source, analyzer: "CodeAnalyzer", predictor: "CodeQualityPredictor",
+                   timed: bool = False, analyze=analyze_source) -> Dict[str, Any]:
+    """Run an analysis under the sampling profiler, adding its report as ``profile``"""
+    with SamplingProfiler() as profiler:
+        result = analyze(code, analyzer, predictor, timed)
+    result["profile"] = profiler.report()
+    return result
+
+
+def score_batch(codes: List[str], static_results: List[Dict[str, Any]], analyzer: "CodeAnalyzer",
+                predictor: "CodeQualityPredictor",
+                tokens: Optional[List[Optional["TokenCounts"]]] = None) -> List[Dict[str, Any]]:
+    """
+    Add ML predictions and suggestions to already analyzed sources
+
+    The model is called once for the whole batch; each result is identical
+    to what analyze_source returns for the same source. Token counts from
+    the analysis, when given, save tokenizing the sources again.
+    """
+    predictions = predictor.predict_quality_batch(codes, static_results, tokens)
+    return [
+        _assemble_result(analyzer, static_analysis, ml_prediction)
+        for static_analysis, ml_prediction in zip(static_results, predictions)
+    ]
+
+
+def analyze_batch(codes: List[str], analyzer: "CodeAnalyzer", predictor: "CodeQualityPredictor") -> List[Dict[str, Any]]:
+    """Run the full pipeline for many sources with one vectorized ML call"""
+    analyzed = [analyzer.analyze_with_tokens(code) for code in codes]
+    return score_batch(codes, [metrics for metrics, _ in analyzed], analyzer, predictor,
+                       [tokens for _, tokens in analyzed])
+
+
+def _assemble_result(analyzer: "CodeAnalyzer", static_analysis: Dict[str, Any],
+                     ml_prediction: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine metrics and prediction into the API result"""
+    suggestions = analyzer.get_suggestions(static_analysis)
+
+    return {
+        "metrics": static_analysis,
+        "ml_prediction": ml_prediction,
+        "suggestions": suggestions,
+        "overall_score": ml_prediction.get("quality_score", 0)
+    }
+
+
+# Per-process analyzer and model, created once by the pool initializer
+_worker_analyzer: Optional["CodeAnalyzer"] = None
+_worker_predictor: Optional["CodeQualityPredictor"] = None
+
+# Models swapped in after the worker started, by version (see _worker_model)
+_worker_models: Dict[str, "CodeQualityPredictor"] = {}
+
+# Swapped-in models a worker keeps loaded; older ones serve requests still in flight
+_WORKER_MODELS_KEPT = 2
+
+# Version and artifact path identifying the model a pool task must use
+ModelRef = Tuple[str, Optional[str]]
+
+
+def _init_worker():
+    """Load the analyzer and model when a worker process starts, unless it inherited them"""
+    global _worker_analyzer, _worker_predictor
+    if _worker_analyzer is not None:
+        return
+    from .code_analyzer import CodeAnalyzer
+    from .ml_models import CodeQualityPredictor
+    _worker_analyzer = CodeAnalyzer()
+    _worker_predictor = CodeQualityPredictor()
+
+
+# Where a pool worker reports which task it runs (see _run_guarded_in_worker)
+_task_starts: Optional[Any] = None
+
+
+def _init_pool_worker(task_starts: Any):
+    """AnalysisPool initializer: load the models and keep the queue for task start reports"""
+    global _task_starts
+    _task_starts = task_starts
+    _init_worker()
+
+
+def preload_models():
+    """
+    Load the worker analyzer and model into this process before it forks
+
+    Called in the fork server of the worker processes (see worker_context),
+    so every worker starts with the models in memory and shares their pages
+    copy-on-write instead of loading a private copy.
+    """
+    _init_worker()
+    # Keep the garbage collector from writing to (and so copying) the
+    # pages of everything loaded so far
+    gc.freeze()
+
+
+def worker_context() -> Optional[Any]:
+    """
+    Multiprocessing context for analysis workers
+
+    Workers are forked from a fork server that preloaded the models once
+    (the platform default is used where there is no fork server). Unlike
+    forking the server itself, this is safe with threads running and
+    works together with worker recycling.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__.rsplit(".", 1)[0] + ".preload"])
+    return context
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring the affinity mask and cgroup CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota:
+        # Containers commonly see every host CPU but may only use their quota
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """CPU quota of the container in CPUs, None if unlimited or unknown"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = _read("/sys/fs/cgroup/cpu.max").split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(_read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"))
+        period = int(_read("/sys/fs/cgroup/cpu/cpu.cfs_period_us"))
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def model_ref(predictor: Optional["CodeQualityPredictor"]) -> Optional[ModelRef]:
+    """Reference to the predictor that lets workers load the same model (None: their own)"""
+    if predictor is None:
+        return None
+    return predictor.version, str(predictor.model_path) if predictor.source == "artifact" else None
+
+
+def _worker_model(model: Optional[ModelRef]) -> "CodeQualityPredictor":
+    """
+    The worker's copy of the referenced model
+
+    Workers start with the model the fork server preloaded; a model swapped
+    in later is loaded (memory-mapped) from its artifact on first use.
+    """
+    if model is None or model[1] is None or model[0] == _worker_predictor.version:
+        return _worker_predictor
+    version, path = model
+    predictor = _worker_models.get(version)
+    if predictor is None:
+        from .ml_models import CodeQualityPredictor
+        predictor = CodeQualityPredictor.from_artifact(path)
+        while len(_worker_models) >= _WORKER_MODELS_KEPT:
+            del _worker_models[next(iter(_worker_models))]
+        _worker_models[version] = predictor
+    return predictor
+
+
+def _analyze_in_worker(code: Source, timed: bool = False, profiled: bool = False,
+                       streamed: bool = False, model: Optional[ModelRef] = None) -> Dict[str, Any]:
+    """Pool task: analyze code with the worker's preloaded models"""
+    return _analyze(code, _worker_analyzer, _worker_model(model), timed, profiled, streamed)
+
+
+def _analyze(code: Source, analyzer: "CodeAnalyzer", predictor: "CodeQualityPredictor",
+             timed: bool, profiled: bool, streamed: bool) -> Dict[str, Any]:
+    analyze = analyze_large if streamed else analyze_source
+    if profiled:
+        return profile_source(code, analyzer, predictor, timed, analyze)
+    return analyze(code, analyzer, predictor, timed)
+
+
+def _analyze_static_in_worker(code: str) -> Tuple[Dict[str, Any], Optional["TokenCounts"]]:
+    """Pool task: static analysis only, the ML stage runs batched"""
+    return _worker_analyzer.analyze_with_tokens(code)
+
+
+def _score_batch_in_worker(codes: List[str], static_results: List[Dict[str, Any]],
+                           tokens: List[Optional["TokenCounts"]],
+                           model: Optional[ModelRef] = None) -> List[Dict[str, Any]]:
+    """Pool task: vectorized ML scoring of a batch"""
+    return score_batch(codes, static_results, _worker_analyzer, _worker_model(model), tokens)
+
+
+def _run_guarded_in_worker(fn, task_id: int, seconds: float, memory_limit: int, *args) -> Any:
+    """Pool task wrapper enforcing the per-analysis time and memory budgets"""
+    if _task_starts is not None:
+        # Lets the server kill this process alone if the task gets stuck
+        _task_starts.put((task_id, os.getpid()))
+    limit_memory(memory_limit)
+    return run_guarded(fn, *args, seconds=seconds, memory_limit=memory_limit)
+
+
+def _worker_ready() -> int:
+    """Pool task used to start workers ahead of the first request"""
+    return os.getpid()
+
+
+class AnalysisTimeout(BudgetExceeded):
+    """Raised when a worker does not return within the timeout and is killed"""
+
+
+# Extra seconds the server waits for a worker to report its own timeout
+# before killing it (e.g. when stuck in C code that ignores the alarm)
+KILL_GRACE_SECONDS = 5
+
+# Seconds between checks whether a queued task was picked up by a worker
+TASK_START_POLL_SECONDS = 0.05
+
+
+class AnalysisPool:
+    """
+    Process pool that keeps CPU-bound analysis off the asyncio event loop
+
+    Configured from the environment:
+        ANALYSIS_WORKERS: number of worker processes (default: available
+            CPUs, 0 runs the analysis inline in the server process)
+        ANALYSIS_MAX_TASKS_PER_WORKER: recycle a worker after this many
+            analyses (default: 1000, 0 never recycles)
+        ANALYSIS_TIMEOUT: wall-clock budget of one analysis in seconds
+            (default: 30)
+        ANALYSIS_MEMORY_LIMIT_MB: memory one analysis may allocate on top
+            of the loaded models (default: 512, 0 disables the limit)
+        STREAMING_THRESHOLD_BYTES: sources at least this large are analyzed
+            in streaming mode, see analyze_large (default: 262144, 0 only
+            streams sources passed as files)
+
+    Budgets are enforced inside the workers and an overrun is reported as
+    BudgetExceeded; a worker that does not return in time (counted from
+    when it picked the task up, not while the task waited) is killed. Inline
+    analysis (ANALYSIS_WORKERS=0) is only bounded in time, and only on the
+    main thread, since the budget relies on SIGALRM; elsewhere (e.g. in a
+    test client's thread) it runs unbounded and a warning is logged. Losing
+    a worker breaks the whole process pool, so tasks that fail only
+    because of that are retried once on the pool that replaces it.
+
+    Workers are forked from a process that loaded the analyzer and model
+    once, so each extra worker only costs the memory it writes to, and a
+    recycled worker is replaced without loading anything.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_tasks_per_worker: Optional[int] = None,
+                 timeout: Optional[float] = None, memory_limit_mb: Optional[int] = None,
+                 streaming_threshold: Optional[int] = None):
+        if workers is None:
+            workers = int(os.getenv("ANALYSIS_WORKERS", available_cpus()))
+        if max_tasks_per_worker is None:
+            max_tasks_per_worker = int(os.getenv("ANALYSIS_MAX_TASKS_PER_WORKER", 1000))
+        if timeout is None:
+            timeout = float(os.getenv("ANALYSIS_TIMEOUT", 30))
+        if memory_limit_mb is None:
+            memory_limit_mb = int(os.getenv("ANALYSIS_MEMORY_LIMIT_MB", 512))
+        if streaming_threshold is None:
+            streaming_threshold = int(os.getenv("STREAMING_THRESHOLD_BYTES", 256 * 1024))
+
+        self.workers = max(0, workers)
+        self.max_tasks_per_worker = max_tasks_per_worker or None
+        self.timeout = timeout
+        self.memory_limit = max(0, memory_limit_mb) * 1024 * 1024
+        self.streaming_threshold = max(0, streaming_threshold)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._warming: List[Any] = []
+        self._task_ids = itertools.count()
+        self._task_starts: Optional[Any] = None
+        # Worker process and start time of each submitted task, once the
+        # worker reported it
+        self._in_flight: Set[int] = set()
+        self._task_pids: Dict[int, Tuple[int, float]] = {}
+        self._warned_unbounded = False
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def workers_ready(self) -> int:
+        """Number of workers that finished loading their models"""
+        return sum(future.done() and future.exception() is None for future in self._warming)
+
+    @property
+    def warm(self) -> bool:
+        """True once every worker loaded its models (always true when inline)"""
+        return self._executor is None or self.workers_ready == len(self._warming)
+
+    def start(self):
+        """Start the worker processes and preload their models"""
+        if self.workers == 0 or self._executor is not None:
+            return
+        context = worker_context()
+        self._task_starts = (context or multiprocessing).SimpleQueue()
+        kwargs = {"max_workers": self.workers, "initializer": _init_pool_worker,
+                  "initargs": (self._task_starts,), "mp_context": context}
+        if self.max_tasks_per_worker:
+            kwargs["max_tasks_per_child"] = self.max_tasks_per_worker
+        self._executor = ProcessPoolExecutor(**kwargs)
+
+        # Submit one no-op per worker so all of them initialize now
+        self._warming = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._warming = []
+
+    async def run(self, code: Source, analyzer: "CodeAnalyzer", predictor: "CodeQualityPredictor",
+                  timed: bool = False, profiled: bool = False) -> Dict[str, Any]:
+        """
+        Analyze code in a worker process, or inline when the pool is not running
+
+        Sources passed as a SourceFile, and strings over the streaming
+        threshold, are analyzed in streaming mode.
+
+        Args:
+            code: Python source code as string, or a file holding it
+            analyzer: Analyzer used when running inline
+            predictor: Model to use; workers load it if it is not the one
+                they started with
+            timed: Include per-stage timings in the result
+            profiled: Profile the analysis and include the report as ``profile``
+
+        Returns:
+            Analysis result as produced by analyze_source
+        """
+        streamed = isinstance(code, SourceFile) or 0 < self.streaming_threshold <= len(code)
+        if self._executor is None:
+            self._check_inline_budget()
+            return run_guarded(_analyze, code, analyzer, predictor, timed, profiled, streamed,
+                               seconds=self.timeout)
+        return await self._submit(_analyze_in_worker, code, timed, profiled, streamed,
+                                  model_ref(predictor))
+
+    async def run_batch(self, codes: List[str], analyzer: "CodeAnalyzer",
+                        predictor: "CodeQualityPredictor") -> List[Any]:
+        """
+        Analyze many sources: static analysis in parallel, then one ML call
+
+        Args:
+            codes: Python source codes
+            analyzer: Analyzer used when running inline
+            predictor: Model to use, loaded by the workers as in run
+
+        Returns:
+            One entry per source, either the analysis result or the
+            exception raised while analyzing that source
+        """
+        if self._executor is None:
+            self._check_inline_budget()
+            results: List[Any] = []
+            for code in codes:
+                try:
+                    results.append(run_guarded(analyzer.analyze_with_tokens, code, seconds=self.timeout))
+                except BudgetExceeded as e:
+                    results.append(e)
+            analyzed = [i for i, result in enumerate(results) if not isinstance(result, BaseException)]
+            scored = score_batch([codes[i] for i in analyzed], [results[i][0] for i in analyzed],
+                                 analyzer, predictor, [results[i][1] for i in analyzed])
+            for i, result in zip(analyzed, scored):
+                results[i] = result
+            return results
+
+        static_results = await asyncio.gather(
+            *(self._submit(_analyze_static_in_worker, code) for code in codes),
+            return_exceptions=True
+        )
+        analyzed = [i for i, result in enumerate(static_results) if not isinstance(result, BaseException)]
+        results: List[Any] = list(static_results)
+        if not analyzed:
+            return results
+
+        try:
+            scored = await self._submit(
+                _score_batch_in_worker,
+                [codes[i] for i in analyzed],
+                [static_results[i][0] for i in analyzed],
+                [static_results[i][1] for i in analyzed],
+                model_ref(predictor)
+            )
+        except Exception as e:
+            scored = [e] * len(analyzed)
+        for i, result in zip(analyzed, scored):
+            results[i] = result
+        return results
+
+    def _check_inline_budget(self):
+        """Warn once if inline analysis cannot enforce the time budget here"""
+        if (self.timeout and not self._warned_unbounded
+                and threading.current_thread() is not threading.main_thread()):
+            self._warned_unbounded = True
+            logger.warning("Inline analysis runs off the main thread; the %gs time budget "
+                           "is not enforced (start worker processes to enforce it)", self.timeout)
+
+    async def _submit(self, fn, *args) -> Any:
+        """Run a task in the pool under the time and memory budgets"""
+        try:
+            return await self._submit_once(fn, *args)
+        except BrokenProcessPool:
+            # Most likely another task's worker died and took the pool with
+            # it; this task gets one more try on the fresh pool
+            return await self._submit_once(fn, *args)
+
+    async def _submit_once(self, fn, *args) -> Any:
+        executor = self._executor
+        task_starts = self._task_starts
+        task_id = next(self._task_ids)
+        self._in_flight.add(task_id)
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(executor, _run_guarded_in_worker, fn, task_id,
+                                    self.timeout, self.memory_limit, *args)
+        try:
+            # Time spent queued behind other tasks does not count
+            while task_id not in self._task_pids:
+                done, _ = await asyncio.wait({task}, timeout=TASK_START_POLL_SECONDS)
+                if done:
+                    return task.result()
+                self._collect_task_starts(task_starts)
+            pid, started = self._task_pids[task_id]
+            deadline = started + self.timeout + KILL_GRACE_SECONDS
+            done, _ = await asyncio.wait({task}, timeout=max(0.0, deadline - time.monotonic()))
+            if done:
+                return task.result()
+            # The worker ignored its own alarm; kill it so it stops using the CPU
+            self._kill(pid, executor)
+            raise AnalysisTimeout("time", self.timeout, f"Analysis exceeded {self.timeout:g}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OS); start a fresh pool once
+            if self._executor is executor:
+                self._restart()
+            raise
+        finally:
+            # Drops the task from the queue if the caller gave up on it
+            task.cancel()
+            self._in_flight.discard(task_id)
+            self._task_pids.pop(task_id, None)
+            # Also keeps the workers from blocking on a full queue
+            self._collect_task_starts(task_starts)
+
+    def _collect_task_starts(self, task_starts: Optional[Any]):
+        """Record the worker process of the tasks still in flight"""
+        if task_starts is None:
+            return
+        while not task_starts.empty():
+            task_id, pid = task_starts.get()
+            if task_id in self._in_flight:
+                self._task_pids[task_id] = (pid, time.monotonic())
+
+    def _kill(self, pid: int, executor: ProcessPoolExecutor):
+        """Kill the worker process running a stuck task and replace its pool"""
+        # ProcessPoolExecutor cannot cancel a running task, so the stuck
+        # worker has to go; the pool notices and fails its other tasks with
+        # BrokenProcessPool, which _submit retries on the new pool
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        if self._executor is executor:
+            self._restart()
+
+    def _restart(self):
+        """Replace a broken pool, leaving its queued tasks to fail and be retried"""
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        self._warming = []
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration"""
+        return {
+            "workers": self.workers,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "timeout": self.timeout,
+            "memory_limit_mb": self.memory_limit // (1024 * 1024),
+            "streaming_threshold": self.streaming_threshold,
+            "running": self.running,
+            "workers_ready": self.workers_ready
+        }
@@ -0,0 +1,12 @@
+"""
+Preload Module
+Imported by the analysis workers' fork server: loads the models once for all workers
+"""
+
+from .pipeline import preload_models
+
+try:
+    preload_models()
+except Exception:
+    # The fork server must keep running; workers then load the models themselves
+    pass
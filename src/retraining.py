@@ -0,0 +1,326 @@
+"""
+Retraining Module
+Labeled feedback, background retraining and validation of the quality model
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+
+from .pipeline import worker_context
+
+
+# Labels accepted as feedback, as used for training
+LABELS = ("good", "bad")
+
+# Every HOLDOUT_EVERY-th feedback sample (by content hash) validates instead of trains
+HOLDOUT_EVERY = 5
+
+# Niceness of the training process, so serving keeps the CPU it needs
+TRAINING_NICENESS = 10
+
+
+class FeedbackStore:
+    """
+    Append-only file of labeled sources, one JSON object per line
+
+    Appends are single writes under a lock, so a training process reading
+    the file at the same time sees whole lines (a partial last line is
+    skipped). Only the newest ``max_samples`` entries are used for training,
+    and ``compact`` drops the older ones from the file.
+    """
+
+    def __init__(self, path: Union[str, Path], max_samples: int = 10000):
+        self.path = Path(path)
+        self.max_samples = max(1, max_samples)
+        self._lock = threading.Lock()
+        self._count: Optional[int] = None
+
+    def add(self, code: str, label: str) -> int:
+        """
+        Record a labeled source, returning the number of stored samples
+
+        Raises:
+            ValueError: If the label is not one of LABELS
+        """
+        if label not in LABELS:
+            raise ValueError(f"Label must be one of {', '.join(LABELS)}")
+        line = json.dumps({"code": code, "label": label, "time": time.time()}) + "\n"
+        with self._lock:
+            count = self.count()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding='utf-8') as f:
+                f.write(line)
+            self._count = count + 1
+            return self._count
+
+    def count(self) -> int:
+        """Number of stored samples"""
+        if self._count is None:
+            try:
+                with open(self.path, "rb") as f:
+                    self._count = sum(1 for _ in f)
+            except FileNotFoundError:
+                self._count = 0
+        return self._count
+
+    def compact(self) -> int:
+        """
+        Keep only the newest max_samples lines, returning how many were dropped
+
+        The file is replaced atomically, so a training process reading it
+        keeps reading the old one.
+        """
+        with self._lock:
+            if self.count() <= self.max_samples:
+                return 0
+            with open(self.path, "rb") as f:
+                lines = f.readlines()
+            kept = lines[-self.max_samples:]
+            temporary = self.path.with_name(self.path.name + ".tmp")
+            with open(temporary, "wb") as f:
+                f.writelines(kept)
+            os.replace(temporary, self.path)
+            self._count = len(kept)
+            return len(lines) - len(kept)
+
+    def samples(self) -> List[Tuple[str, str]]:
+        """The newest max_samples (source, label) pairs, oldest first"""
+        samples = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("label") in LABELS and isinstance(entry.get("code"), str):
+                        samples.append((entry["code"], entry["label"]))
+        except FileNotFoundError:
+            pass
+        return samples[-self.max_samples:]
+
+
+def _held_out(code: str) -> bool:
+    """Whether a feedback sample validates the model rather than trains it (stable per source)"""
+    digest = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+    return int(digest[:8], 16) % HOLDOUT_EVERY == 0
+
+
+def train_candidate(feedback_path: str, max_samples: int, directory: str,
+                    current_path: Optional[str], min_accuracy: float) -> Dict[str, Any]:
+    """
+    Train a model on the seed examples plus feedback and validate it
+
+    Meant to run in a separate, low-priority process. Part of the feedback
+    is held out: the candidate must score at least as well as the current
+    model on it, and keep ``min_accuracy`` on the seed examples so a batch
+    of bad labels cannot turn the model around. An accepted candidate is
+    saved to ``directory`` as ``<time>-<version>.joblib``.
+
+    Args:
+        feedback_path: FeedbackStore file
+        max_samples: Newest feedback samples used
+        directory: Where accepted models are saved
+        current_path: Artifact of the model in service, None if it was
+            trained from the seed examples at startup
+        min_accuracy: Lowest accepted accuracy on the seed examples
+
+    Returns:
+        Validation report; ``path`` and ``version`` locate the new model
+        if ``accepted``
+    """
+    from .ml_models import CodeQualityPredictor, seed_samples
+
+    start = time.perf_counter()
+    seeds = seed_samples()
+    feedback = FeedbackStore(feedback_path, max_samples).samples()
+    training = seeds + [sample for sample in feedback if not _held_out(sample[0])]
+    holdout = [sample for sample in feedback if _held_out(sample[0])]
+
+    current = (CodeQualityPredictor.from_artifact(current_path) if current_path
+               else CodeQualityPredictor(load=False))
+    candidate = CodeQualityPredictor(load=False)
+    candidate.train(*zip(*training))
+
+    holdout_codes = [code for code, _ in holdout]
+    holdout_labels = [label for _, label in holdout]
+    report: Dict[str, Any] = {
+        "version": candidate.version,
+        "samples": len(training),
+        "holdout": len(holdout),
+        "accuracy": round(candidate.accuracy(holdout_codes, holdout_labels), 4),
+        "baseline_accuracy": round(current.accuracy(holdout_codes, holdout_labels), 4),
+        "seed_accuracy": round(candidate.accuracy(*zip(*seeds)), 4),
+    }
+    if candidate.version == current.version:
+        report["accepted"], report["reason"] = False, "unchanged"
+    elif report["seed_accuracy"] < min_accuracy:
+        report["accepted"], report["reason"] = False, "seed accuracy below minimum"
+    elif report["accuracy"] < report["baseline_accuracy"]:
+        report["accepted"], report["reason"] = False, "worse than the current model"
+    else:
+        path = Path(directory) / f"{time.time_ns():020d}-{candidate.version}.joblib"
+        report["accepted"], report["path"] = True, str(candidate.save(path))
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def _lower_priority():
+    """Initializer of the training process"""
+    try:
+        os.nice(TRAINING_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class Retrainer:
+    """
+    Retrains the quality model from feedback and hands accepted models over
+
+    A retraining starts once ``min_feedback`` new samples arrived, or
+    every ``interval`` seconds while there is any new feedback. Training
+    and validation run in a separate process at lower priority, so
+    requests keep their latency; the accepted artifact is then loaded
+    (memory-mapped) and passed to ``install``, which swaps it in. Requests
+    already running finish with the model they started with.
+
+    Accepted models are kept in ``directory``, newest last; ``latest``
+    lets a restarted server continue with the newest one. After each
+    retraining the feedback store is compacted to the samples training uses.
+    """
+
+    def __init__(self, store: FeedbackStore, directory: Union[str, Path],
+                 install: Optional[Callable[[Any], None]] = None, min_feedback: int = 50,
+                 interval: float = 0, min_accuracy: float = 0.8, keep: int = 3):
+        self.store = store
+        self.directory = Path(directory)
+        self.install = install
+        self.min_feedback = max(0, min_feedback)
+        self.interval = max(0.0, interval)
+        self.min_accuracy = min_accuracy
+        self.keep = max(1, keep)
+
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.retrainings = 0
+        self._task: Optional["asyncio.Task"] = None
+        self._last_start = time.monotonic()
+        # Feedback present at startup was already used if a retrained model exists
+        self._trained_count = store.count() if self.latest() else 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        """Feedback samples received since the last retraining"""
+        return max(0, self.store.count() - self._trained_count)
+
+    def due(self) -> bool:
+        """Whether enough feedback arrived, or enough time passed, to retrain"""
+        pending = self.pending
+        if not pending or self.running:
+            return False
+        if self.min_feedback and pending >= self.min_feedback:
+            return True
+        return bool(self.interval) and time.monotonic() - self._last_start >= self.interval
+
+    def latest(self) -> Optional[Path]:
+        """Newest accepted model artifact, None if there is none"""
+        if not self.directory.is_dir():
+            return None
+        artifacts = sorted(self.directory.glob("*.joblib"))
+        return artifacts[-1] if artifacts else None
+
+    def trigger(self, current: Any) -> bool:
+        """Start a retraining in the background if one is due, returning whether it started"""
+        if not self.due():
+            return False
+        self._task = asyncio.ensure_future(self.retrain(current))
+        return True
+
+    async def retrain(self, current: Any) -> Dict[str, Any]:
+        """
+        Train, validate and, if accepted, install a new model
+
+        Args:
+            current: Predictor in service, the baseline of the validation
+
+        Returns:
+            Validation report, with ``error`` if training failed (the
+            feedback then stays pending)
+        """
+        self._last_start = time.monotonic()
+        count = self.store.count()
+        current_path = str(current.model_path) if current.source == "artifact" else None
+        loop = asyncio.get_running_loop()
+        trained = False
+        executor = ProcessPoolExecutor(max_workers=1, mp_context=worker_context(),
+                                       initializer=_lower_priority)
+        try:
+            report = await loop.run_in_executor(
+                executor, train_candidate, str(self.store.path), self.store.max_samples,
+                str(self.directory), current_path, self.min_accuracy
+            )
+            trained = True
+            if report["accepted"]:
+                from .ml_models import CodeQualityPredictor
+                predictor = await loop.run_in_executor(None, CodeQualityPredictor.from_artifact, report["path"])
+                if self.install is not None:
+                    self.install(predictor)
+                self._prune(report["path"])
+        except asyncio.CancelledError:
+            # Shutting down: do not wait for the training to finish
+            for process in list((executor._processes or {}).values()):
+                process.kill()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception as e:
+            report = {"accepted": False, "error": f"{type(e).__name__}: {e}"}
+        executor.shutdown(wait=False)
+
+        if trained:
+            self._trained_count = count
+            dropped = await loop.run_in_executor(None, self.store.compact)
+            self._trained_count = max(0, self._trained_count - dropped)
+        self.retrainings += 1
+        self.last_report = report
+        return report
+
+    async def run(self, current: Callable[[], Any], check_interval: float = 60):
+        """Check every check_interval seconds whether a retraining is due (until cancelled)"""
+        while True:
+            await asyncio.sleep(check_interval)
+            model = current()
+            if model is not None and self.trigger(model):
+                await self._task
+
+    def _prune(self, keep_path: str):
+        """Delete all but the newest ``keep`` artifacts"""
+        for old in sorted(self.directory.glob("*.joblib"))[:-self.keep]:
+            if str(old) != keep_path:
+                try:
+                    old.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def status(self) -> Dict[str, Any]:
+        """Retraining state for the model endpoint"""
+        return {
+            "feedback": self.store.count(),
+            "pending": self.pending,
+            "running": self.running,
+            "retrainings": self.retrainings,
+            "min_feedback": self.min_feedback,
+            "interval": self.interval,
+            # Without the artifact's location on the server
+            "last": {key: value for key, value in self.last_report.items() if key != "path"}
+                    if self.last_report else None
+        }
@@ -0,0 +1,229 @@
+"""
+Repository Scanner Module
+Analyzes every Python file under a directory using a pool of worker processes
+"""
+
+import os
+import time
+import tokenize
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Iterator, Iterable, Optional, TYPE_CHECKING
+
+from . import pipeline
+from .guard import BudgetExceeded, check_source_size, run_guarded
+from .streaming import SourceFile
+
+if TYPE_CHECKING:
+    # Imported lazily: NumPy is slow to import and the server imports this module
+    from .clones import CloneIndex
+
+
+# Directories never descended into while discovering files
+SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "env",
+             "node_modules", ".tox", ".nox", ".mypy_cache", ".pytest_cache"}
+
+
+def discover_files(root: str) -> Iterator[str]:
+    """Lazily yield the paths of all .py files below root"""
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.endswith(".egg-info"))
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                yield os.path.join(dirpath, filename)
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Group paths into lists of at most size entries"""
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_source(path: str, max_bytes: int) -> str:
+    """Text of a source file in its declared encoding (BOM or coding cookie, else UTF-8)"""
+    check_source_size(SourceFile(path, os.path.getsize(path)), max_bytes)
+    with tokenize.open(path) as f:
+        return f.read()
+
+
+def scan_chunk(paths: List[str], analyzer, predictor, fingerprints: bool = False,
+               max_bytes: int = 0, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Read and analyze a group of files, scoring them with one model call
+
+    Args:
+        paths: Files to analyze
+        analyzer: Analyzer used for static metrics
+        predictor: Model used for the quality prediction
+        fingerprints: Add the clone signatures of each file's functions
+            as ``fingerprints`` (see clones.fingerprint_source)
+        max_bytes: Larger files are not read (0 for no limit)
+        timeout: Seconds the static analysis of one file may take (only
+            enforced on the main thread, as in scan's workers)
+
+    Returns:
+        One result per path; unreadable files and files over a budget get
+        an error entry
+    """
+    results: List[Optional[Dict[str, Any]]] = []
+    codes, analyzed, readable = [], [], []
+    for path in paths:
+        try:
+            code = _read_source(path, max_bytes)
+            analyzed.append(run_guarded(analyzer.analyze_with_tokens, code, seconds=timeout))
+        except BudgetExceeded as e:
+            results.append({"path": path, **e.to_dict()})
+            continue
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            results.append({"path": path, "error": f"Could not read file: {e}"})
+            continue
+        codes.append(code)
+        readable.append(len(results))
+        results.append(None)
+
+    if fingerprints:
+        from .clones import fingerprint_source
+
+    scored = pipeline.score_batch(codes, [metrics for metrics, _ in analyzed], analyzer, predictor,
+                                  [tokens for _, tokens in analyzed])
+    for index, code, result in zip(readable, codes, scored):
+        results[index] = {"path": paths[index], **result}
+        if fingerprints and "error" not in result["metrics"]:
+            results[index]["fingerprints"] = fingerprint_source(code)
+    return results
+
+
+def _scan_chunk_in_worker(paths: List[str], fingerprints: bool = False, max_bytes: int = 0,
+                          timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Pool task: scan a chunk with the worker's preloaded models"""
+    return scan_chunk(paths, pipeline._worker_analyzer, pipeline._worker_predictor, fingerprints,
+                      max_bytes, timeout)
+
+
+def scan(root: str, workers: Optional[int] = None, chunk_size: int = 16,
+         clone_index: Optional["CloneIndex"] = None, max_bytes: Optional[int] = None,
+         timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze all Python files under root, yielding results as they complete
+
+    Only a bounded number of chunks is in flight at any time, so memory
+    stays constant regardless of how many files are discovered. Each file
+    gets the budgets of an API request, so one pathological file cannot
+    stall the scan.
+
+    Args:
+        root: Directory (or single file) to scan
+        workers: Worker processes (default: available CPUs)
+        chunk_size: Files analyzed per worker task
+        clone_index: Index of the project's functions; when given, each
+            file's functions are added to it and near-duplicates of
+            functions in other files are reported as code smells. A file
+            is reported against files already in the index, so an index
+            loaded from an earlier scan reports clones in both files.
+        max_bytes: Larger files are reported instead of analyzed
+            (default: MAX_SOURCE_BYTES or 1 MiB, 0 for no limit)
+        timeout: Seconds the analysis of one file may take (default:
+            ANALYSIS_TIMEOUT or 30, 0 for no limit)
+
+    Yields:
+        One result dictionary per file, in completion order
+    """
+    if max_bytes is None:
+        max_bytes = int(os.getenv("MAX_SOURCE_BYTES", 1024 * 1024))
+    if timeout is None:
+        timeout = float(os.getenv("ANALYSIS_TIMEOUT", 30))
+    workers = workers or pipeline.available_cpus()
+    max_in_flight = workers * 2
+    chunks = _chunks(discover_files(root), max(1, chunk_size))
+    clones = clone_index is not None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=pipeline._init_worker,
+                             mp_context=pipeline.worker_context()) as executor:
+        pending: Dict[Any, List[str]] = {}
+        try:
+            for chunk in chunks:
+                pending[executor.submit(_scan_chunk_in_worker, chunk, clones, max_bytes, timeout)] = chunk
+                if len(pending) < max_in_flight:
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from _with_clones(_chunk_results(future, pending.pop(future)), clone_index)
+            for future in wait(pending).done:
+                yield from _with_clones(_chunk_results(future, pending[future]), clone_index)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _with_clones(results: List[Dict[str, Any]], clone_index: Optional["CloneIndex"]) -> List[Dict[str, Any]]:
+    """Move the results' fingerprints into the index, adding cross-file clone smells"""
+    if clone_index is None:
+        return results
+    for result in results:
+        smells = clone_index.update_file(result["path"], result.pop("fingerprints", []))
+        if smells:
+            result["metrics"]["code_smells"].extend(smells)
+    return results
+
+
+def _chunk_results(future, paths: List[str]) -> List[Dict[str, Any]]:
+    """Results of a finished chunk, or an error entry per file if the task failed"""
+    try:
+        return future.result()
+    except Exception as e:
+        return [{"path": path, "error": f"Analysis error: {e}"} for path in paths]
+
+
+class ScanSummary:
+    """Running aggregate of scan results kept in constant memory"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.errors = 0
+        self.lines_of_code = 0
+        self.max_complexity = 0
+        self.ratings: Dict[str, int] = {}
+        self._totals = {"quality_score": 0.0, "avg_complexity": 0.0, "maintainability_index": 0.0}
+        self._analyzed = 0
+
+    def add(self, result: Dict[str, Any]):
+        """Fold one file result into the summary"""
+        self.files += 1
+        metrics = result.get("metrics", {})
+        if "error" in result or "error" in metrics:
+            self.errors += 1
+            return
+
+        self._analyzed += 1
+        self.lines_of_code += metrics.get("lines_of_code", 0)
+        self.max_complexity = max(self.max_complexity, metrics.get("max_complexity", 0))
+        self._totals["quality_score"] += result.get("overall_score", 0)
+        self._totals["avg_complexity"] += metrics.get("avg_complexity", 0)
+        self._totals["maintainability_index"] += metrics.get("maintainability_index", 0)
+        rating = result.get("ml_prediction", {}).get("rating", "?")
+        self.ratings[rating] = self.ratings.get(rating, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary as a JSON-serializable dictionary"""
+        analyzed = self._analyzed or 1
+        return {
+            "files": self.files,
+            "analyzed": self._analyzed,
+            "errors": self.errors,
+            "lines_of_code": self.lines_of_code,
+            "avg_quality_score": round(self._totals["quality_score"] / analyzed, 2),
+            "avg_complexity": round(self._totals["avg_complexity"] / analyzed, 2),
+            "avg_maintainability_index": round(self._totals["maintainability_index"] / analyzed, 2),
+            "max_complexity": self.max_complexity,
+            "ratings": dict(sorted(self.ratings.items())),
+            "elapsed_seconds": round(time.perf_counter() - self.started, 2)
+        }
@@ -0,0 +1,330 @@
+"""
+Metrics Store Module
+Columnar, memory-mappable storage of analysis results for corpus-scale queries
+"""
+
+import json
+import os
+from pathlib import Path, PurePath
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+# Numeric metrics kept per file: (column, dtype, where it is in a result)
+NUMERIC_COLUMNS = [
+    ("lines_of_code", np.int32, "metrics"),
+    ("logical_lines", np.int32, "metrics"),
+    ("source_lines", np.int32, "metrics"),
+    ("comments", np.int32, "metrics"),
+    ("blank_lines", np.int32, "metrics"),
+    ("comment_ratio", np.float32, "metrics"),
+    ("avg_complexity", np.float32, "metrics"),
+    ("max_complexity", np.int32, "metrics"),
+    ("maintainability_index", np.float32, "metrics"),
+    ("halstead_volume", np.float32, "metrics"),
+    ("halstead_difficulty", np.float32, "metrics"),
+    ("num_functions", np.int32, "metrics"),
+    ("num_classes", np.int32, "metrics"),
+    ("quality_score", np.float32, "ml_prediction"),
+    ("confidence", np.float32, "ml_prediction"),
+]
+
+RATINGS = "?ABCDF"
+
+# Code smells are stored as the id of their kind, matched by message prefix
+SMELL_KINDS = [
+    ("other", ""),
+    ("long_function", "Long function"),
+    ("too_many_parameters", "Function '"),
+    ("deep_nesting", "Deeply nested code"),
+    ("magic_numbers", "Magic numbers"),
+    ("duplicate_code", "Duplicate code"),
+]
+
+STORE_FORMAT = 1
+
+# Per-file columns besides the numeric metrics
+_FILE_COLUMNS = [("path_id", np.int32), ("rating", np.uint8), ("error", np.bool_), ("smell_start", np.int64)]
+
+
+def smell_kind(message: str) -> int:
+    """Id of the kind of a code smell message (0 for unknown smells)"""
+    for kind in range(len(SMELL_KINDS) - 1, 0, -1):
+        if message.startswith(SMELL_KINDS[kind][1]):
+            return kind
+    return 0
+
+
+def _save_array(path: Path, values: np.ndarray):
+    """np.save through a temporary file, replacing path once it is complete"""
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temporary, "wb") as f:
+        np.save(f, values)
+    os.replace(temporary, path)
+
+
+class MetricsStore:
+    """
+    Analysis results of many files as one NumPy array per metric
+
+    A result dictionary costs about a kilobyte per file; here a file is a
+    row of fixed-size numbers. Paths are interned (each distinct path is
+    stored once and rows refer to it by id) and code smells are kept as
+    kind ids in one flat array, with each file's smells starting at its
+    ``smell_start`` offset.
+
+    Columns grow by doubling, so appending is amortized O(1). ``save``
+    writes one ``.npy`` file per column; ``load`` memory-maps them, so a
+    store larger than memory can be queried and only the pages touched
+    are read.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype=dtype)
+            for name, dtype in [(name, dtype) for name, dtype, _ in NUMERIC_COLUMNS] + _FILE_COLUMNS
+        }
+        self._smells = np.zeros(capacity, dtype=np.uint8)
+        self._smell_count = 0
+        self.paths: List[str] = []
+        self._path_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Values of a column for all files (a read-only view)
+
+        Besides the metrics of NUMERIC_COLUMNS, ``path_id``, ``rating``
+        (index into RATINGS) and ``error`` are available.
+
+        Raises:
+            KeyError: If there is no such column
+        """
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def _intern(self, path: str) -> int:
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        return path_id
+
+    def _reserve(self, rows: int, smells: int):
+        """Grow the columns (copying memory-mapped ones) to fit more rows"""
+        capacity = len(self._columns["path_id"])
+        if self._size + rows > capacity or not self._columns["path_id"].flags.writeable:
+            capacity = max(self._size + rows, capacity * 2, 1024)
+            for name, values in self._columns.items():
+                grown = np.zeros(capacity, dtype=values.dtype)
+                grown[:self._size] = values[:self._size]
+                self._columns[name] = grown
+        if self._smell_count + smells > len(self._smells) or not self._smells.flags.writeable:
+            grown = np.zeros(max(self._smell_count + smells, len(self._smells) * 2, 1024), dtype=np.uint8)
+            grown[:self._smell_count] = self._smells[:self._smell_count]
+            self._smells = grown
+
+    def append(self, path: str, result: Dict[str, Any]):
+        """
+        Add the analysis result of one file
+
+        Args:
+            path: File the result belongs to
+            result: Analysis result as produced by the pipeline, or an
+                error entry
+        """
+        metrics = result.get("metrics", {})
+        error = "error" in result or "error" in metrics
+        smells = [] if error else metrics.get("code_smells", [])
+        self._reserve(1, len(smells))
+
+        row = self._size
+        columns = self._columns
+        if not error:
+            for name, _, section in NUMERIC_COLUMNS:
+                columns[name][row] = result.get(section, {}).get(name, 0)
+            rating = result.get("ml_prediction", {}).get("rating", "?")
+            columns["rating"][row] = RATINGS.find(rating) if rating in RATINGS else 0
+        else:
+            for name, _, _ in NUMERIC_COLUMNS:
+                columns[name][row] = 0
+            columns["rating"][row] = 0
+        columns["path_id"][row] = self._intern(path)
+        columns["error"][row] = error
+        columns["smell_start"][row] = self._smell_count
+
+        for smell in smells:
+            self._smells[self._smell_count] = smell_kind(smell)
+            self._smell_count += 1
+        self._size += 1
+
+    def extend(self, results: Iterable[Dict[str, Any]]):
+        """Add results that carry their file in a ``path`` (or ``filename``) entry"""
+        for result in results:
+            self.append(result.get("path", result.get("filename", "")), result)
+
+    def smells(self, row: int) -> List[str]:
+        """Kinds of the code smells of one file"""
+        stop = self._columns["smell_start"][row + 1] if row + 1 < self._size else self._smell_count
+        return [SMELL_KINDS[kind][0] for kind in self._smells[self._columns["smell_start"][row]:stop]]
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """One file as a dictionary"""
+        record = {"path": self.paths[self._columns["path_id"][row]], "error": bool(self._columns["error"][row])}
+        for name, _, _ in NUMERIC_COLUMNS:
+            record[name] = self._columns[name][row].item()
+        record["rating"] = RATINGS[self._columns["rating"][row]]
+        record["code_smells"] = self.smells(row)
+        return record
+
+    # Queries
+
+    def _analyzed(self, name: str) -> np.ndarray:
+        """Values of a column for the files that were analyzed without error"""
+        return self.column(name)[~self.column("error")]
+
+    def percentiles(self, name: str, q: Sequence[float] = (50, 90, 99)) -> Dict[str, float]:
+        """Percentiles of a metric over the analyzed files"""
+        values = self._analyzed(name)
+        if not len(values):
+            return {}
+        return {f"p{p:g}": round(float(value), 2) for p, value in zip(q, np.percentile(values, q))}
+
+    def worst(self, name: str, n: int = 10, highest: bool = False) -> List[Tuple[str, float]]:
+        """
+        The n analyzed files with the lowest (or highest) value of a metric
+
+        Returns:
+            (path, value) pairs, worst first
+        """
+        values = self.column(name).astype(np.float64)
+        values[self.column("error")] = np.nan
+        order = -values if highest else values
+        rows = np.flatnonzero(~np.isnan(order))
+        n = min(n, len(rows))
+        if n == 0:
+            return []
+        # Only the n worst rows are sorted
+        candidates = rows[np.argpartition(order[rows], n - 1)[:n]]
+        candidates = candidates[np.argsort(order[candidates], kind="stable")]
+        path_ids = self.column("path_id")
+        return [(self.paths[path_ids[row]], round(float(values[row]), 2)) for row in candidates]
+
+    def directory_ids(self, depth: Optional[int] = None) -> Tuple[np.ndarray, List[str]]:
+        """
+        Directory of every file as an id, plus the directory of each id
+
+        Args:
+            depth: Group by the first depth path components only
+        """
+        directories: List[str] = []
+        ids: Dict[str, int] = {}
+        path_directory = np.zeros(len(self.paths), dtype=np.int32)
+        for path_id, path in enumerate(self.paths):
+            directory = os.path.dirname(path)
+            if depth is not None:
+                parts = PurePath(directory).parts[:depth]
+                directory = os.path.join(*parts) if parts else ""
+            path_directory[path_id] = ids.setdefault(directory, len(ids))
+            if len(ids) > len(directories):
+                directories.append(directory)
+        return path_directory[self.column("path_id")], directories
+
+    def group_by_directory(self, name: str, depth: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Mean of a metric and number of analyzed files per directory
+
+        Args:
+            name: Metric column
+            depth: Group by the first depth path components only
+        """
+        groups, directories = self.directory_ids(depth)
+        analyzed = ~self.column("error")
+        groups = groups[analyzed]
+        counts = np.bincount(groups, minlength=len(directories))
+        sums = np.bincount(groups, weights=self.column(name)[analyzed], minlength=len(directories))
+        return {
+            directory: {"files": int(counts[i]), "mean": round(float(sums[i] / counts[i]), 2)}
+            for i, directory in enumerate(directories) if counts[i]
+        }
+
+    def smell_counts(self) -> Dict[str, int]:
+        """Number of code smells of each kind"""
+        counts = np.bincount(self._smells[:self._smell_count], minlength=len(SMELL_KINDS))
+        return {kind: int(count) for (kind, _), count in zip(SMELL_KINDS, counts) if count}
+
+    def rating_counts(self) -> Dict[str, int]:
+        """Number of analyzed files per rating"""
+        counts = np.bincount(self._analyzed("rating"), minlength=len(RATINGS))
+        return {RATINGS[i]: int(count) for i, count in enumerate(counts) if count and i}
+
+    # Persistence
+
+    def save(self, directory: Union[str, Path]):
+        """
+        Write the store as one .npy file per column plus a JSON index
+
+        Every file is written to a temporary name and then replaced, so a
+        store memory-mapped from the same directory can save back to it.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self._columns:
+            _save_array(directory / f"{name}.npy", self._columns[name][:self._size])
+        _save_array(directory / "smells.npy", self._smells[:self._smell_count])
+        meta = {"format": STORE_FORMAT, "rows": self._size, "columns": list(self._columns),
+                "smell_kinds": [kind for kind, _ in SMELL_KINDS], "paths": self.paths}
+        temporary = directory / f"store.json.{os.getpid()}.tmp"
+        temporary.write_text(json.dumps(meta), encoding='utf-8')
+        os.replace(temporary, directory / "store.json")
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> "MetricsStore":
+        """
+        Open a saved store
+
+        Args:
+            directory: Directory written by ``save``
+            mmap: Memory-map the columns instead of reading them; they
+                are copied into memory on the first append
+
+        Raises:
+            ValueError: If the directory holds an incompatible store
+        """
+        directory = Path(directory)
+        meta = json.loads((directory / "store.json").read_text(encoding='utf-8'))
+        if (meta.get("format") != STORE_FORMAT or meta.get("columns") != list(cls(0)._columns)
+                or meta.get("smell_kinds") != [kind for kind, _ in SMELL_KINDS]):
+            raise ValueError(f"Incompatible metrics store: {directory}")
+
+        mode = "r" if mmap else None
+        store = cls(0)
+        for name in meta["columns"]:
+            store._columns[name] = np.load(directory / f"{name}.npy", mmap_mode=mode)
+        store._smells = np.load(directory / "smells.npy", mmap_mode=mode)
+        store._size = meta["rows"]
+        store._smell_count = len(store._smells)
+        store.paths = meta["paths"]
+        store._path_ids = {path: path_id for path_id, path in enumerate(store.paths)}
+        return store
+
+    def summary(self, n: int = 10) -> Dict[str, Any]:
+        """Percentiles, ratings, smells and the worst files as a JSON-serializable dictionary"""
+        errors = int(self.column("error").sum())
+        return {
+            "files": self._size,
+            "analyzed": self._size - errors,
+            "errors": errors,
+            "quality_score": self.percentiles("quality_score"),
+            "avg_complexity": self.percentiles("avg_complexity"),
+            "maintainability_index": self.percentiles("maintainability_index"),
+            "ratings": self.rating_counts(),
+            "code_smells": self.smell_counts(),
+            "lowest_quality": self.worst("quality_score", n),
+            "most_complex": self.worst("max_complexity", n, highest=True)
+        }
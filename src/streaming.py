@@ -0,0 +1,167 @@
+"""
+Streaming Module
+Incremental decoding and top-level chunking of large sources
+"""
+
+import codecs
+import os
+import tempfile
+import tokenize
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Union
+
+
+# Bytes read from a file per decoding step
+READ_SIZE = 64 * 1024
+
+# Keywords that continue the previous top-level statement
+_CONTINUATIONS = {"else", "elif", "except", "finally"}
+
+
+class SourceFile(NamedTuple):
+    """A source spooled to disk, analyzed without loading it whole"""
+    path: str
+    size: int
+
+
+Source = Union[str, SourceFile]
+
+
+def source_size(source: Source) -> int:
+    """Size of a source in bytes of UTF-8"""
+    if isinstance(source, SourceFile):
+        return source.size
+    return len(source.encode('utf-8', errors='surrogatepass'))
+
+
+def source_lines(source: Source) -> Iterator[str]:
+    """Lines of a source (line ends kept), read incrementally from files"""
+    if isinstance(source, SourceFile):
+        with open(source.path, "rb") as f:
+            yield from iter_lines(f)
+    else:
+        yield from _split_lines(source)
+
+
+def _split_lines(text: str) -> Iterator[str]:
+    """Lines of a string, without building the list of all of them"""
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        end = len(text) if end < 0 else end + 1
+        yield text[start:end]
+        start = end
+
+
+def spool(stream: BinaryIO, directory: Optional[str] = None) -> SourceFile:
+    """
+    Copy a binary stream to a temporary file for analysis by path
+
+    The caller removes the file when done with it.
+
+    Raises:
+        UnicodeDecodeError: If the stream is not valid UTF-8
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    fd, path = tempfile.mkstemp(suffix=".py", dir=directory)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for block in iter(lambda: stream.read(READ_SIZE), b""):
+                # Decoded only to be validated, like any other upload
+                decoder.decode(block)
+                f.write(block)
+                size += len(block)
+            decoder.decode(b"", final=True)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SourceFile(path, size)
+
+
+def iter_lines(stream: Union[BinaryIO, TextIO], read_size: int = READ_SIZE) -> Iterator[str]:
+    """
+    Lines of a UTF-8 (or text) stream, decoded as they are read
+
+    Lines end with ``"\\n"`` (kept, except on a last unterminated line);
+    only one read block and the current line are held in memory.
+
+    Raises:
+        UnicodeDecodeError: If a binary stream is not valid UTF-8
+    """
+    decoder = None
+    pending: List[str] = []
+    while True:
+        block = stream.read(read_size)
+        if not block:
+            break
+        if isinstance(block, bytes):
+            decoder = decoder or codecs.getincrementaldecoder("utf-8")()
+            block = decoder.decode(block)
+        parts = block.split("\n")
+        if len(parts) > 1:
+            pending.append(parts[0])
+            yield "".join(pending) + "\n"
+            for part in parts[1:-1]:
+                yield part + "\n"
+            pending = []
+        pending.append(parts[-1])
+    if decoder is not None:
+        pending.append(decoder.decode(b"", final=True))
+    last = "".join(pending)
+    if last:
+        yield last
+
+
+def iter_chunks(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Group lines into top-level chunks
+
+    A chunk starts at a top-level statement (at its decorators, if any)
+    and runs up to the next one; comments and blank lines before the first
+    statement belong to it. These are the segments ``CodeAnalyzer`` splits
+    a module into, so joining the chunks gives back the source and each
+    one parses on its own. Statement boundaries are found with the
+    tokenizer, so strings and brackets spanning lines are kept together.
+
+    Once the tokenizer fails (the source has a syntax error), the rest of
+    the source is returned as one chunk.
+    """
+    source = iter(lines)
+    buffer: List[str] = []
+    first = 1
+
+    def readline() -> str:
+        line = next(source, "")
+        if line:
+            buffer.append(line)
+        return line
+
+    indent = 0
+    statements = 0
+    line_start = True
+    decorator = False
+    try:
+        for token in tokenize.generate_tokens(readline):
+            kind = token.type
+            if kind == tokenize.INDENT:
+                indent += 1
+            elif kind == tokenize.DEDENT:
+                indent -= 1
+            elif kind == tokenize.NEWLINE:
+                line_start = True
+            elif kind not in (tokenize.NL, tokenize.COMMENT, tokenize.ENDMARKER) and line_start:
+                line_start = False
+                if indent or decorator or (kind == tokenize.NAME and token.string in _CONTINUATIONS):
+                    decorator = decorator and indent == 0 and token.string == "@"
+                    continue
+                decorator = token.string == "@"
+                row = token.start[0]
+                if statements:
+                    yield "".join(buffer[:row - first])
+                    del buffer[:row - first]
+                    first = row
+                statements += 1
+    except (tokenize.TokenError, SyntaxError):
+        buffer.extend(source)
+    if buffer:
+        yield "".join(buffer)
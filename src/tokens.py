@@ -0,0 +1,172 @@
+"""
+Tokens Module
+Tokenizes a source once for raw line metrics, smell detection and ML features
+"""
+
+import io
+import re
+import tokenize
+from typing import List, NamedTuple
+
+from radon.raw import Module
+
+
+COMMENT = tokenize.COMMENT
+NAME = tokenize.NAME
+NEWLINE = tokenize.NEWLINE
+NL = tokenize.NL
+NUMBER = tokenize.NUMBER
+OP = tokenize.OP
+STRING = tokenize.STRING
+ERRORTOKEN = tokenize.ERRORTOKEN
+
+# Number literals with two or more consecutive digits count as magic numbers
+_MAGIC_NUMBER = re.compile(r'\b\d{2,}\b')
+
+# Function names following the snake_case convention
+_PROPER_NAME = re.compile(r'[a-z_]')
+
+
+class TokenCounts(NamedTuple):
+    """
+    Token based counts of a source
+
+    The first seven fields are radon's raw metrics; all fields are plain
+    counts, so the counts of consecutive line ranges can be added up.
+    """
+
+    loc: int = 0
+    lloc: int = 0
+    sloc: int = 0
+    comments: int = 0
+    multi: int = 0
+    blank: int = 0
+    single_comments: int = 0
+    functions: int = 0
+    proper_functions: int = 0
+    classes: int = 0
+    docstrings: int = 0
+    magic_numbers: int = 0
+    # Tokenizer errors; when non-zero the raw metrics may differ from radon
+    errors: int = 0
+
+    @property
+    def raw(self) -> Module:
+        """Raw metrics as returned by radon.raw.analyze"""
+        return Module(*self[:7])
+
+
+def sum_counts(parts: List[TokenCounts]) -> TokenCounts:
+    """Counts of consecutive line ranges combined into the counts of the whole"""
+    return TokenCounts(*(sum(values) for values in zip(*parts)))
+
+
+def count_tokens(code: str) -> TokenCounts:
+    """
+    Count the tokens of a source in a single tokenizer pass
+
+    Lines are stripped before tokenizing, exactly as radon's ``analyze``
+    sees them, and split into the same groups of lines (one logical line,
+    or one blank or comment line), so the raw metrics equal radon's.
+    Comments, strings and numbers are real tokens: a '#' or a number
+    inside a string is not counted.
+
+    A source that cannot be fully tokenized is counted up to the error and
+    reported in ``errors``.
+    """
+    lines = [line.strip() for line in code.splitlines()]
+    if not lines:
+        return TokenCounts()
+
+    lloc = sloc = comments = multi = blank = single_comments = 0
+    functions = proper_functions = classes = docstrings = magic_numbers = errors = 0
+
+    group: List[tokenize.TokenInfo] = []
+    depth = 0
+    previous = None
+    readline = io.StringIO("\n".join(lines) + "\n").readline
+    try:
+        for token in tokenize.generate_tokens(readline):
+            kind, string = token.type, token.string
+            if kind == tokenize.ENDMARKER or kind == tokenize.INDENT or kind == tokenize.DEDENT:
+                continue
+
+            if kind == OP:
+                if string in "([{":
+                    depth += 1
+                elif string in ")]}":
+                    depth -= 1
+            elif kind == COMMENT:
+                comments += 1
+            elif kind == NUMBER:
+                magic_numbers += _MAGIC_NUMBER.search(string) is not None
+            elif kind == NAME and previous is not None and previous.type == NAME:
+                if previous.string == "def":
+                    functions += 1
+                    proper_functions += _PROPER_NAME.match(string) is not None
+                elif previous.string == "class":
+                    classes += 1
+            elif kind == ERRORTOKEN:
+                errors += 1
+            previous = token
+            group.append(token)
+
+            # A group ends with its logical line, or with a blank or comment line
+            if kind != NEWLINE and (kind != NL or depth > 0):
+                continue
+
+            first_row, last_row = group[0].start[0], token.start[0]
+            first = group[0].type
+            if first in (COMMENT, STRING) and all(t.type in (NL, NEWLINE) for t in group[1:]):
+                if first == COMMENT:
+                    single_comments += 1
+                elif group[0].end[0] == first_row:
+                    # Single-line docstrings are counted like comments
+                    single_comments += 1
+                    docstrings += 1
+                else:
+                    empty = sum(not line for line in lines[first_row - 1:last_row])
+                    multi += last_row - first_row + 1 - empty
+                    blank += empty
+                    docstrings += 1
+            else:
+                empty = sum(not line for line in lines[first_row - 1:last_row])
+                sloc += last_row - first_row + 1 - empty
+                blank += empty
+
+            lloc += _logical_lines(group)
+            group = []
+    except (tokenize.TokenError, SyntaxError):
+        errors += 1
+
+    loc = sloc + blank + multi + single_comments
+    return TokenCounts(loc, lloc, sloc, comments, multi, blank, single_comments,
+                       functions, proper_functions, classes, docstrings, magic_numbers, errors)
+
+
+def _logical_lines(group: List[tokenize.TokenInfo]) -> int:
+    """
+    Logical lines in a group of tokens, following radon's rules
+
+    Statements are split on ';'. A statement counts twice when it has a
+    colon that is not its last token (``if x: return``), and not at all
+    when it has no code.
+    """
+    total = 0
+    statement: List[tokenize.TokenInfo] = []
+    for token in group + [None]:
+        if token is not None and not (token.type == OP and token.string == ";"):
+            if token.type not in (COMMENT, NL, NEWLINE):
+                statement.append(token)
+            continue
+
+        colons = [i for i, t in enumerate(statement) if t.type == OP and t.string == ":"]
+        if colons:
+            # radon compares against the statement's tokens including the
+            # end marker, which only the last statement of a group has
+            last = len(statement) - 1 if token is None else len(statement) - 2
+            total += 2 - (colons[-1] == last)
+        elif statement:
+            total += 1
+        statement = []
+    return total
@@ -0,0 +1,120 @@
+"""
+Warm-up Module
+Loads the analyzer and ML model in the background so the server answers right away
+"""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple
+
+
+class NotReady(Exception):
+    """Raised when the models are not loaded (yet)"""
+
+
+class WarmUp:
+    """
+    Background loader for the analyzer and ML model
+
+    scikit-learn, numpy and radon are only imported by the loader thread, so
+    importing the application stays cheap and the server can answer health
+    checks while the models load.
+
+    Args:
+        model_path: Returns the artifact to start from instead of the
+            default model (e.g. the newest retrained one), or None
+    """
+
+    def __init__(self, model_path: Optional[Callable[[], Optional[Path]]] = None):
+        self.model_path = model_path
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.analyzer = None
+        self.predictor = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self):
+        """Begin loading in a daemon thread (no-op if already started)"""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "loading"
+            self._started = time.perf_counter()
+        threading.Thread(target=self._load, name="model-warmup", daemon=True).start()
+
+    def _load(self):
+        """Run the loader and record the outcome"""
+        try:
+            self.analyzer, self.predictor = self._load_models()
+            self.state = "ready"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+        finally:
+            self._finished = time.perf_counter()
+            self._done.set()
+
+    def _load_models(self) -> Tuple[Any, Any]:
+        """Import the heavy dependencies and build the models"""
+        from .code_analyzer import CodeAnalyzer
+        from .ml_models import CodeQualityPredictor
+        path = self.model_path() if self.model_path else None
+        if path is not None:
+            try:
+                return CodeAnalyzer(), CodeQualityPredictor.from_artifact(path)
+            except ValueError:
+                # Unusable (e.g. written by another scikit-learn): use the default model
+                pass
+        return CodeAnalyzer(), CodeQualityPredictor()
+
+    def replace_predictor(self, predictor: Any):
+        """
+        Swap in another model for the requests that start from now on
+
+        Requests already running keep the predictor they obtained.
+        """
+        self.predictor = predictor
+
+    async def models(self, timeout: Optional[float] = None) -> Tuple[Any, Any]:
+        """
+        Wait for the warm-up and return the analyzer and predictor
+
+        Starts loading if nothing did yet (e.g. when running without the
+        application lifespan).
+
+        Args:
+            timeout: Seconds to wait for a warm-up in progress
+
+        Raises:
+            NotReady: If loading failed or did not finish within timeout
+        """
+        if not self.ready:
+            self.start()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._done.wait, timeout)
+        if self.state == "failed":
+            raise NotReady(f"Model loading failed: {self.error}")
+        if not self.ready:
+            raise NotReady("Models are still loading")
+        return self.analyzer, self.predictor
+
+    def status(self) -> Dict[str, Any]:
+        """Warm-up state for the readiness endpoint"""
+        elapsed = None
+        if self._started is not None:
+            elapsed = round((self._finished or time.perf_counter()) - self._started, 3)
+        status: Dict[str, Any] = {"state": self.state, "seconds": elapsed}
+        if self.error:
+            status["error"] = self.error
+        if self.ready:
+            status["model_source"] = self.predictor.source
+        return status
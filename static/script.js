@@ -72,8 +72,151 @@ async function analyzeText() {
     }
 }
 
+// Live analysis over a WebSocket: debounced edits in, changed metrics out
+const LIVE_DEBOUNCE_MS = 400;
+let liveSocket = null;
+let liveTimer = null;
+let liveVersion = 0;
+let liveSentText = null;
+let liveResult = {};
+
+function toggleLive(enabled) {
+    const codeInput = document.getElementById('codeInput');
+    if (enabled) {
+        codeInput.addEventListener('input', scheduleLiveEdit);
+        openLiveSocket();
+    } else {
+        codeInput.removeEventListener('input', scheduleLiveEdit);
+        clearTimeout(liveTimer);
+        if (liveSocket) {
+            liveSocket.close();
+        }
+    }
+}
+
+function setLiveStatus(text) {
+    document.getElementById('liveStatus').textContent = text ? `(${text})` : '';
+}
+
+function openLiveSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}${API_BASE}/api/live`);
+    liveSocket = socket;
+    liveSentText = null;
+    liveResult = {};
+    setLiveStatus('connecting');
+    
+    socket.onopen = () => {
+        setLiveStatus('connected');
+        sendLiveEdit();
+    };
+    socket.onmessage = (event) => handleLiveMessage(JSON.parse(event.data));
+    socket.onclose = () => {
+        if (liveSocket === socket) {
+            liveSocket = null;
+            setLiveStatus(document.getElementById('liveToggle').checked ? 'disconnected' : '');
+        }
+    };
+}
+
+function scheduleLiveEdit() {
+    clearTimeout(liveTimer);
+    liveTimer = setTimeout(sendLiveEdit, LIVE_DEBOUNCE_MS);
+}
+
+// Send the edit since the last message: the whole text at first, then the
+// changed range (in code points, as the server indexes strings)
+function sendLiveEdit() {
+    if (!liveSocket || liveSocket.readyState !== WebSocket.OPEN) {
+        if (!liveSocket && document.getElementById('liveToggle').checked) {
+            openLiveSocket();
+        }
+        return;
+    }
+    
+    const text = document.getElementById('codeInput').value;
+    if (text === liveSentText) {
+        return;
+    }
+    
+    const message = { version: ++liveVersion };
+    if (liveSentText === null) {
+        message.code = text;
+    } else {
+        const before = Array.from(liveSentText);
+        const after = Array.from(text);
+        let start = 0;
+        while (start < before.length && start < after.length && before[start] === after[start]) {
+            start++;
+        }
+        let end = 0;
+        while (end < before.length - start && end < after.length - start &&
+               before[before.length - 1 - end] === after[after.length - 1 - end]) {
+            end++;
+        }
+        message.changes = [{
+            start,
+            end: before.length - end,
+            text: after.slice(start, after.length - end).join('')
+        }];
+    }
+    liveSocket.send(JSON.stringify(message));
+    liveSentText = text;
+    setLiveStatus('analyzing');
+}
+
+// Each analysis message is relative to the one before it, whatever its
+// version, so all of them are merged in order; only the status waits for
+// the analysis of the latest edit
+function handleLiveMessage(message) {
+    if (message.type === 'resync') {
+        liveSentText = null;
+        sendLiveEdit();
+        return;
+    }
+    const current = message.version === liveVersion;
+    // The server's acknowledgement of an analysis that changed nothing
+    if (message.type === 'unchanged') {
+        if (current) {
+            setLiveStatus('up to date');
+        }
+        return;
+    }
+    if (message.type === 'error') {
+        // The server sends the next result in full
+        liveResult = {};
+        if (current) {
+            setLiveStatus(message.message || message.error);
+        }
+        return;
+    }
+    
+    // Merge the changed sections; null marks a removed entry
+    for (const [section, value] of Object.entries(message.changes)) {
+        const previous = liveResult[section];
+        if (value && typeof value === 'object' && !Array.isArray(value) &&
+            previous && typeof previous === 'object' && !Array.isArray(previous)) {
+            for (const [key, item] of Object.entries(value)) {
+                if (item === null) {
+                    delete previous[key];
+                } else {
+                    previous[key] = item;
+                }
+            }
+        } else if (value === null) {
+            delete liveResult[section];
+        } else {
+            liveResult[section] = value;
+        }
+    }
+    if (current) {
+        setLiveStatus('up to date');
+    }
+    displayResults(liveResult, false);
+}
+
 // Display analysis results
-function displayResults(data) {
+function displayResults(data, scroll = true) {
     hideLoading();
     
     const resultsDiv = document.getElementById('results');
@@ -129,7 +272,9 @@ function displayResults(data) {
     document.getElementById('codeSmells').innerHTML = smellsHtml;
     
     // Scroll to results
-    resultsDiv.scrollIntoView({ behavior: 'smooth' });
+    if (scroll) {
+        resultsDiv.scrollIntoView({ behavior: 'smooth' });
+    }
 }
 
 // Show loading spinner
@@ -0,0 +1,84 @@
+"""
+Tests for the streaming archive upload endpoint
+"""
+
+import io
+import json
+import sys
+import os
+import tarfile
+import zipfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.archive import iter_python_files
+
+
+FILES = {
+    "pkg/__init__.py": b"",
+    "pkg/core.py": b"def add(a, b):\n    return a + b\n",
+    "pkg/broken.py": b"def broken(:\n",
+    "pkg/latin1.py": "name = 'caf\xe9'\n".encode('latin-1'),
+    "pkg/.git/hook.py": b"x = 1\n",
+    "README.md": b"# readme\n",
+}
+
+
+def _zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in FILES.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in FILES.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_python_members_are_read_lazily_with_limits():
+    """Only Python files outside skipped directories are yielded, oversized ones as errors"""
+    members = list(iter_python_files(io.BytesIO(_zip()), max_bytes=20))
+    assert [name for name, _, _ in members] == ["pkg/__init__.py", "pkg/core.py", "pkg/broken.py", "pkg/latin1.py"]
+    assert members[1] == ("pkg/core.py", None, "Source is larger than 20 bytes")
+    assert members[3][2] == "File is not valid UTF-8"
+
+
+def test_zip_upload_streams_ndjson(client):
+    """Each Python file gets one result line, followed by a summary"""
+    response = client.post("/api/analyze-archive", files={"file": ("project.zip", _zip())})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = _lines(response)
+    results = {line["filename"]: line for line in lines[:-1]}
+    assert set(results) == {"pkg/__init__.py", "pkg/core.py", "pkg/broken.py", "pkg/latin1.py"}
+    assert results["pkg/core.py"]["metrics"]["num_functions"] == 1
+    assert results["pkg/latin1.py"]["error"] == "File is not valid UTF-8"
+    assert lines[-1]["summary"]["files"] == 4
+
+
+def test_tar_as_raw_body(client):
+    """A gzipped tarball can be sent as the raw request body"""
+    response = client.post("/api/analyze-archive", content=_tar(),
+                                         headers={"content-type": "application/gzip"})
+    lines = _lines(response)
+    assert sorted(line["filename"] for line in lines[:-1]) == [
+        "pkg/__init__.py", "pkg/broken.py", "pkg/core.py", "pkg/latin1.py"]
+
+
+def test_invalid_archive_rejected(client):
+    """Anything that is not an archive is a 400 before streaming starts"""
+    response = client.post("/api/analyze-archive", content=b"print('not an archive')")
+    assert response.status_code == 400
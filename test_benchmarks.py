@@ -0,0 +1,38 @@
+"""
+Tests for the benchmark suite
+"""
+
+import ast
+import copy
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.run import run_benchmarks, compare
+
+
+def test_corpus_is_deterministic():
+    """The corpus is valid Python and identical on every call"""
+    corpus = generate_corpus()
+    assert corpus == generate_corpus()
+    for code in corpus.values():
+        ast.parse(code)
+
+
+def test_results_and_regression_check():
+    """Results are machine-readable and only real slowdowns count as regressions"""
+    results = run_benchmarks(cases=["small"], stages=["analyze", "get_suggestions"], repeat=1)
+    stages = results["results"]["small"]["stages"]
+    assert set(stages) == {"analyze", "get_suggestions"}
+    assert stages["analyze"]["median_ms"] > 0
+    assert compare(results, results, threshold=0.25) == []
+
+    baseline = copy.deepcopy(results)
+    baseline["results"]["small"]["stages"]["analyze"]["median_ms"] /= 10
+    baseline["results"]["small"]["stages"]["get_suggestions"]["median_ms"] /= 10
+    regressions = compare(results, baseline, threshold=0.25)
+    # get_suggestions is far below the noise floor
+    assert [(r["stage"], r["metric"]) for r in regressions] == [("analyze", "median_ms")]
@@ -0,0 +1,73 @@
+"""
+Tests for the content-addressed result cache
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.cache import ResultCache
+
+
+def test_lru_eviction():
+    """Least recently used entries are evicted first"""
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"value": 1})
+    cache.put("b", {"value": 2})
+    assert cache.get("a") == {"value": 1}
+    cache.put("c", {"value": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"value": 1}
+    assert cache.get("c") == {"value": 3}
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_keys_depend_on_content_and_version():
+    """Same source and version share a key, anything else does not"""
+    cache = ResultCache(version="v1")
+    assert cache.key("x = 1") == ResultCache.make_key("x = 1", "v1")
+    assert cache.key("x = 1") != cache.key("x = 2")
+    assert ResultCache.make_key("x = 1", "v1") != ResultCache.make_key("x = 1", "v2")
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Results written to disk are found by a new cache instance"""
+    cache = ResultCache(max_entries=4, cache_dir=tmp_path, version="v1")
+    key = cache.key("print('hi')")
+    cache.put(key, {"overall_score": 80.5})
+
+    restarted = ResultCache(max_entries=4, cache_dir=tmp_path, version="v1")
+    assert restarted.get(key) == {"overall_score": 80.5}
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_survives_app_restart(tmp_path):
+    """A cache created without a version, as the app does, keeps the disk tier"""
+    cache = ResultCache(max_entries=4, cache_dir=tmp_path)
+    cache.set_version("v1")
+    key = cache.key("print('hi')")
+    cache.put(key, {"overall_score": 80.5})
+
+    restarted = ResultCache(max_entries=4, cache_dir=tmp_path)
+    assert restarted.version == "v1"
+    restarted.set_version("v1")
+    assert restarted.get(key) == {"overall_score": 80.5}
+
+
+def test_version_change_invalidates(tmp_path):
+    """A new model version drops memory and disk entries"""
+    cache = ResultCache(cache_dir=tmp_path, version="v1")
+    key = cache.key("x = 1")
+    cache.put(key, {"overall_score": 1})
+
+    cache.set_version("v2")
+    assert len(cache) == 0
+    assert cache.get(key) is None
+
+    restarted = ResultCache(cache_dir=tmp_path, version="v2")
+    assert restarted.get(key) is None
@@ -0,0 +1,114 @@
+"""
+Tests for near-duplicate function detection
+"""
+
+import ast
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.clones import CloneIndex, fingerprint, fingerprint_source, minhashes, similarity
+from src.code_analyzer import CodeAnalyzer
+from src.scanner import scan
+
+
+ORIGINAL = '''
+def summarize(records, limit):
+    """Totals per category"""
+    totals = {}
+    for record in records:
+        if record["amount"] > limit:
+            continue
+        key = record["category"].lower()
+        totals[key] = totals.get(key, 0) + record["amount"]
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [name for name, value in ranked if value]
+'''
+
+RENAMED = ORIGINAL.replace("summarize", "tally").replace("records", "rows").replace("totals", "sums")
+
+DIFFERENT = '''
+def parse(text):
+    """Key/value pairs of a config file"""
+    result = []
+    with open(text) as handle:
+        for number, line in enumerate(handle):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, _, value = line.partition("=")
+            result.append((number, name.strip(), value.strip()))
+    return dict((name, value) for _, name, value in result)
+'''
+
+
+def _signature(code):
+    return fingerprint(ast.parse(code).body[0])
+
+
+def test_renamed_copies_have_equal_signatures():
+    """Identifiers and literals do not change the fingerprint"""
+    assert similarity(_signature(ORIGINAL), _signature(RENAMED)) == 1.0
+    assert similarity(_signature(ORIGINAL), _signature(DIFFERENT)) < 0.5
+    assert _signature("def tiny(x):\n    return x + 1\n") is None
+
+
+def test_batched_signatures_match_single():
+    sequences = [[1] * 10, list(range(60)), list(range(80, 10, -1))]
+    single = [minhashes([ids])[0] for ids in sequences]
+    for batched, alone in zip(minhashes(sequences), single):
+        assert (batched is None and alone is None) or (batched == alone).all()
+
+
+def test_duplicates_within_a_file_are_smells():
+    smells = CodeAnalyzer().analyze(ORIGINAL + DIFFERENT + RENAMED)["code_smells"]
+    assert smells == ["Duplicate code: 'tally' is similar to 'summarize' (100%)"]
+    assert CodeAnalyzer().analyze(ORIGINAL + DIFFERENT)["code_smells"] == []
+
+
+def test_index_updates_and_persists(tmp_path):
+    """Files can be replaced and removed, and a saved index answers the same queries"""
+    index = CloneIndex()
+    assert index.update_file("a.py", fingerprint_source(ORIGINAL + DIFFERENT)) == []
+    assert index.update_file("b.py", fingerprint_source(RENAMED)) == [
+        "Duplicate code: 'tally' is similar to 'summarize' in a.py:2 (100%)"
+    ]
+    assert len(index) == 3
+
+    # Re-indexing a file replaces its entries instead of matching itself
+    assert index.update_file("b.py", fingerprint_source(RENAMED)) != []
+    assert len(index) == 3
+
+    index.save(tmp_path / "clones.npz")
+    loaded = CloneIndex.load(tmp_path / "clones.npz")
+    assert loaded.query(_signature(RENAMED)) == index.query(_signature(RENAMED))
+
+    assert loaded.remove("a.py") == 2
+    assert [key for key, _ in loaded.query(_signature(ORIGINAL))] == [("b.py", "tally", 2)]
+    assert loaded.paths() == {"b.py"}
+
+
+def test_repeated_updates_reuse_entries():
+    """Re-indexing files over and over does not grow the index"""
+    index = CloneIndex()
+    fingerprints = fingerprint_source(ORIGINAL + DIFFERENT)
+    for _ in range(50):
+        index.update_file("a.py", fingerprints)
+        index.update_file("b.py", fingerprint_source(RENAMED))
+    assert len(index._keys) == len(index) == 3
+    assert [key for key, _ in index.query(_signature(RENAMED), exclude="b.py")] == [("a.py", "summarize", 2)]
+
+
+def test_scan_reports_clones_across_files(tmp_path):
+    (tmp_path / "a.py").write_text(ORIGINAL, encoding='utf-8')
+    (tmp_path / "b.py").write_text(DIFFERENT + RENAMED, encoding='utf-8')
+    index = CloneIndex()
+    results = {os.path.basename(result["path"]): result for result in
+               scan(str(tmp_path), workers=1, clone_index=index)}
+
+    smells = results["a.py"]["metrics"]["code_smells"] + results["b.py"]["metrics"]["code_smells"]
+    assert len([smell for smell in smells if smell.startswith("Duplicate code")]) == 1
+    assert "fingerprints" not in results["a.py"]
+    assert len(index) == 3
@@ -0,0 +1,117 @@
+"""
+Tests for the resource-bounded analysis mode
+"""
+
+import asyncio
+import signal
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from src.code_analyzer import CodeAnalyzer
+from src.guard import BudgetExceeded, check_source_size, run_guarded
+from src.pipeline import KILL_GRACE_SECONDS, AnalysisPool
+
+
+# A megabyte-class single line that takes seconds and hundreds of MB to analyze
+ONE_LINE = "x = 1; " * 100000
+
+
+def test_source_size_budget():
+    """Oversized sources are rejected before analysis"""
+    check_source_size("x = 1\n", 6)
+    with pytest.raises(BudgetExceeded) as excinfo:
+        check_source_size("x = 1\n", 5)
+    assert excinfo.value.to_dict()["budget"] == "source_size"
+
+
+def test_time_budget_escapes_analyzer_error_handling():
+    """The alarm interrupts analysis even though the analyzer catches all errors"""
+    start = time.perf_counter()
+    with pytest.raises(BudgetExceeded) as excinfo:
+        run_guarded(CodeAnalyzer().analyze, ONE_LINE, seconds=0.2)
+    assert excinfo.value.budget == "time"
+    assert time.perf_counter() - start < 2
+
+
+def test_worker_memory_budget():
+    """A worker running out of its memory budget reports it and keeps serving"""
+    pool = AnalysisPool(workers=1, timeout=60, memory_limit_mb=64)
+    pool.start()
+    try:
+        with pytest.raises(BudgetExceeded) as excinfo:
+            asyncio.run(pool.run(ONE_LINE, None, None))
+        assert excinfo.value.budget == "memory"
+
+        result = asyncio.run(pool.run("x = 1\n", None, None))
+        assert result["metrics"]["lines_of_code"] == 1
+    finally:
+        pool.shutdown()
+
+
+def _stuck():
+    """Pool task that never sees its alarm, like one stuck in C code"""
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(60)
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def test_stuck_worker_spares_siblings():
+    """Only the stuck worker is killed; tasks broken with the pool are retried"""
+    pool = AnalysisPool(workers=2, timeout=2)
+    pool.start()
+
+    async def sibling():
+        # Still running on the other worker when the stuck one is killed
+        await asyncio.sleep(pool.timeout + KILL_GRACE_SECONDS - 1)
+        return await pool._submit(_sleep, 1.5)
+
+    async def main():
+        return await asyncio.gather(pool._submit(_stuck), sibling(), return_exceptions=True)
+
+    try:
+        stuck, slept = asyncio.run(main())
+        assert isinstance(stuck, BudgetExceeded) and stuck.budget == "time"
+        assert isinstance(slept, int)
+        result = asyncio.run(pool.run("x = 1\n", None, None))
+        assert result["metrics"]["lines_of_code"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_queued_tasks_keep_their_budget():
+    """Waiting for a busy worker does not count against the time budget"""
+    pool = AnalysisPool(workers=1, timeout=1)
+    pool.start()
+
+    async def main():
+        # Together well past the timeout and the grace period
+        return await asyncio.gather(*(pool._submit(_sleep, 0.9) for _ in range(8)))
+
+    try:
+        pids = asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert len(set(pids)) == 1
+
+
+def test_api_reports_budget(app_client):
+    """The API answers with a structured budget result instead of a 500"""
+    client = app_client(MAX_SOURCE_BYTES=1000)
+
+    response = client.post("/api/analyze-text", json={"code": "x = 1\n" * 1000})
+    assert response.status_code == 413
+    assert response.json()["budget"] == "source_size"
+
+    batch = client.post("/api/analyze-batch", json=[{"code": "x = 1\n"}, {"code": "x = 1\n" * 1000}]).json()
+    assert "error" not in batch["files"][0]
+    assert batch["files"][1]["budget"] == "source_size"
@@ -0,0 +1,96 @@
+"""
+Tests for the git history analysis
+"""
+
+import subprocess
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from src import history as history_module
+from src.code_analyzer import CodeAnalyzer
+from src.history import HistoryError, history, list_commits
+from src.ml_models import CodeQualityPredictor
+from src.pipeline import analyze_source
+
+
+GOOD = "def add(a, b):\n    return a + b\n"
+BETTER = '"""Math helpers"""\n\n\ndef add(a: int, b: int) -> int:\n    """Sum of a and b"""\n    return a + b\n'
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def _commit(repo, files, message):
+    for path, code in files.items():
+        target = repo / path
+        if code is None:
+            target.unlink()
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(code, encoding='utf-8')
+    _git(repo, "add", "-A")
+    _git(repo, "-c", "user.name=Test", "-c", "user.email=test@example.com", "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _commit(tmp_path, {"a.py": GOOD, "pkg/b.py": GOOD, "notes.txt": "x", ".venv/c.py": GOOD}, "first")
+    _commit(tmp_path, {"a.py": BETTER, "broken.py": "def broken(:\n"}, "second")
+    _commit(tmp_path, {"broken.py": None, "README": "docs"}, "third")
+    return tmp_path
+
+
+def test_each_blob_is_analyzed_once(repo, monkeypatch):
+    """Identical file versions are analyzed once across files and commits"""
+    analyzed = []
+    analyze_blobs = history_module.analyze_blobs
+
+    def counting(contents, analyzer, predictor):
+        analyzed.extend(contents)
+        return analyze_blobs(contents, analyzer, predictor)
+
+    monkeypatch.setattr(history_module, "analyze_blobs", counting)
+    commits = list(history(str(repo), workers=0))
+
+    assert [commit["files"] for commit in commits] == [2, 3, 2]
+    assert [commit["new_blobs"] for commit in commits] == [1, 2, 0]
+    assert sorted(analyzed) == sorted(code.encode() for code in (GOOD, BETTER, "def broken(:\n"))
+    assert [commit["errors"] for commit in commits] == [0, 1, 0]
+
+
+def test_commit_aggregates_match_single_analyses(repo):
+    """Per-commit averages are those of analyzing each file of the commit"""
+    last = list(history(str(repo), workers=0))[-1]
+    analyzer, predictor = CodeAnalyzer(), CodeQualityPredictor()
+    results = [analyze_source(code, analyzer, predictor) for code in (BETTER, GOOD)]
+
+    assert last["commit"] == list(list_commits(str(repo)))[-1].sha
+    assert last["lines_of_code"] == sum(result["metrics"]["lines_of_code"] for result in results)
+    assert last["avg_quality_score"] == round(sum(result["overall_score"] for result in results) / 2, 2)
+    assert last["avg_maintainability_index"] == round(
+        sum(result["metrics"]["maintainability_index"] for result in results) / 2, 2)
+
+
+def test_worker_processes_match_inline(repo):
+    """Parallel analysis reports the same commits in the same order"""
+    blobs = {}
+    parallel = list(history(str(repo), workers=1, chunk_size=1, blobs=blobs))
+    assert parallel == list(history(str(repo), workers=0))
+    assert len(blobs) == 3
+
+    # Blobs analyzed by an earlier run are not analyzed again
+    assert [commit["new_blobs"] for commit in history(str(repo), workers=0, blobs=blobs)] == [0, 0, 0]
+
+
+def test_only_local_repositories(tmp_path):
+    with pytest.raises(HistoryError):
+        list(history(str(tmp_path), workers=0))
+    with pytest.raises(HistoryError):
+        list(history("https://example.com/repo.git", workers=0))
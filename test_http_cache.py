@@ -0,0 +1,109 @@
+"""
+Tests for ETags, conditional requests and response compression
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from src.http_cache import JSONCompressionMiddleware, etag_matches
+
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+def test_etag_matching():
+    """Lists, weak tags and * match; other tags do not"""
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"ab"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_analysis_not_modified(client, monkeypatch):
+    """A known result is answered with 304 without analyzing again"""
+    first = client.post("/api/analyze-text", json={"code": CODE})
+    etag = first.headers["etag"]
+    assert client.post("/api/analyze-text", json={"code": CODE + "\n"}).headers["etag"] != etag
+
+    def fail(*args, **kwargs):
+        raise AssertionError("analyzed again")
+
+    monkeypatch.setattr(app_module, "run_analysis", fail)
+    second = client.post("/api/analyze-text", json={"code": CODE}, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag and not second.content
+
+
+def test_upload_etag_covers_filename(client):
+    """The uploaded file's name is part of the response, and so of its tag"""
+    text = client.post("/api/analyze-text", json={"code": CODE}).headers["etag"]
+    upload = client.post("/api/analyze", files={"file": ("a.py", CODE.encode())},
+                         headers={"If-None-Match": text})
+    assert upload.status_code == 200
+    etag = upload.headers["etag"]
+    assert etag != text
+    assert client.post("/api/analyze", files={"file": ("a.py", CODE.encode())},
+                       headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_follows_model_version(client):
+    """Results of another analyzer or model version are not reported unchanged"""
+    etag = client.post("/api/analyze-text", json={"code": CODE}).headers["etag"]
+    predictor = app_module.warmup.predictor
+    original = predictor.version
+    predictor.version = original + "-retrained"
+    try:
+        response = client.post("/api/analyze-text", json={"code": CODE}, headers={"If-None-Match": etag})
+    finally:
+        predictor.version = original
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_index_and_static_revalidation(client):
+    """The index page and static files are served with ETags and 304s"""
+    for path in ("/", "/static/styles.css"):
+        response = client.get(path)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+        assert client.get(path, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+
+def test_large_json_is_gzipped(client):
+    """JSON bodies over the threshold are compressed, with a weak ETag"""
+    code = "\n".join(f"def f{i}(a, b):\n    return a + b * {i}\n" for i in range(40))
+    response = client.post("/api/analyze-text", json={"code": code},
+                           headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    files = [{"filename": f"f{i}.py", "code": f"{code}\nx = {i}\n"} for i in range(5)]
+    response = client.post("/api/analyze-batch", json=files, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()["count"] == 5
+    raw = client.post("/api/analyze-batch", json=files, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert raw.json() == response.json()
+
+
+def test_compressed_etag_is_weak():
+    """The tag of a gzipped analysis is weak and still matches its source"""
+    async def large_json(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"etag", b'"abc"')]})
+        await send({"type": "http.response.body", "body": b"[" + b"1," * 2000 + b"1]"})
+
+    client = TestClient(JSONCompressionMiddleware(large_json, minimum_size=1024))
+    response = client.get("/", headers={"Accept-Encoding": "gzip;q=1.0"})
+    assert response.headers["etag"] == 'W/"abc"'
+    assert etag_matches(response.headers["etag"], '"abc"')
+    assert len(response.json()) == 2001
+    assert "content-encoding" not in client.get("/", headers={"Accept-Encoding": "gzip;q=0"}).headers
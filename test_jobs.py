@@ -0,0 +1,150 @@
+"""
+Tests for the background job API
+"""
+
+import asyncio
+import json
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as app_module
+from src.jobs import JobQueue, QueueFull
+
+
+FILES = [
+    {"filename": "good.py", "code": "def add(a, b):\n    return a + b\n"},
+    {"filename": "broken.py", "code": "def broken(:\n"},
+    {"filename": "empty.py", "code": ""},
+]
+
+
+@pytest.fixture
+def client(app_client):
+    return app_client(job_queue=JobQueue(app_module.run_job, max_queued=4, workers=1))
+
+
+def _wait_until_finished(client, url):
+    deadline = time.monotonic() + 60
+    while True:
+        status = client.get(url).json()
+        if status["status"] in ("done", "failed"):
+            return status
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_job_results_match_batch_endpoint(client):
+    """A job returns at once and finishes with the same entries as a batch request"""
+    response = client.post("/api/jobs", json=FILES)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("queued", "running", "done")
+    assert response.headers["location"] == job["status_url"]
+
+    status = _wait_until_finished(client, job["status_url"])
+    batch = client.post("/api/analyze-batch", json=FILES).json()
+    assert status["status"] == "done"
+    assert status["completed"] == status["total"] == 3
+    assert status["errors"] == batch["errors"]
+    assert sorted(status["files"], key=lambda f: f["filename"]) == sorted(batch["files"], key=lambda f: f["filename"])
+
+
+def test_job_events_stream(client):
+    """The SSE stream reports every file and ends with the final status"""
+    job = client.post("/api/jobs", json=FILES).json()
+    response = client.get(job["events_url"])
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    assert [name for _, name, _ in events] == ["state", "file", "file", "file", "done"]
+    assert [index for index, _, _ in events] == [1, 2, 3, 4, 5]
+    assert events[-1][2]["status"] == "done"
+    assert events[-2][2]["completed"] == 3
+
+    resumed = client.get(job["events_url"], headers={"Last-Event-ID": "4"})
+    assert resumed.text.startswith("id: 5\nevent: done\n")
+    # The automatic reconnect after the done event
+    assert client.get(job["events_url"], headers={"Last-Event-ID": "5"}).status_code == 204
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.get("/api/jobs/missing/events").status_code == 404
+
+
+def test_full_queue_rejects_with_retry_after(client, monkeypatch):
+    """Submissions beyond the queue bound get 429 with a Retry-After hint"""
+    monkeypatch.setattr(app_module.job_queue, "submit", _raise_queue_full)
+    response = client.post("/api/jobs", json=FILES)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+
+
+def _raise_queue_full(items, size=0):
+    raise QueueFull(7)
+
+
+def test_queue_bound_and_result_ttl():
+    """Only max_queued jobs wait; finished jobs disappear after the TTL"""
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+            for index in range(job.total):
+                job.record(index, {"value": job.items[index]})
+
+        queue = JobQueue(handler, max_queued=1, workers=1, ttl=60)
+        running = queue.submit(["a"])
+        await asyncio.sleep(0)
+        queued = queue.submit(["b"])
+        with pytest.raises(QueueFull) as excinfo:
+            queue.submit(["c"])
+        assert excinfo.value.retry_after >= 1
+
+        release.set()
+        while not queued.finished:
+            await queue.get(queued.id).wait(len(queued.events), 1)
+        assert running.to_dict()["files"] == [{"value": "a"}]
+        assert queued.items is None
+
+        queue.ttl = 0
+        assert queue.get(running.id) is None
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_queue_bound_in_bytes():
+    """Unfinished jobs hold at most max_bytes of input, unless the queue is empty"""
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+
+        queue = JobQueue(handler, max_queued=10, workers=1, max_bytes=100)
+        large = queue.submit(["a"], size=150)
+        with pytest.raises(QueueFull):
+            queue.submit(["b"], size=1)
+        assert queue.stats()["held_bytes"] == 150
+
+        release.set()
+        while not large.finished:
+            await large.wait(len(large.events), 1)
+        queue.submit(["c"], size=60)
+        with pytest.raises(QueueFull):
+            queue.submit(["d"], size=60)
+        queue.submit(["e"], size=40)
+        await queue.stop()
+
+    asyncio.run(scenario())
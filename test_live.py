@@ -0,0 +1,114 @@
+"""
+Tests for the live analysis WebSocket
+"""
+
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as app_module
+from src.live import EditError, LiveDocument, changed_fields
+
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+@pytest.fixture
+def client(app_client):
+    return app_client(LIVE_DEBOUNCE=0)
+
+
+def test_document_edits():
+    """Whole-text and range edits update the document; bad ranges are rejected"""
+    document = LiveDocument()
+    document.apply({"version": 1, "code": "x = 1\n"})
+    document.apply({"version": 2, "changes": [{"start": 4, "end": 5, "text": "42"}]})
+    assert (document.text, document.version) == ("x = 42\n", 2)
+
+    for message in ({"version": 3, "changes": [{"start": 5, "end": 99, "text": ""}]},
+                    {"version": 3}, {"version": "3", "code": ""}, []):
+        with pytest.raises(EditError):
+            document.apply(message)
+    assert document.text == "x = 42\n"
+
+
+def test_changed_fields():
+    """Only changed keys of dict sections are reported, removed ones as None"""
+    old = {"metrics": {"loc": 1, "cc": 2}, "suggestions": ["a"], "overall_score": 50}
+    new = {"metrics": {"loc": 2, "error": "x"}, "suggestions": ["a"], "overall_score": 60}
+    assert changed_fields(old, new) == {"metrics": {"loc": 2, "error": "x", "cc": None}, "overall_score": 60}
+    assert changed_fields(new, new) == {}
+    assert changed_fields({}, new) == new
+
+
+def test_live_session_pushes_only_changes(client):
+    """The first analysis is sent whole, later ones only with what changed"""
+    expected = client.post("/api/analyze-text", json={"code": CODE}).json()
+
+    with client.websocket_connect("/api/live") as websocket:
+        websocket.send_json({"version": 1, "code": CODE})
+        message = websocket.receive_json()
+        assert message == {"type": "analysis", "version": 1, "changes": expected}
+
+        # Same text again: analyzed, but there is nothing new to send
+        websocket.send_json({"version": 2, "changes": [{"start": 0, "end": 1, "text": "d"}]})
+        assert websocket.receive_json() == {"type": "unchanged", "version": 2}
+
+        websocket.send_json({"version": 3, "changes": [{"start": 0, "end": 0, "text": "# note\n"}]})
+        message = websocket.receive_json()
+        assert message["version"] == 3
+        assert message["changes"]["metrics"]["comments"] == 1
+        assert "num_functions" not in message["changes"]["metrics"]
+
+        websocket.send_json({"version": 4, "changes": [{"start": 500, "end": 501, "text": ""}]})
+        assert websocket.receive_json()["type"] == "resync"
+
+
+def test_superseded_edits_are_not_analyzed(client, monkeypatch):
+    """Edits arriving within the debounce window cancel the pending analysis"""
+    monkeypatch.setattr(app_module, "LIVE_DEBOUNCE", 0.3)
+    with client.websocket_connect("/api/live") as websocket:
+        websocket.send_json({"version": 1, "code": "x = 1\n"})
+        websocket.send_json({"version": 2, "code": CODE})
+        message = websocket.receive_json()
+        assert message["version"] == 2
+        assert message["changes"]["metrics"]["num_functions"] == 1
+
+
+def test_changes_follow_previous_analysis(client, monkeypatch):
+    """An analysis sent after a newer edit arrived is still the base of the next changes"""
+    expected = client.post("/api/analyze-text", json={"code": "# note\n" + CODE}).json()
+    analyzed = threading.Event()
+    run_analysis = app_module.run_analysis
+
+    async def run_and_signal(*args, **kwargs):
+        result = await run_analysis(*args, **kwargs)
+        analyzed.set()
+        return result
+
+    monkeypatch.setattr(app_module, "run_analysis", run_and_signal)
+
+    with client.websocket_connect("/api/live") as websocket:
+        websocket.send_json({"version": 1, "code": CODE})
+        assert analyzed.wait(10)
+        # Sent before the client read the analysis of version 1
+        websocket.send_json({"version": 2, "changes": [{"start": 0, "end": 0, "text": "# note\n"}]})
+        messages = [websocket.receive_json()]
+        while messages[-1]["version"] != 2:
+            messages.append(websocket.receive_json())
+
+    assert [message["version"] for message in messages] == [1, 2]
+    result = {}
+    for message in messages:
+        for section, changes in message["changes"].items():
+            if isinstance(changes, dict) and isinstance(result.get(section), dict):
+                result[section].update(changes)
+                result[section] = {key: item for key, item in result[section].items() if item is not None}
+            else:
+                result[section] = changes
+    assert result == expected
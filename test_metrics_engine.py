@@ -0,0 +1,230 @@
+"""
+Parity tests for the single-pass metrics engine
+Compares CodeAnalyzer results against the original radon based implementation
+"""
+
+import ast
+import io
+import json
+import re
+import tokenize
+import sys
+import os
+import dataclasses
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from radon.complexity import cc_visit
+from radon.metrics import mi_visit, h_visit
+from radon.raw import analyze
+
+from src.clones import duplicate_smells, fingerprint
+from src.code_analyzer import CodeAnalyzer
+
+
+SNIPPETS = [
+    "",
+    "x = 1\n",
+    "# only a comment\n",
+    '''
+def calculate_average(numbers):
+    """Calculate average of numbers"""
+    if not numbers:
+        return 0
+    return sum(numbers) / len(numbers)
+
+class Calculator:
+    def add(self, a, b):
+        return a + b
+''',
+    '''
+import os, sys
+from typing import List
+
+@decorator(a + b if c else d)
+def decorated(x=1 + 2, *args, y: int = 3 or 4, **kwargs) -> "a" + "b":
+    assert x and y or z, "message" + str(x)
+    try:
+        value = [i for i in range(10) if i % 2 if i > 3]
+    except ValueError:
+        pass
+    except (TypeError, KeyError) as e:
+        raise
+    else:
+        value = None
+    finally:
+        cleanup()
+    while x:
+        x -= 1
+    else:
+        y += True
+    return lambda q: q if q else -q
+''',
+    '''
+class Outer(Base, metaclass=Meta if flag else type):
+    attr = 1 if a else 2
+
+    class Inner:
+        def method(self):
+            if self:
+                return 1
+
+    def first(self, a, b, c, d, e, f):
+        def closure():
+            for i in items:
+                if i:
+                    return i
+        return closure
+
+    if CONDITION:
+        def conditional(self):
+            return not self
+
+    async def second(self):
+        async for item in stream():
+            await item
+        async with lock:
+            pass
+''',
+    '''
+def matcher(command):
+    match command:
+        case ["go", direction]:
+            return direction
+        case ["stop"] | ["halt"]:
+            return None
+        case _:
+            return 1.0 == True
+''',
+    '''
+def deep(a):
+    if a:
+        for b in a:
+            while b:
+                with open(b) as fh:
+                    if fh:
+                        if fh.read():
+                            return 12345
+    elif a is None:
+        pass
+''',
+    "def long_one():\n" + "    x = 1\n" * 60,
+    "class Empty:\n    pass\n",
+    "def f():\n    '''doc'''\n\n\n    return {1, 2} | {3}\n",
+]
+
+
+def reference_analyze(code):
+    """Original radon based implementation of CodeAnalyzer.analyze"""
+    tree = ast.parse(code)
+    raw_metrics = analyze(code)
+    complexity = cc_visit(code)
+    avg_complexity = sum(block.complexity for block in complexity) / len(complexity) if complexity else 0
+    max_complexity = max((block.complexity for block in complexity), default=0)
+    mi_score = mi_visit(code, True)
+    halstead = h_visit(code)
+
+    functions = sum(isinstance(node, ast.FunctionDef) for node in ast.walk(tree))
+    classes = sum(isinstance(node, ast.ClassDef) for node in ast.walk(tree))
+
+    smells = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            func_length = node.end_lineno - node.lineno
+            if func_length > 50:
+                smells.append(f"Long function '{node.name}' ({func_length} lines)")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            num_params = len(node.args.args)
+            if num_params > 5:
+                smells.append(f"Function '{node.name}' has too many parameters ({num_params})")
+
+    def max_nesting(node, depth=0):
+        max_depth = depth
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.If, ast.For, ast.While, ast.With)):
+                max_depth = max(max_depth, max_nesting(child, depth + 1))
+            else:
+                max_depth = max(max_depth, max_nesting(child, depth))
+        return max_depth
+
+    max_depth = max_nesting(tree)
+    if max_depth > 4:
+        smells.append(f"Deeply nested code (depth: {max_depth})")
+    # Only number literals count, not digits inside strings or comments
+    numbers = [t.string for t in tokenize.generate_tokens(io.StringIO(code).readline) if t.type == tokenize.NUMBER]
+    if any(re.search(r'\b\d{2,}\b', number) for number in numbers):
+        smells.append("Magic numbers detected - consider using constants")
+    # Near-duplicate functions, compared in ast.walk order
+    definitions = [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    smells.extend(duplicate_smells([(node.name, fingerprint(node)) for node in definitions
+                                    if fingerprint(node) is not None]))
+
+    return {
+        "lines_of_code": raw_metrics.loc,
+        "logical_lines": raw_metrics.lloc,
+        "source_lines": raw_metrics.sloc,
+        "comments": raw_metrics.comments,
+        "blank_lines": raw_metrics.blank,
+        "comment_ratio": raw_metrics.comments / raw_metrics.loc if raw_metrics.loc > 0 else 0,
+        "avg_complexity": round(avg_complexity, 2),
+        "max_complexity": max_complexity,
+        "maintainability_index": round(mi_score, 2),
+        "halstead_volume": round(halstead.total.volume, 2) if halstead else 0,
+        "halstead_difficulty": round(halstead.total.difficulty, 2) if halstead else 0,
+        "num_functions": functions,
+        "num_classes": classes,
+        "code_smells": smells
+    }
+
+
+def corpus():
+    """Snippets plus real modules from this repository and the stdlib"""
+    sources = list(SNIPPETS)
+    root = Path(__file__).parent
+    for path in sorted(root.glob("*.py")) + sorted((root / "src").glob("*.py")) + [root / "examples" / "sample_code.py"]:
+        sources.append(path.read_text(encoding='utf-8'))
+    for module in (ast, json.decoder, dataclasses, argparse):
+        sources.append(Path(module.__file__).read_text(encoding='utf-8'))
+    return sources
+
+
+def test_parity_with_radon():
+    """Every metric matches the original implementation"""
+    analyzer = CodeAnalyzer()
+    for code in corpus():
+        assert analyzer.analyze(code) == reference_analyze(code)
+
+
+def test_syntax_error_reported():
+    """Invalid code still produces the error result"""
+    results = CodeAnalyzer().analyze("def broken(:\n")
+    assert results["error"] == "Syntax error in code"
+    assert results["lines_of_code"] == 0
+
+
+def test_incremental_reanalysis():
+    """Editing one function or method only recomputes that unit and matches a fresh run"""
+    code = Path(dataclasses.__file__).read_text(encoding='utf-8')
+    edits = [
+        ("def _recursive_repr(user_function):",
+         "def _recursive_repr(user_function):\n    if user_function:\n        pass"),
+        ("        return '<factory>'",
+         "        return '<factory>' if self else None"),
+    ]
+
+    analyzer = CodeAnalyzer()
+    analyzer.analyze(code)
+    for old, new in edits:
+        edited = code.replace(old, new, 1)
+        assert edited != code
+
+        misses = analyzer.unit_cache.misses
+        results = analyzer.analyze(edited)
+
+        assert analyzer.unit_cache.misses == misses + 1
+        assert results == CodeAnalyzer().analyze(edited)
+        assert results == reference_analyze(edited)
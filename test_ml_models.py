@@ -0,0 +1,105 @@
+"""
+Tests for the persisted quality model
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import joblib
+import numpy as np
+
+from src.ml_models import CodeQualityPredictor
+
+
+CODE = "def add(a: int, b: int) -> int:\n    '''Add numbers'''\n    return a + b\n"
+
+
+def test_artifact_round_trip(tmp_path):
+    """A loaded artifact predicts exactly like the freshly trained model"""
+    trained = CodeQualityPredictor(model_path=tmp_path / "model.joblib", load=False)
+    path = trained.save()
+
+    loaded = CodeQualityPredictor(model_path=path)
+    assert loaded.source == "artifact"
+    assert loaded.version == trained.version
+    assert loaded.predict_quality(CODE) == trained.predict_quality(CODE)
+    assert loaded.predict_quality_batch([CODE, "x=1"]) == trained.predict_quality_batch([CODE, "x=1"])
+
+
+def test_missing_artifact_falls_back_to_training(tmp_path):
+    """Without an artifact the model is trained at startup"""
+    predictor = CodeQualityPredictor(model_path=tmp_path / "missing.joblib")
+    assert predictor.source == "trained"
+    assert predictor.predict_quality(CODE)["rating"] in "ABCDF"
+
+
+def test_incompatible_artifact_is_ignored(tmp_path):
+    """Artifacts from another format or scikit-learn version are retrained"""
+    trained = CodeQualityPredictor(model_path=tmp_path / "model.joblib", load=False)
+    path = trained.save()
+    artifact = joblib.load(path)
+    artifact["sklearn_version"] = "0.0"
+    joblib.dump(artifact, path)
+
+    assert CodeQualityPredictor(model_path=path).source == "trained"
+
+    path.write_bytes(b"not a model")
+    assert CodeQualityPredictor(model_path=path).source == "trained"
+
+
+def test_compiled_forest_matches_scikit_learn():
+    """The flattened forest returns exactly scikit-learn's probabilities"""
+    predictor = CodeQualityPredictor(load=False)
+    root = Path(__file__).parent
+    codes = [path.read_text(encoding='utf-8') for path in sorted(root.glob("**/*.py"))]
+    codes += ["", CODE, "x=1;y=2", "eval(user_input)", "except: pass"]
+
+    X = predictor.vectorizer.transform(codes)
+    assert np.array_equal(predictor.forest.predict_proba(X), predictor.model.predict_proba(X))
+    assert np.array_equal(predictor.forest.predict(X), predictor.model.predict(X))
+    for row in range(X.shape[0]):
+        assert np.array_equal(predictor.forest.predict_proba(X[row]), predictor.model.predict_proba(X[row]))
+
+
+def test_feature_matrix_matches_per_source_features():
+    """Batch feature extraction counts every source as if it were alone"""
+    predictor = CodeQualityPredictor(load=False)
+    codes = [
+        CODE,
+        "",
+        "# only a comment",
+        "class Foo:\n    def Bar(self): pass  # comment\n",
+        "x = [i for i in range(3)]\nif __name__ == '__main__':\n    pass",
+        "def\n",
+        "class\n",
+    ]
+
+    matrix = predictor.extract_feature_matrix(codes)
+    for code, row in zip(codes, matrix):
+        assert np.array_equal(predictor.extract_feature_matrix([code])[0], row)
+    assert predictor.extract_feature_matrix([CODE])[0].tolist() == [17, 1, 1, 0, 1, 0, 0, 0, 1]
+    assert predictor.extract_feature_matrix(codes[3:4])[0][3:6].tolist() == [1, 1, 1]
+
+
+def test_batch_scores_match_single_predictions():
+    """Vectorized scoring returns what predict_quality returns per source"""
+    from src.code_analyzer import CodeAnalyzer
+
+    predictor = CodeQualityPredictor(load=False)
+    root = Path(__file__).parent
+    codes = [path.read_text(encoding='utf-8') for path in sorted(root.glob("src/*.py"))]
+    codes += ["", CODE, "x=1;y=2"]
+    analyzer = CodeAnalyzer()
+    metrics = [analyzer.analyze(code) if i % 2 else None for i, code in enumerate(codes)]
+
+    batch = predictor.predict_quality_batch(codes, metrics)
+    assert batch == [predictor.predict_quality(code, m) for code, m in zip(codes, metrics)]
+
+    arrays = predictor.predict_quality_arrays(codes, metrics)
+    assert [r["rating"] for r in batch] == arrays["rating"].tolist()
+    assert [r["prediction"] for r in batch] == arrays["prediction"].tolist()
+    assert [r["confidence"] for r in batch] == arrays["confidence"].tolist()
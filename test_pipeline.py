@@ -0,0 +1,90 @@
+"""
+Tests for the analysis pipeline
+"""
+
+import asyncio
+import gc
+import logging
+import sys
+import os
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.code_analyzer import CodeAnalyzer
+from src.ml_models import CodeQualityPredictor
+from src import pipeline
+from src.guard import BudgetExceeded
+from src.pipeline import AnalysisPool, analyze_source, analyze_batch, available_cpus
+
+
+def test_batch_matches_single_file_results():
+    """Vectorized batch scoring gives the same result as one file at a time"""
+    root = Path(__file__).parent
+    codes = [path.read_text(encoding='utf-8') for path in sorted((root / "src").glob("*.py"))]
+    codes += ["", "x = 1\n", "def broken(:\n"]
+
+    analyzer = CodeAnalyzer()
+    predictor = CodeQualityPredictor()
+
+    batch = analyze_batch(codes, analyzer, predictor)
+    assert batch == [analyze_source(code, analyzer, predictor) for code in codes]
+
+
+def test_workers_share_preloaded_models():
+    """Workers, including recycled ones, are forked with the models already loaded"""
+    pool = AnalysisPool(workers=1, max_tasks_per_worker=2)
+    pool.start()
+    try:
+        tasks = [pool._executor.submit(_worker_state).result(timeout=120) for _ in range(4)]
+    finally:
+        pool.shutdown()
+
+    assert len({pid for pid, _ in tasks}) > 1
+    assert all(frozen for _, frozen in tasks)
+    assert 1 <= available_cpus() <= (os.cpu_count() or 1)
+
+
+def _worker_state():
+    """Pool task: process id and whether the models were inherited from the fork server"""
+    return os.getpid(), gc.get_freeze_count() > 0 and pipeline._worker_predictor is not None
+
+
+class _SlowAnalyzer(CodeAnalyzer):
+    """Analyzer taking a second per source"""
+
+    def analyze_with_tokens(self, code):
+        time.sleep(1)
+        return super().analyze_with_tokens(code)
+
+
+def test_inline_pool_matches_pipeline():
+    """Without workers, run and run_batch give the pipeline's results in the caller"""
+    analyzer, predictor = CodeAnalyzer(), CodeQualityPredictor()
+    pool = AnalysisPool(workers=0)
+    pool.start()
+    assert not pool.running and pool.warm
+    codes = ["def add(a, b):\n    return a + b\n", "def broken(:\n"]
+    assert asyncio.run(pool.run(codes[0], analyzer, predictor)) == analyze_source(codes[0], analyzer, predictor)
+    assert asyncio.run(pool.run_batch(codes, analyzer, predictor)) == analyze_batch(codes, analyzer, predictor)
+
+
+def test_inline_time_budget(caplog):
+    """Inline analysis is bounded on the main thread, and warns where it cannot be"""
+    analyzer, predictor = _SlowAnalyzer(), CodeQualityPredictor()
+    pool = AnalysisPool(workers=0, timeout=0.2)
+    slow, = asyncio.run(pool.run_batch(["x = 1\n"], analyzer, predictor))
+    assert isinstance(slow, BudgetExceeded) and slow.budget == "time"
+    assert not caplog.records
+
+    results = []
+    with caplog.at_level(logging.WARNING, logger="src.pipeline"):
+        thread = threading.Thread(target=lambda: results.extend(
+            asyncio.run(pool.run_batch(["x = 1\n"] * 2, analyzer, predictor))))
+        thread.start()
+        thread.join()
+    assert results[0]["metrics"]["lines_of_code"] == 1
+    assert len(caplog.records) == 1 and "not enforced" in caplog.records[0].message
@@ -0,0 +1,115 @@
+"""
+Tests for on-demand and sampled profiling of analyses
+"""
+
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+from src.pipeline import AnalysisPool
+from src.profiling import ProfileStore, SamplingProfiler
+
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+
+def _outer():
+    return [_busy(20000) for _ in range(100)]
+
+
+def test_sampling_profiler_reports():
+    """Stacks start below the profiled block; the tree adds up to the samples"""
+    with SamplingProfiler(interval=0.0005) as profiler:
+        _outer()
+
+    report = profiler.report()
+    assert report["samples"] > 0
+    lines = report["collapsed"].splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == report["samples"]
+    assert all(line.startswith("test_profiling._outer") for line in lines)
+    assert any("test_profiling._busy" in line for line in lines)
+
+    tree = report["call_tree"]
+    assert tree["samples"] == report["samples"]
+    assert [child["name"] for child in tree["children"]] == ["test_profiling._outer"]
+    assert tree["children"][0]["samples"] == report["samples"]
+
+
+def test_overlapping_profilers_share_switch_interval():
+    """The switch interval stays lowered until the last of overlapping profilers exits"""
+    original = sys.getswitchinterval()
+    first = SamplingProfiler(interval=0.002)
+    second = SamplingProfiler(interval=0.001)
+    first.__enter__()
+    second.__enter__()
+    assert sys.getswitchinterval() == min(original, 0.001)
+    first.__exit__(None, None, None)
+    assert sys.getswitchinterval() == min(original, 0.001)
+    second.__exit__(None, None, None)
+    assert sys.getswitchinterval() == original
+
+
+def test_profile_store_rotates(tmp_path):
+    """Only the newest max_files profiles are kept"""
+    store = ProfileStore(tmp_path / "profiles", max_files=2)
+    paths = [store.write({"collapsed": f"f {i}\n"}, label=str(i)) for i in range(3)]
+    assert store.files() == paths[1:]
+    assert paths[2].read_text() == "f 2\n"
+
+
+def test_profiling_is_access_controlled(client, monkeypatch):
+    """Without the configured token a profile request is refused"""
+    assert client.post("/api/analyze-text?profile=x", json={"code": CODE}).status_code == 403
+    monkeypatch.setattr(app_module, "PROFILE_TOKEN", "secret")
+    assert client.post("/api/analyze-text", json={"code": CODE},
+                       headers={"X-Profile": "wrong"}).status_code == 403
+    assert "profile" not in client.post("/api/analyze-text", json={"code": CODE}).json()
+
+
+def test_requested_profile(client, monkeypatch):
+    """A profiled request analyzes again, even for a cached source, and returns the report"""
+    monkeypatch.setattr(app_module, "PROFILE_TOKEN", "secret")
+    plain = client.post("/api/analyze-text", json={"code": CODE}).json()
+
+    response = client.post("/api/analyze-text", json={"code": CODE}, headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    result = response.json()
+    profile = result.pop("profile")
+    assert result == plain
+    assert set(profile) == {"samples", "interval_ms", "duration_ms", "collapsed", "call_tree"}
+    assert profile["call_tree"]["samples"] == profile["samples"]
+
+    upload = client.post("/api/analyze?profile=secret", files={"file": ("a.py", CODE.encode())})
+    assert "profile" in upload.json()
+
+
+def test_sampled_profiles_are_stored(client, monkeypatch, tmp_path):
+    """Sampled analyses are written to the rotating profile directory"""
+    store = ProfileStore(tmp_path, max_files=2)
+    monkeypatch.setattr(app_module, "profile_store", store)
+    monkeypatch.setattr(app_module, "PROFILE_SAMPLE_RATE", 1.0)
+    for i in range(3):
+        result = client.post("/api/analyze-text", json={"code": f"{CODE}x = {i}\n"}).json()
+        assert "profile" not in result
+    assert len(store.files()) == 2
+
+
+def test_profile_in_worker_process():
+    """Profiles are taken where the analysis runs and sent back with the result"""
+    pool = AnalysisPool(workers=1)
+    pool.start()
+    try:
+        result = asyncio.run(pool.run(CODE, None, None, profiled=True))
+    finally:
+        pool.shutdown()
+    assert result["metrics"]["num_functions"] == 1
+    assert result["profile"]["call_tree"]["samples"] == result["profile"]["samples"]
@@ -0,0 +1,183 @@
+"""
+Tests for feedback, background retraining and hot-swapping of the model
+"""
+
+import asyncio
+import sys
+import os
+import time
+import types
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as app_module
+from src.ml_models import CodeQualityPredictor, seed_samples
+from src.pipeline import AnalysisPool
+from src.retraining import FeedbackStore, Retrainer, train_candidate
+from src.warmup import WarmUp
+
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+GOOD = [
+    f"def compute_total_{i}(values: list) -> int:\n    '''Sum of values'''\n    return sum(values)\n"
+    for i in range(20)
+]
+BAD = [f"def f{i}(a,b,c,d,e,f,g): return a+b+c+d+e+f+g+{i}\n" for i in range(20)]
+
+
+def _fill(store, samples):
+    for code, label in samples:
+        store.add(code, label)
+
+
+def test_feedback_store(tmp_path):
+    """Samples are appended, counted and read back; torn lines are skipped"""
+    store = FeedbackStore(tmp_path / "feedback.jsonl", max_samples=2)
+    assert store.count() == 0 and store.samples() == []
+    store.add("a = 1\n", "good")
+    store.add("b = 2\n", "bad")
+    assert store.add("c = 3\n", "good") == 3
+    with pytest.raises(ValueError):
+        store.add("d = 4\n", "great")
+
+    with open(store.path, "a", encoding="utf-8") as f:
+        f.write('{"code": "partial')
+    reopened = FeedbackStore(store.path, max_samples=2)
+    assert reopened.samples() == [("b = 2\n", "bad"), ("c = 3\n", "good")]
+
+
+def test_candidate_is_validated(tmp_path):
+    """Helpful feedback gives a new model; feedback contradicting the seeds is rejected"""
+    store = FeedbackStore(tmp_path / "feedback.jsonl")
+    _fill(store, [(code, "good") for code in GOOD] + [(code, "bad") for code in BAD])
+    report = train_candidate(str(store.path), 1000, str(tmp_path / "models"), None, 0.8)
+    assert report["accepted"], report
+    assert report["holdout"] > 0 and report["accuracy"] >= report["baseline_accuracy"]
+    assert CodeQualityPredictor.from_artifact(report["path"]).version == report["version"]
+
+    poisoned = FeedbackStore(tmp_path / "poisoned.jsonl")
+    flipped = {"good": "bad", "bad": "good"}
+    _fill(poisoned, [(code, flipped[label]) for code, label in seed_samples()] * 5)
+    report = train_candidate(str(poisoned.path), 1000, str(tmp_path / "rejected"), None, 0.8)
+    assert not report["accepted"]
+    assert "path" not in report and not (tmp_path / "rejected").exists()
+
+
+def test_retrainer_installs_and_prunes(tmp_path):
+    """Accepted models are handed over, kept newest last and restored by path"""
+    store = FeedbackStore(tmp_path / "feedback.jsonl")
+    installed = []
+    retrainer = Retrainer(store, tmp_path / "models", install=installed.append, min_feedback=10, keep=1)
+    current = CodeQualityPredictor(load=False)
+    assert not retrainer.due()
+
+    _fill(store, [(code, "good") for code in GOOD[:10]])
+    assert retrainer.due()
+    report = asyncio.run(retrainer.retrain(current))
+    assert report["accepted"], report
+    assert [predictor.version for predictor in installed] == [report["version"]]
+    assert retrainer.pending == 0 and not retrainer.due()
+
+    _fill(store, [(code, "bad") for code in BAD[:10]])
+    report = asyncio.run(retrainer.retrain(installed[-1]))
+    assert report["accepted"], report
+    assert [path.name for path in (tmp_path / "models").iterdir()] == [retrainer.latest().name]
+    assert retrainer.latest() == tmp_path / "models" / os.path.basename(report["path"])
+
+    restarted = Retrainer(store, tmp_path / "models")
+    assert restarted.pending == 0
+    warmup = WarmUp(model_path=restarted.latest)
+    warmup._load()
+    assert warmup.predictor.version == report["version"]
+
+
+def test_retrainer_compacts_feedback(tmp_path):
+    """Feedback beyond max_samples is dropped after a retraining, keeping the pending count"""
+    store = FeedbackStore(tmp_path / "feedback.jsonl", max_samples=10)
+    retrainer = Retrainer(store, tmp_path / "models", min_feedback=10)
+    _fill(store, [(code, "good") for code in GOOD[:15]])
+    report = asyncio.run(retrainer.retrain(CodeQualityPredictor(load=False)))
+    assert "error" not in report, report
+    assert store.count() == 10 and len(store.path.read_text().splitlines()) == 10
+    assert store.samples() == [(code, "good") for code in GOOD[5:15]]
+    assert retrainer.pending == 0
+
+    store.add(BAD[0], "bad")
+    assert retrainer.pending == 1
+
+
+def test_failed_or_cancelled_retraining(tmp_path):
+    """Feedback stays pending when training fails, and cancelling does not wait for it"""
+    store = FeedbackStore(tmp_path / "feedback.jsonl")
+    retrainer = Retrainer(store, tmp_path / "models", min_feedback=10)
+    _fill(store, [(code, "good") for code in GOOD[:10]])
+
+    missing = types.SimpleNamespace(source="artifact", model_path=tmp_path / "missing.joblib")
+    report = asyncio.run(retrainer.retrain(missing))
+    assert "error" in report and not report["accepted"]
+    assert retrainer.pending == 10 and retrainer.due()
+
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(retrainer.retrain(CodeQualityPredictor(load=False)), 0.05))
+    assert time.perf_counter() - start < 1
+    assert retrainer.pending == 10 and retrainer.last_report is report
+
+
+def test_workers_follow_swapped_model(tmp_path):
+    """Workers load a model swapped in after they started, per request"""
+    original = CodeQualityPredictor()
+    retrained = CodeQualityPredictor(model_path=tmp_path / "retrained.joblib", load=False)
+    retrained.train(*zip(*(seed_samples() + [(code, "good") for code in GOOD])))
+    retrained.save()
+    retrained = CodeQualityPredictor.from_artifact(retrained.model_path)
+
+    pool = AnalysisPool(workers=1)
+    pool.start()
+    try:
+        old = asyncio.run(pool.run(CODE, None, original))
+        new = asyncio.run(pool.run(CODE, None, retrained))
+        batch = asyncio.run(pool.run_batch([CODE], None, retrained))
+    finally:
+        pool.shutdown()
+    assert old["ml_prediction"]["model_version"] == original.version
+    assert new["ml_prediction"]["model_version"] == retrained.version != original.version
+    assert batch[0]["ml_prediction"]["model_version"] == retrained.version
+
+
+def test_feedback_retrains_and_swaps(app_client, tmp_path):
+    """Feedback over the threshold swaps in a new model, invalidating cached results"""
+    store = FeedbackStore(tmp_path / "feedback.jsonl")
+    client = app_client(
+        feedback_store=store,
+        retrainer=Retrainer(store, tmp_path / "models", install=app_module.install_model,
+                            min_feedback=len(GOOD)),
+        warmup=WarmUp(),
+    )
+    assert client.post("/api/feedback", json={"code": CODE, "label": "fine"}).status_code == 400
+    before = client.post("/api/analyze-text", json={"code": CODE})
+    version = before.json()["ml_prediction"]["model_version"]
+    assert client.get("/api/model").json()["model_version"] == version
+
+    for code in GOOD:
+        response = client.post("/api/feedback", json={"code": code, "label": "good"})
+        assert response.status_code == 202
+    assert response.json()["retraining"]
+
+    deadline = time.monotonic() + 60
+    model = client.get("/api/model").json()
+    while model["retraining"]["running"] and time.monotonic() < deadline:
+        time.sleep(0.2)
+        model = client.get("/api/model").json()
+    assert model["retraining"]["last"]["accepted"], model
+    assert model["model_version"] != version
+
+    after = client.post("/api/analyze-text", json={"code": CODE},
+                        headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()["ml_prediction"]["model_version"] == model["model_version"]
+    assert app_module.result_cache.stats()["hits"] == 0
@@ -0,0 +1,102 @@
+"""
+Tests for the repository scanner
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from src import scanner
+from src.scanner import ScanSummary, discover_files, scan
+
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+# A megabyte-class single line that takes seconds to analyze
+ONE_LINE = "x = 1; " * 100000
+
+FOUND = ["big.py", "bom.py", "cookie.py", "dangling.py", "latin1.py",
+         os.path.join("pkg", "a.py"), os.path.join("pkg", "b.py")]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Analyzable, oversized, undecodable and dangling files, and skipped directories"""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text(CODE, encoding="utf-8")
+    (tmp_path / "pkg" / "b.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "bom.py").write_bytes(b"\xef\xbb\xbf" + CODE.encode("utf-8"))
+    (tmp_path / "cookie.py").write_bytes(b"# -*- coding: latin-1 -*-\nname = '\xe9'\n")
+    (tmp_path / "big.py").write_text("x = 1\n" * 500, encoding="utf-8")
+    (tmp_path / "pkg" / "notes.txt").write_text(CODE, encoding="utf-8")
+    (tmp_path / "latin1.py").write_bytes(b"name = '\xe9'\n")
+    (tmp_path / "dangling.py").symlink_to(tmp_path / "missing.py")
+    for skipped in (".git", "__pycache__", "venv", "node_modules", "pkg.egg-info"):
+        (tmp_path / skipped).mkdir()
+        (tmp_path / skipped / "skipped.py").write_text(CODE, encoding="utf-8")
+    return tmp_path
+
+
+def test_discover_files_prunes_skipped_dirs(tree):
+    """Only .py files outside SKIP_DIRS and .egg-info directories are found, sorted"""
+    found = [os.path.relpath(path, tree) for path in discover_files(str(tree))]
+    assert found == FOUND
+    single = str(tree / "pkg" / "a.py")
+    assert list(discover_files(single)) == [single]
+
+
+def test_scan_reports_unreadable_files_and_summary(tree):
+    """Unreadable, undecodable and oversized files get error entries; the summary counts them"""
+    results = {os.path.relpath(result["path"], tree): result
+               for result in scan(str(tree), workers=1, chunk_size=3, max_bytes=1000)}
+    assert sorted(results) == FOUND
+    assert results["dangling.py"]["error"].startswith("Could not read file")
+    assert results["latin1.py"]["error"].startswith("Could not read file")
+    assert results["big.py"]["budget"] == "source_size"
+    assert results[os.path.join("pkg", "a.py")]["metrics"]["num_functions"] == 1
+    # Decoded as declared, like the interpreter does
+    assert results["bom.py"]["metrics"] == results[os.path.join("pkg", "a.py")]["metrics"]
+    assert "error" not in results["cookie.py"]["metrics"]
+
+    summary = ScanSummary()
+    for result in results.values():
+        summary.add(result)
+    totals = summary.to_dict()
+    analyzed = [results[name] for name in FOUND if "error" not in results[name]]
+    assert (totals["files"], totals["analyzed"], totals["errors"]) == (7, 4, 3)
+    assert totals["lines_of_code"] == sum(result["metrics"]["lines_of_code"] for result in analyzed)
+    assert totals["avg_quality_score"] == round(sum(result["overall_score"] for result in analyzed) / 4, 2)
+    assert sum(totals["ratings"].values()) == 4
+
+
+def test_slow_file_gets_time_budget(tmp_path):
+    """A file over the time budget is reported and the rest of its chunk still analyzed"""
+    (tmp_path / "fast.py").write_text(CODE, encoding="utf-8")
+    (tmp_path / "slow.py").write_text(ONE_LINE, encoding="utf-8")
+    fast, slow = sorted(scan(str(tmp_path), workers=1, timeout=0.2), key=lambda result: result["path"])
+    assert slow["budget"] == "time"
+    assert fast["metrics"]["num_functions"] == 1
+
+
+def test_scan_bounds_chunks_in_flight(tmp_path, monkeypatch):
+    """Files are discovered only as fast as chunks complete"""
+    for i in range(20):
+        (tmp_path / f"m{i:02d}.py").write_text(CODE, encoding="utf-8")
+    discovered = []
+
+    def recording(root):
+        for path in discover_files(root):
+            discovered.append(path)
+            yield path
+
+    monkeypatch.setattr(scanner, "discover_files", recording)
+    results = scan(str(tmp_path), workers=1, chunk_size=2)
+    next(results)
+    # Two chunks in flight for one worker, plus at most the chunk being formed
+    assert len(discovered) <= 3 * 2
+    assert len(list(results)) == 19 and len(discovered) == 20
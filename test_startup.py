@@ -0,0 +1,75 @@
+"""
+Tests for fast startup, background warm-up and health endpoints
+"""
+
+import subprocess
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.warmup import WarmUp
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds allowed for ``import app`` in a fresh interpreter
+IMPORT_BUDGET = 1.5
+
+HEAVY_MODULES = ("sklearn", "numpy", "radon", "scipy")
+
+
+def test_import_time_budget():
+    """Importing the app stays fast and does not load heavy dependencies"""
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout.split()
+
+    assert output[1:] == []
+    assert float(output[0]) < IMPORT_BUDGET
+
+
+def test_ready_after_warmup(app_client):
+    """Liveness answers at once, readiness turns 200 once models are loaded"""
+    client = app_client(warmup=WarmUp())
+    assert client.get("/api/health").status_code == 200
+
+    deadline = time.monotonic() + 60
+    while client.get("/api/ready").status_code != 200:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+    ready = client.get("/api/ready").json()
+    assert ready["status"] == "ready"
+    assert ready["warmup"]["state"] == "ready"
+
+    response = client.post("/api/analyze-text", json={"code": "x = 1\n"})
+    assert response.status_code == 200
+
+
+def test_failed_warmup_is_not_ready(app_client, monkeypatch):
+    """A failed warm-up keeps readiness at 503 and analysis requests get 503"""
+    warmup = WarmUp()
+
+    def fail():
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(warmup, "_load_models", fail)
+    client = app_client(warmup=warmup)
+
+    response = client.post("/api/analyze-text", json={"code": "x = 1\n"})
+    assert response.status_code == 503
+    assert "model unavailable" in response.json()["detail"]
+
+    ready = client.get("/api/ready")
+    assert ready.status_code == 503
+    assert ready.json()["status"] == "failed"
+    assert client.get("/api/health").status_code == 200
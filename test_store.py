@@ -0,0 +1,122 @@
+"""
+Tests for the columnar metrics store
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from src.code_analyzer import CodeAnalyzer
+from src.ml_models import CodeQualityPredictor
+from src.pipeline import analyze_batch
+from src.store import MetricsStore, smell_kind
+
+
+@pytest.fixture(scope="module")
+def results():
+    root = Path(__file__).parent
+    paths = sorted(str(path.relative_to(root)) for path in root.glob("src/*.py")) + ["examples/sample_code.py"]
+    codes = [(root / path).read_text(encoding='utf-8') for path in paths]
+    analyzed = analyze_batch(codes + ["def broken(:\n"], CodeAnalyzer(), CodeQualityPredictor())
+    return [{"path": path, **result} for path, result in zip(paths + ["broken.py"], analyzed)]
+
+
+def _store(results):
+    store = MetricsStore(capacity=4)
+    store.extend(results)
+    return store
+
+
+def test_rows_round_trip(results):
+    """Every stored metric reads back as in the result"""
+    store = _store(results)
+    assert len(store) == len(results)
+    for row, result in enumerate(results[:-1]):
+        record = store.row(row)
+        assert record["path"] == result["path"]
+        assert record["lines_of_code"] == result["metrics"]["lines_of_code"]
+        assert record["quality_score"] == pytest.approx(result["overall_score"], abs=1e-4)
+        assert record["rating"] == result["ml_prediction"]["rating"]
+        assert len(record["code_smells"]) == len(result["metrics"]["code_smells"])
+        assert "other" not in record["code_smells"]
+    assert store.row(len(results) - 1)["error"] is True
+
+
+def test_queries_match_python(results):
+    """Aggregates equal the same computation on the result dictionaries"""
+    store = _store(results)
+    analyzed = [result for result in results if "error" not in result["metrics"]]
+    scores = [result["overall_score"] for result in analyzed]
+
+    assert store.percentiles("quality_score", [50, 90]) == pytest.approx(
+        {"p50": round(np.percentile(scores, 50), 2), "p90": round(np.percentile(scores, 90), 2)}, abs=0.01)
+
+    lowest = sorted(analyzed, key=lambda result: result["overall_score"])[:3]
+    assert [path for path, _ in store.worst("quality_score", 3)] == [result["path"] for result in lowest]
+    most_complex = max(analyzed, key=lambda result: result["metrics"]["max_complexity"])
+    assert store.worst("max_complexity", 1, highest=True) == [
+        (most_complex["path"], most_complex["metrics"]["max_complexity"])]
+
+    groups = store.group_by_directory("lines_of_code")
+    assert groups["src"]["files"] == len(analyzed) - 1
+    assert groups["examples"]["mean"] == next(result["metrics"]["lines_of_code"] for result in analyzed
+                                              if result["path"].startswith("examples"))
+    assert sum(store.smell_counts().values()) == sum(len(result["metrics"]["code_smells"]) for result in analyzed)
+
+
+def test_save_and_memory_mapped_load(results, tmp_path):
+    store = _store(results)
+    store.save(tmp_path / "store")
+    loaded = MetricsStore.load(tmp_path / "store")
+
+    assert isinstance(loaded._columns["quality_score"], np.memmap)
+    assert [loaded.row(row) for row in range(len(loaded))] == [store.row(row) for row in range(len(store))]
+    assert loaded.summary() == store.summary()
+
+    # Appending copies the mapped columns instead of writing to the files
+    loaded.append("src/app.py", results[0])
+    assert len(loaded) == len(store) + 1
+    assert loaded.paths.count("src/app.py") == 1
+    assert len(MetricsStore.load(tmp_path / "store")) == len(store)
+
+
+def test_save_over_own_memory_map(results, tmp_path):
+    """A memory-mapped store saved back to its directory stays intact"""
+    store = _store(results)
+    store.save(tmp_path / "store")
+    loaded = MetricsStore.load(tmp_path / "store")
+    loaded.save(tmp_path / "store")
+    assert [loaded.row(row) for row in range(len(loaded))] == [store.row(row) for row in range(len(store))]
+    reloaded = MetricsStore.load(tmp_path / "store")
+    assert reloaded.summary() == store.summary()
+    assert not [name for name in os.listdir(tmp_path / "store") if name.endswith(".tmp")]
+
+
+def test_compact_rows(results):
+    """A file costs a few dozen bytes instead of a nested dictionary"""
+    store = _store(results * 50)
+    row_bytes = sum(store.column(name).nbytes for name in store._columns) / len(store)
+    assert row_bytes < 100
+    assert len(store.paths) == len(results)
+
+
+def test_smell_kinds():
+    assert smell_kind("Long function 'f' (60 lines)") == 1
+    assert smell_kind("Function 'f' has too many parameters (7)") == 2
+    assert smell_kind("Something new") == 0
+
+
+def test_directory_depth_uses_native_separators(results):
+    """Directories are split into components with the platform's separator"""
+    store = MetricsStore()
+    store.append(os.path.join("pkg", "sub", "a.py"), results[0])
+    store.append(os.path.join("pkg", "b.py"), results[1])
+    store.append("c.py", results[2])
+    assert list(store.group_by_directory("lines_of_code", depth=1)) == ["pkg", ""]
+    assert list(store.group_by_directory("lines_of_code")) == [os.path.join("pkg", "sub"), "pkg", ""]
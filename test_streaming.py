@@ -0,0 +1,172 @@
+"""
+Tests for the streaming analysis of large sources
+"""
+
+import asyncio
+import io
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+import app as app_module
+from src.cache import ResultCache
+from src.code_analyzer import CodeAnalyzer
+from src.ml_models import CodeQualityPredictor
+from src.pipeline import AnalysisPool, analyze_large, analyze_source
+from src.streaming import SourceFile, iter_chunks, iter_lines, spool
+
+
+CODE = '''"""Module docstring"""
+# A comment
+import os
+
+
+@property
+@staticmethod
+def decorated(a: int) -> int:
+    """Docstring"""
+    return [x for x in range(a)]
+
+
+class Shape:
+    """A shape"""
+
+    def area(self):
+        return 0
+
+
+try:
+    import json
+except ImportError:
+    json = None
+else:
+    pass
+finally:
+    pass
+
+TEXT = """
+def not_a_function():
+    pass
+"""
+values = (1,
+2,
+    3)
+if __name__ == "__main__":
+    print(decorated(3))
+'''
+
+
+@pytest.fixture(scope="module")
+def models():
+    return CodeAnalyzer(), CodeQualityPredictor()
+
+
+@pytest.fixture
+def client(app_client):
+    return app_client(analysis_pool=AnalysisPool(workers=0, streaming_threshold=1))
+
+
+def test_chunks_split_top_level_statements():
+    """Chunks rebuild the source; decorators and else clauses stay with their statement"""
+    chunks = list(iter_chunks(iter_lines(io.StringIO(CODE))))
+    assert "".join(chunks) == CODE
+    assert chunks[0].startswith('"""Module docstring"""\n# A comment\n')
+    assert chunks[2].startswith("@property\n@staticmethod\ndef decorated")
+    assert any(chunk.startswith("try:") and "finally:" in chunk for chunk in chunks)
+    assert any(chunk.startswith("TEXT") and "not_a_function" in chunk for chunk in chunks)
+    assert not any(chunk.startswith("2,") for chunk in chunks)
+
+
+def test_chunks_after_syntax_error():
+    """The rest of a source the tokenizer cannot read is one chunk"""
+    code = "x = 1\ny = (\nz = 2\n"
+    chunks = list(iter_chunks(iter_lines(io.StringIO(code))))
+    assert "".join(chunks) == code
+    assert chunks[-1].endswith("z = 2\n")
+
+
+def test_lines_decoded_incrementally():
+    """Multi-byte characters split across reads are decoded intact"""
+    text = "é = 'ü'\n\n# 日本\nlast"
+    lines = list(iter_lines(io.BytesIO(text.encode("utf-8")), read_size=3))
+    assert lines == ["é = 'ü'\n", "\n", "# 日本\n", "last"]
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_lines(io.BytesIO(b"x = 1\n\xff\n"), read_size=3))
+
+
+@pytest.mark.parametrize("code", [
+    CODE,
+    CODE * 3,
+    "",
+    "# only a comment\n",
+    "def broken(:\n    pass\n",
+    CODE + "\ndef broken(:\n    pass\n" + CODE,
+    "x = 1" * 10 + "\n\n\n",
+])
+def test_streamed_analysis_matches(models, code, tmp_path):
+    """Strings and files analyzed in chunks give the whole-source result"""
+    analyzer, predictor = models
+    expected = analyze_source(code, analyzer, predictor)
+    assert analyze_large(code, analyzer, predictor) == expected
+
+    path = tmp_path / "source.py"
+    path.write_text(code, encoding="utf-8")
+    assert analyze_large(SourceFile(str(path), path.stat().st_size), analyzer, predictor) == expected
+
+
+def test_streamed_tfidf_matches_vectorizer(models):
+    """Term counts gathered chunk by chunk give the vectorizer's row"""
+    _, predictor = models
+    features = predictor.stream_features()
+    for chunk in iter_chunks(iter_lines(io.StringIO(CODE * 2))):
+        features.update(chunk)
+    expected = predictor.vectorizer.transform([CODE * 2]).toarray()
+    assert np.allclose(features.tfidf(), expected)
+
+
+def test_spool_and_file_key(tmp_path):
+    """Spooled files validate UTF-8, and hash to the key of their text"""
+    source = spool(io.BytesIO(CODE.encode("utf-8")), directory=str(tmp_path))
+    assert source.size == len(CODE.encode("utf-8"))
+    cache = ResultCache()
+    cache.set_version("1:2")
+    assert cache.file_key(source.path) == cache.key(CODE)
+
+    with pytest.raises(UnicodeDecodeError):
+        spool(io.BytesIO(b"x = '\xff'\n"), directory=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(source.path)]
+
+
+def test_large_upload_is_streamed(client, monkeypatch, tmp_path):
+    """Uploads over the threshold are analyzed from disk, with the same result and tags"""
+    spooled = []
+
+    def spool_to_tmp(stream):
+        spooled.append(spool(stream, str(tmp_path)))
+        return spooled[-1]
+
+    monkeypatch.setattr(app_module, "spool", spool_to_tmp)
+    text = client.post("/api/analyze-text", json={"code": CODE}).json()
+    upload = client.post("/api/analyze", files={"file": ("a.py", CODE.encode("utf-8"))})
+    assert upload.status_code == 200
+    assert upload.json() == {"filename": "a.py", **text}
+    assert spooled and not os.path.exists(spooled[0].path)
+    assert client.post("/api/analyze", files={"file": ("a.py", CODE.encode("utf-8"))},
+                       headers={"If-None-Match": upload.headers["etag"]}).status_code == 304
+    assert not os.listdir(tmp_path)
+
+
+def test_streaming_in_worker_process():
+    """Sources over the threshold are streamed inside the workers too"""
+    pool = AnalysisPool(workers=1, streaming_threshold=1)
+    pool.start()
+    try:
+        result = asyncio.run(pool.run(CODE, None, None))
+    finally:
+        pool.shutdown()
+    assert result["metrics"]["num_functions"] == 2
@@ -0,0 +1,70 @@
+"""
+Tests for stage timing and the /metrics endpoint
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.code_analyzer import CodeAnalyzer
+from src.ml_models import CodeQualityPredictor
+from src.pipeline import analyze_source
+from src.telemetry import MetricsRegistry
+
+
+CODE = "def add(a, b):\n    '''Add'''\n    return a + b\n"
+
+
+def test_histogram_text_format():
+    """Histograms render cumulative buckets, sum and count"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1))
+    histogram.observe(0.05, stage="parse")
+    histogram.observe(0.5, stage="parse")
+    histogram.observe(5, stage="parse")
+    registry.counter("requests_total", "Requests").inc()
+
+    assert registry.render().splitlines() == [
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="parse",le="0.1"} 1',
+        'stage_seconds_bucket{stage="parse",le="1"} 2',
+        'stage_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'stage_seconds_sum{stage="parse"} 5.55',
+        'stage_seconds_count{stage="parse"} 3',
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        "requests_total 1",
+    ]
+
+
+def test_timed_analysis_matches_untimed():
+    """Timing adds a stage breakdown without changing the result"""
+    analyzer, predictor = CodeAnalyzer(), CodeQualityPredictor()
+    timed = analyze_source(CODE, CodeAnalyzer(), predictor, timed=True)
+    stages = timed.pop("timings")
+
+    assert timed == analyze_source(CODE, analyzer, predictor)
+    assert {"parse", "raw_metrics", "ast_metrics", "aggregate", "smells",
+            "vectorize", "inference", "scoring", "suggestions"} <= set(stages)
+
+
+def test_metrics_endpoint_and_timings_block(client):
+    """Requests feed the /metrics histograms; timings are only returned on request"""
+
+    plain = client.post("/api/analyze-text", json={"code": CODE}).json()
+    assert "timings" not in plain
+
+    timed = client.post("/api/analyze-text?timings=true", json={"code": CODE}).json()
+    assert timed["timings"]["cached"] is True
+
+    timed = client.post("/api/analyze-text?timings=true", json={"code": CODE + "\n"}).json()
+    assert timed["timings"]["cached"] is False
+    assert timed["timings"]["stages_ms"]["parse"] >= 0
+
+    text = client.get("/metrics").text
+    assert 'analysis_stage_seconds_count{stage="parse"}' in text
+    assert 'http_requests_total{method="POST",path="/api/analyze-text",status="200"}' in text
+    assert 'result_cache_events_total{event="hits"} 1' in text
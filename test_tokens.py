@@ -0,0 +1,84 @@
+"""
+Tests for the shared token counts
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from radon.raw import analyze
+
+from src.code_analyzer import CodeAnalyzer
+from src.ml_models import CodeQualityPredictor
+from src.pipeline import analyze_source
+from src.tokens import count_tokens, sum_counts
+from test_metrics_engine import corpus
+
+
+TRICKY = [
+    "if x: y = 2; lambda: 0; z = 1  # comment\n",
+    "x = (1,\n  # inside brackets\n\n  2)\ny = 1 + \\\n  2\n",
+    '"""multi\n\n   line"""\n\'single\'\nx = """not\na docstring"""\n',
+    "try: pass\nexcept: pass\r\nclass A: pass\n\n\n",
+    "a = 1;\nfor i in r: print(i); print(2)\n",
+]
+
+
+def test_raw_metrics_match_radon():
+    """Token based raw metrics equal radon's analyze"""
+    for code in corpus() + TRICKY:
+        counts = count_tokens(code)
+        assert counts.errors == 0
+        assert counts.raw == analyze(code)
+
+
+def test_counts_ignore_strings_and_comments():
+    """Comments, definitions and numbers inside strings are not counted"""
+    code = (
+        '"""Module doc with 1234 and # no comment"""\n'
+        's = "def fake(): # 42"\n'
+        "def real_name(x):  # a comment\n"
+        "    return x * 100\n"
+        "class Thing: pass\n"
+        "def CamelCase(): pass\n"
+    )
+    counts = count_tokens(code)
+    assert counts.comments == 1
+    assert counts.functions == 2
+    assert counts.proper_functions == 1
+    assert counts.classes == 1
+    assert counts.docstrings == 1
+    assert counts.magic_numbers == 1
+
+    smells = CodeAnalyzer().analyze('x = "port 8080"  # 443\n')["code_smells"]
+    assert not any("Magic numbers" in smell for smell in smells)
+
+
+def test_counts_of_line_ranges_add_up():
+    """Counting consecutive statements separately gives the counts of the whole"""
+    code = Path(__file__).read_text(encoding='utf-8')
+    lines = code.splitlines()
+    middle = next(i for i, line in enumerate(lines) if line.startswith("def "))
+    parts = ["\n".join(lines[:middle]) + "\n", "\n".join(lines[middle:]) + "\n"]
+    assert sum_counts([count_tokens(part) for part in parts]) == count_tokens(code)
+
+
+def test_tokenizer_errors_are_counted():
+    """Unterminated sources are counted up to the error"""
+    counts = count_tokens("# one\nx = (1,\n")
+    assert counts.errors == 1
+    assert counts.comments == 1
+
+
+def test_analysis_tokens_feed_the_prediction():
+    """Passing the analyzer's token counts predicts exactly like tokenizing again"""
+    analyzer, predictor = CodeAnalyzer(), CodeQualityPredictor(load=False)
+    code = Path(__file__).read_text(encoding='utf-8')
+    metrics, tokens = analyzer.analyze_with_tokens(code)
+
+    assert tokens == count_tokens(code)
+    assert predictor.predict_quality(code, metrics, tokens=tokens) == predictor.predict_quality(code, metrics)
+    assert analyze_source(code, analyzer, predictor)["ml_prediction"] == predictor.predict_quality(code, metrics)